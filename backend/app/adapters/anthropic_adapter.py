@@ -1,8 +1,11 @@
 """Anthropic (Claude) API adapter implementation."""
 
+import json
 import os
 from typing import AsyncIterator, List, Optional, Tuple
 
+import anthropic
+import httpx
 from anthropic import AsyncAnthropic
 from anthropic.types import (
     ContentBlockDeltaEvent,
@@ -11,15 +14,21 @@ from anthropic.types import (
     ToolParam,
 )
 
-from app.core.base_adapter import BaseLLMAdapter
+from app.core.base_adapter import HEALTH_CHECK_TIMEOUT, BaseLLMAdapter
+from app.core.http_transport import transport_registry
 from app.core.schemas import (
     AdapterCapabilities,
     LLMConfig,
     LLMResponse,
     Message,
     MessageRole,
-    StreamChunk,
+    ModelInfo,
 )
+from app.core.streaming import RawChunk
+from app.core.tool_calls import ToolCallAssembler, make_tool_call
+
+# Anthropic requires max_tokens; sent when the config leaves it unset
+DEFAULT_MAX_TOKENS = 4096
 
 
 class AnthropicAdapter(BaseLLMAdapter):
@@ -31,12 +40,27 @@ class AnthropicAdapter(BaseLLMAdapter):
         api_key = config.api_key or os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             raise ValueError("Anthropic API key is required")
+        base_url = config.base_url or "https://api.anthropic.com"
         self.client = AsyncAnthropic(
             api_key=api_key,
-            base_url=config.base_url or "https://api.anthropic.com",
+            base_url=base_url,
             timeout=config.timeout,
+            # Retries are handled by the chat service's retry policy
+            max_retries=0,
+            http_client=transport_registry.create_client(
+                base_url=base_url,
+                timeout=config.timeout,
+                config=config.transport,
+                follow_redirects=True,
+                event_hooks={"response": [self._on_response]},
+            ),
         )
 
+    @property
+    def completion_budget(self) -> int:
+        """Configured ``max_tokens``, or the default this adapter sends."""
+        return self.config.max_tokens or DEFAULT_MAX_TOKENS
+
     def _validate_config(self) -> None:
         """Validate Anthropic-specific configuration."""
         if not self.config.model:
@@ -64,10 +88,36 @@ class AnthropicAdapter(BaseLLMAdapter):
                 anthropic_messages.append(
                     MessageParam(role="user", content=msg.content)
                 )
+            elif msg.role == MessageRole.ASSISTANT and msg.tool_calls:
+                content = [{"type": "text", "text": msg.content}] if msg.content else []
+                for call in msg.tool_calls:
+                    content.append({
+                        "type": "tool_use",
+                        "id": call["id"],
+                        "name": call["function"]["name"],
+                        "input": json.loads(call["function"]["arguments"] or "{}"),
+                    })
+                anthropic_messages.append(MessageParam(role="assistant", content=content))
             elif msg.role == MessageRole.ASSISTANT:
                 anthropic_messages.append(
                     MessageParam(role="assistant", content=msg.content)
                 )
+            elif msg.role == MessageRole.TOOL:
+                result = {
+                    "type": "tool_result",
+                    "tool_use_id": msg.tool_call_id,
+                    "content": msg.content,
+                }
+                # Results of one step go back together in a single user turn
+                previous = anthropic_messages[-1] if anthropic_messages else None
+                if (
+                    previous is not None
+                    and previous["role"] == "user"
+                    and isinstance(previous["content"], list)
+                ):
+                    previous["content"].append(result)
+                else:
+                    anthropic_messages.append(MessageParam(role="user", content=[result]))
 
         return anthropic_messages, system_message
 
@@ -76,7 +126,7 @@ class AnthropicAdapter(BaseLLMAdapter):
         messages: List[Message],
         stream: bool = False,
         **kwargs,
-    ) -> LLMResponse | AsyncIterator[StreamChunk]:
+    ) -> LLMResponse | AsyncIterator[RawChunk]:
         """Send chat completion request to Anthropic."""
         normalized_messages, system_message = self.normalize_messages(messages)
 
@@ -91,11 +141,7 @@ class AnthropicAdapter(BaseLLMAdapter):
 
         if system_message:
             params["system"] = system_message
-        if self.config.max_tokens:
-            params["max_tokens"] = self.config.max_tokens
-        else:
-            # Anthropic requires max_tokens
-            params["max_tokens"] = 4096
+        params["max_tokens"] = self.completion_budget
 
         if stream:
             return self._stream_response(params)
@@ -105,29 +151,58 @@ class AnthropicAdapter(BaseLLMAdapter):
 
     async def _stream_response(
         self, params: dict
-    ) -> AsyncIterator[StreamChunk]:
+    ) -> AsyncIterator[RawChunk]:
         """Stream Anthropic responses."""
-        with await self.client.messages.stream(**params) as stream:
+        assembler = ToolCallAssembler()
+        usage = {}
+        stop_reason = None
+        # Exiting the context closes the response, cancelling generation
+        async with self.client.messages.stream(**params) as stream:
             async for event in stream:
-                if isinstance(event, ContentBlockDeltaEvent):
+                if event.type == "content_block_start" and event.content_block.type == "tool_use":
+                    block = event.content_block
+                    assembler.add(event.index, block.id, block.name)
+                elif event.type == "content_block_delta" and event.delta.type == "input_json_delta":
+                    tool_calls = assembler.add(event.index, arguments=event.delta.partial_json)
+                    if tool_calls:
+                        yield RawChunk(content="", tool_calls=tool_calls)
+                elif event.type == "content_block_stop":
+                    tool_calls = assembler.end(event.index)
+                    if tool_calls:
+                        yield RawChunk(content="", tool_calls=tool_calls)
+                elif isinstance(event, ContentBlockDeltaEvent):
                     delta = event.delta
                     content = delta.text if hasattr(delta, "text") else ""
-                    yield StreamChunk(
+                    yield RawChunk(
                         content=content,
                         finished=False,
                         metadata={"type": event.type},
                     )
+                elif event.type == "message_start":
+                    usage["input_tokens"] = event.message.usage.input_tokens
+                elif event.type == "message_delta":
+                    usage["output_tokens"] = event.usage.output_tokens
+                    stop_reason = event.delta.stop_reason
                 elif event.type == "message_stop":
-                    yield StreamChunk(content="", finished=True)
+                    yield RawChunk(
+                        content="",
+                        finished=True,
+                        tool_calls=assembler.finish() or None,
+                        metadata={"finish_reason": stop_reason, "usage": usage or None},
+                    )
 
     def _parse_response(self, response) -> LLMResponse:
         """Parse Anthropic response to unified format."""
         content_blocks = response.content
         text_content = ""
+        tool_calls = []
 
         for block in content_blocks:
             if isinstance(block, TextBlock):
                 text_content += block.text
+            elif getattr(block, "type", None) == "tool_use":
+                # Same shape as OpenAI tool calls, so callers handle one format
+                tool_calls.append(make_tool_call(block.id, block.name, json.dumps(block.input)))
 
         # Extract usage information
         usage = None
@@ -142,23 +217,34 @@ class AnthropicAdapter(BaseLLMAdapter):
             model=response.model,
             finish_reason=response.stop_reason,
             usage=usage,
+            tool_calls=tool_calls or None,
         )
 
     async def health_check(self) -> bool:
-        """Check Anthropic API connectivity."""
+        """Check Anthropic API connectivity.
+
+        Lists models rather than sending a message, so the probe is not
+        billed. A 404 from gateways without the models endpoint still shows
+        the API is reachable and the key accepted.
+        """
         try:
-            # Simple health check - try to list messages (if API supports it)
-            # Or just make a minimal request
-            await self.client.messages.create(
-                model=self.config.model,
-                messages=[{"role": "user", "content": "Hello"}],
-                max_tokens=1,
+            await self.client.get(
+                "/v1/models",
+                cast_to=httpx.Response,
+                options={"timeout": HEALTH_CHECK_TIMEOUT},
             )
             return True
-        except Exception:
-            # If the above fails, we can't verify, but adapter is configured
-            # Return True if we can at least initialize
+        except anthropic.NotFoundError:
             return True
+        except Exception:
+            return False
+
+    async def fetch_models(self) -> List[ModelInfo]:
+        """Fetch the models available to this API key."""
+        response = await self.client.get(
+            "/v1/models", cast_to=httpx.Response, options={"params": {"limit": 1000}}
+        )
+        return [ModelInfo(id=model["id"]) for model in response.json().get("data", [])]
 
     def get_capabilities(self) -> AdapterCapabilities:
         """Get Anthropic adapter capabilities."""
@@ -176,3 +262,6 @@ class AnthropicAdapter(BaseLLMAdapter):
             ],
         )
 
+    async def close(self) -> None:
+        """Close the underlying HTTP client."""
+        await self.client.close()
@@ -1,19 +1,72 @@
 """Google Gemini API adapter implementation."""
 
+import json
 import os
+import uuid
 from typing import AsyncIterator, List, Optional
 
-import httpx
-
-from app.core.base_adapter import BaseLLMAdapter
+from app.core.base_adapter import HEALTH_CHECK_TIMEOUT, BaseLLMAdapter
+from app.core.http_transport import transport_registry
 from app.core.schemas import (
     AdapterCapabilities,
     LLMConfig,
     LLMResponse,
     Message,
     MessageRole,
-    StreamChunk,
+    ModelInfo,
 )
+from app.core.streaming import RawChunk
+from app.core.tool_calls import make_tool_call
+
+
+class JSONArrayParser:
+    """Splits a streamed JSON array into its elements as they complete.
+
+    ``streamGenerateContent`` without ``alt=sse`` sends one JSON array whose
+    elements arrive over time. Rather than waiting for the closing bracket,
+    :meth:`feed` tracks nesting and string state across chunks and returns
+    each top-level object as soon as its closing brace is seen.
+    """
+
+    def __init__(self):
+        """Initialize the parser."""
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[dict]:
+        """Consume the next piece of the array.
+
+        Returns:
+            Objects completed by ``text``, in order.
+        """
+        objects = []
+        start = 0 if self._depth else None
+        for i, char in enumerate(text):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    start = i
+                self._depth += 1
+            elif char == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(text[start : i + 1])
+                    objects.append(json.loads("".join(self._buffer)))
+                    self._buffer = []
+                    start = None
+        if start is not None:
+            self._buffer.append(text[start:])
+        return objects
 
 
 class GeminiAdapter(BaseLLMAdapter):
@@ -28,8 +81,11 @@ class GeminiAdapter(BaseLLMAdapter):
         self.api_key = api_key
         self.base_url = config.base_url or "https://generativelanguage.googleapis.com/v1"
         self.timeout = config.timeout
-        self.client = httpx.AsyncClient(
+        self.client = transport_registry.create_client(
+            base_url=self.base_url,
             timeout=self.timeout,
+            config=config.transport,
+            event_hooks={"response": [self._on_response]},
         )
 
     def _validate_config(self) -> None:
@@ -47,10 +103,24 @@ class GeminiAdapter(BaseLLMAdapter):
         """Convert unified messages to Gemini format."""
         gemini_messages = []
         system_instruction = None
+        # Gemini matches function responses by name rather than call id
+        call_names = {}
 
         for msg in messages:
             if msg.role == MessageRole.SYSTEM:
                 system_instruction = msg.content
+            elif msg.role == MessageRole.ASSISTANT and msg.tool_calls:
+                parts = [{"text": msg.content}] if msg.content else []
+                for call in msg.tool_calls:
+                    name = call["function"]["name"]
+                    call_names[call["id"]] = name
+                    parts.append({
+                        "functionCall": {
+                            "name": name,
+                            "args": json.loads(call["function"]["arguments"] or "{}"),
+                        }
+                    })
+                gemini_messages.append({"role": "model", "parts": parts})
             elif msg.role in [MessageRole.USER, MessageRole.ASSISTANT]:
                 gemini_messages.append(
                     {
@@ -58,6 +128,19 @@ class GeminiAdapter(BaseLLMAdapter):
                         "parts": [{"text": msg.content}],
                     }
                 )
+            elif msg.role == MessageRole.TOOL:
+                part = {
+                    "functionResponse": {
+                        "name": call_names.get(msg.tool_call_id) or msg.name,
+                        "response": {"content": msg.content},
+                    }
+                }
+                # Responses to one step's calls go back in a single turn
+                previous = gemini_messages[-1] if gemini_messages else None
+                if previous is not None and "functionResponse" in previous["parts"][-1]:
+                    previous["parts"].append(part)
+                else:
+                    gemini_messages.append({"role": "user", "parts": [part]})
 
         return gemini_messages, system_instruction
 
@@ -66,7 +149,7 @@ class GeminiAdapter(BaseLLMAdapter):
         messages: List[Message],
         stream: bool = False,
         **kwargs,
-    ) -> LLMResponse | AsyncIterator[StreamChunk]:
+    ) -> LLMResponse | AsyncIterator[RawChunk]:
         """Send chat completion request to Gemini."""
         normalized_messages, system_instruction = self.normalize_messages(messages)
 
@@ -82,6 +165,10 @@ class GeminiAdapter(BaseLLMAdapter):
                 "parts": [{"text": system_instruction}]
             }
 
+        # Function declarations, e.g. from the MCP tool catalog
+        if kwargs.get("tools"):
+            payload["tools"] = kwargs["tools"]
+
         # Add generation config
         generation_config = {
             "temperature": self.config.temperature,
@@ -93,7 +180,7 @@ class GeminiAdapter(BaseLLMAdapter):
         
         payload["generationConfig"] = generation_config
 
-        url = f"{self.base_url}/models/{self.config.model}:generateContent"
+        url = f"/models/{self.config.model}:generateContent"
         if stream:
             url = url.replace("generateContent", "streamGenerateContent")
 
@@ -108,29 +195,100 @@ class GeminiAdapter(BaseLLMAdapter):
 
     async def _stream_response(
         self, url: str, params: dict, payload: dict
-    ) -> AsyncIterator[StreamChunk]:
-        """Stream Gemini responses."""
+    ) -> AsyncIterator[RawChunk]:
+        """Stream Gemini responses.
+
+        Requests server-sent events (``alt=sse``) and parses each response
+        object as soon as it arrives, yielding text and function calls part
+        by part. Should the API answer with a plain JSON array instead, the
+        array is parsed incrementally, element by element. A final chunk
+        carries the finish reason and token usage.
+        """
+        params = {**params, "alt": "sse"}
+        finish_reason = None
+        usage = None
         async with self.client.stream("POST", url, params=params, json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
             response.raise_for_status()
-            async for line in response.aiter_lines():
-                if line.startswith("data: "):
-                    import json
-                    try:
-                        data = json.loads(line[6:])  # Remove "data: " prefix
-                        if "candidates" in data and len(data["candidates"]) > 0:
-                            candidate = data["candidates"][0]
-                            if "content" in candidate and "parts" in candidate["content"]:
-                                for part in candidate["content"]["parts"]:
-                                    if "text" in part:
-                                        yield StreamChunk(
-                                            content=part["text"],
-                                            finished=False,
-                                            metadata={
-                                                "finish_reason": candidate.get("finishReason"),
-                                            },
-                                        )
-                    except json.JSONDecodeError:
-                        continue
+
+            if response.headers.get("content-type", "").startswith("text/event-stream"):
+                objects = self._sse_objects(response)
+            else:
+                objects = self._array_objects(response)
+
+            async for data in objects:
+                if "error" in data:
+                    raise Exception(f"Gemini API error: {data['error'].get('message')}")
+                if "usageMetadata" in data:
+                    # Counts are cumulative; the last one covers the whole answer
+                    usage = self._usage(data["usageMetadata"])
+                block_reason = data.get("promptFeedback", {}).get("blockReason")
+                if block_reason:
+                    finish_reason = block_reason
+                if not data.get("candidates"):
+                    continue
+
+                candidate = data["candidates"][0]
+                finish_reason = candidate.get("finishReason") or finish_reason
+                for part in candidate.get("content", {}).get("parts", []):
+                    if "functionCall" in part:
+                        # Gemini streams each call complete
+                        yield RawChunk(
+                            content="",
+                            tool_calls=[self._tool_call(part["functionCall"])],
+                        )
+                    elif part.get("text"):
+                        yield RawChunk(content=part["text"])
+
+        yield RawChunk(
+            content="",
+            finished=True,
+            metadata={
+                "model": self.config.model,
+                "finish_reason": finish_reason,
+                "usage": usage,
+            },
+        )
+
+    @staticmethod
+    async def _sse_objects(response) -> AsyncIterator[dict]:
+        """Response objects from a server-sent event stream."""
+        data_lines = []
+        async for line in response.aiter_lines():
+            if line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+            elif not line and data_lines:
+                # A blank line ends the event
+                yield json.loads("\n".join(data_lines))
+                data_lines = []
+        if data_lines:
+            yield json.loads("\n".join(data_lines))
+
+    @staticmethod
+    async def _array_objects(response) -> AsyncIterator[dict]:
+        """Response objects from a JSON array, parsed as it arrives."""
+        parser = JSONArrayParser()
+        async for text in response.aiter_text():
+            for data in parser.feed(text):
+                yield data
+
+    @staticmethod
+    def _tool_call(call: dict) -> dict:
+        """Convert a Gemini functionCall part to the unified tool call shape."""
+        # Gemini calls carry no id; make one so results can be paired
+        return make_tool_call(
+            f"call_{uuid.uuid4().hex[:24]}", call["name"], json.dumps(call.get("args") or {})
+        )
+
+    @staticmethod
+    def _usage(usage_data: dict) -> dict:
+        """Convert Gemini usageMetadata to the unified usage shape."""
+        return {
+            "prompt_tokens": usage_data.get("promptTokenCount", 0),
+            "completion_tokens": usage_data.get("candidatesTokenCount", 0),
+            "total_tokens": usage_data.get("totalTokenCount", 0),
+        }
 
     def _parse_response(self, data: dict) -> LLMResponse:
         """Parse Gemini response to unified format."""
@@ -140,63 +298,58 @@ class GeminiAdapter(BaseLLMAdapter):
         candidate = data["candidates"][0]
         content_parts = candidate.get("content", {}).get("parts", [])
         
-        # Extract text content
+        # Extract text content and function calls
         text_content = ""
+        tool_calls = []
         for part in content_parts:
             if "text" in part:
                 text_content += part["text"]
+            elif "functionCall" in part:
+                tool_calls.append(self._tool_call(part["functionCall"]))
 
         # Extract usage information
         usage = None
         if "usageMetadata" in data:
-            usage_data = data["usageMetadata"]
-            usage = {
-                "prompt_tokens": usage_data.get("promptTokenCount", 0),
-                "completion_tokens": usage_data.get("candidatesTokenCount", 0),
-                "total_tokens": usage_data.get("totalTokenCount", 0),
-            }
+            usage = self._usage(data["usageMetadata"])
 
         return LLMResponse(
             content=text_content,
             model=self.config.model,
             finish_reason=candidate.get("finishReason"),
             usage=usage,
+            tool_calls=tool_calls or None,
         )
 
     async def health_check(self) -> bool:
         """Check Gemini API connectivity."""
         try:
-            # Try to list models
-            url = f"{self.base_url}/models"
+            # Fetch the configured model rather than listing every model
+            url = f"/models/{self.config.model}"
             params = {"key": self.api_key}
-            response = await self.client.get(url, params=params, timeout=5)
+            response = await self.client.get(url, params=params, timeout=HEALTH_CHECK_TIMEOUT)
             return response.status_code == 200
         except Exception:
             return False
 
-    async def list_models(self) -> List[str]:
-        """List available Gemini models.
-
-        Returns:
-            List of available model names.
-        """
-        try:
-            url = f"{self.base_url}/models"
-            params = {"key": self.api_key}
-            response = await self.client.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                models = []
-                for model in data.get("models", []):
-                    model_name = model.get("name", "")
-                    # Extract just the model identifier (e.g., "gemini-pro" from "models/gemini-pro")
-                    if "/" in model_name:
-                        model_name = model_name.split("/")[-1]
-                    models.append(model_name)
+    async def fetch_models(self) -> List[ModelInfo]:
+        """Fetch Gemini models with their input token limits."""
+        models = []
+        params = {"key": self.api_key, "pageSize": 1000}
+        while True:
+            response = await self.client.get("/models", params=params)
+            response.raise_for_status()
+            data = response.json()
+            for model in data.get("models", []):
+                model_name = model.get("name", "")
+                # Extract just the model identifier (e.g., "gemini-pro" from "models/gemini-pro")
+                if "/" in model_name:
+                    model_name = model_name.split("/")[-1]
+                models.append(
+                    ModelInfo(id=model_name, context_length=model.get("inputTokenLimit"))
+                )
+            if not data.get("nextPageToken"):
                 return models
-            return []
-        except Exception:
-            return []
+            params = {**params, "pageToken": data["nextPageToken"]}
 
     def get_capabilities(self) -> AdapterCapabilities:
         """Get Gemini adapter capabilities."""
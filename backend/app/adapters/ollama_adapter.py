@@ -1,18 +1,23 @@
 """Ollama (Local Llama) API adapter implementation."""
 
+import asyncio
 import json
 from typing import AsyncIterator, List, Optional
 
-import httpx
-
-from app.core.base_adapter import BaseLLMAdapter
+from app.core.base_adapter import HEALTH_CHECK_TIMEOUT, BaseLLMAdapter
+from app.core.http_transport import transport_registry
 from app.core.schemas import (
     AdapterCapabilities,
     LLMConfig,
     LLMResponse,
     Message,
-    StreamChunk,
+    ModelInfo,
 )
+from app.core.streaming import RawChunk
+
+# num_ctx Ollama runs a model with when neither the request nor the
+# Modelfile sets one; override with ``default_num_ctx`` in the provider block
+DEFAULT_NUM_CTX = 2048
 
 
 class OllamaAdapter(BaseLLMAdapter):
@@ -23,9 +28,11 @@ class OllamaAdapter(BaseLLMAdapter):
         super().__init__(config)
         self.base_url = config.base_url or "http://localhost:11434"
         self.timeout = config.timeout
-        self.client = httpx.AsyncClient(
+        self.client = transport_registry.create_client(
             base_url=self.base_url,
             timeout=self.timeout,
+            config=config.transport,
+            event_hooks={"response": [self._on_response]},
         )
 
     def _validate_config(self) -> None:
@@ -39,7 +46,7 @@ class OllamaAdapter(BaseLLMAdapter):
         for msg in messages:
             ollama_messages.append(
                 {
-                    "role": msg.role.value,
+                    "role": msg.role,
                     "content": msg.content,
                 }
             )
@@ -50,7 +57,7 @@ class OllamaAdapter(BaseLLMAdapter):
         messages: List[Message],
         stream: bool = False,
         **kwargs,
-    ) -> LLMResponse | AsyncIterator[StreamChunk]:
+    ) -> LLMResponse | AsyncIterator[RawChunk]:
         """Send chat completion request to Ollama."""
         normalized_messages = self.normalize_messages(messages)
 
@@ -69,6 +76,9 @@ class OllamaAdapter(BaseLLMAdapter):
         if self.config.max_tokens:
             params["options"]["num_predict"] = self.config.max_tokens
 
+        if stream:
+            return self._stream_response(params)
+
         response = await self.client.post("/api/chat", json=params)
 
         if response.status_code != 200:
@@ -76,79 +86,140 @@ class OllamaAdapter(BaseLLMAdapter):
                 f"Ollama API error: {response.status_code} - {response.text}"
             )
 
-        if stream:
-            return self._stream_response(response)
-        else:
-            return self._parse_response(response.json())
-
-    async def _stream_response(
-        self, response: httpx.Response
-    ) -> AsyncIterator[StreamChunk]:
-        """Stream Ollama responses."""
-        async for line in response.aiter_lines():
-            if line:
+        return self._parse_response(response.json())
+
+    async def _stream_response(self, params: dict) -> AsyncIterator[RawChunk]:
+        """Stream Ollama responses.
+
+        The NDJSON body is read line by line as Ollama generates it, so each
+        token is passed on as soon as it arrives. The final (``done``) chunk
+        carries token counts as ``usage`` and generation speed as ``timings``.
+        """
+        # Exiting the context closes the response, which stops generation
+        async with self.client.stream("POST", "/api/chat", json=params) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(
+                    f"Ollama API error: {response.status_code} - {response.text}"
+                )
+
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
                 try:
                     chunk_data = json.loads(line)
-                    content = chunk_data.get("message", {}).get("content", "")
-                    done = chunk_data.get("done", False)
-
-                    yield StreamChunk(
-                        content=content,
-                        finished=done,
-                        metadata={
-                            "model": chunk_data.get("model"),
-                            "done_reason": chunk_data.get("done_reason"),
-                        },
-                    )
                 except json.JSONDecodeError:
                     continue
+                if "error" in chunk_data:
+                    raise Exception(f"Ollama API error: {chunk_data['error']}")
+
+                done = chunk_data.get("done", False)
+                metadata = {
+                    "model": chunk_data.get("model"),
+                    "done_reason": chunk_data.get("done_reason"),
+                }
+                if done:
+                    metadata["finish_reason"] = chunk_data.get("done_reason")
+                    metadata["usage"] = self._usage(chunk_data)
+                    metadata["timings"] = self._timings(chunk_data)
+                yield RawChunk(
+                    content=chunk_data.get("message", {}).get("content", ""),
+                    finished=done,
+                    metadata=metadata,
+                )
+
+    @staticmethod
+    def _usage(data: dict) -> Optional[dict]:
+        """Token counts of a finished Ollama response."""
+        if "eval_count" not in data and "prompt_eval_count" not in data:
+            return None
+        return {
+            "prompt_tokens": data.get("prompt_eval_count", 0),
+            "completion_tokens": data.get("eval_count", 0),
+            "total_tokens": data.get("prompt_eval_count", 0) + data.get("eval_count", 0),
+        }
+
+    @staticmethod
+    def _timings(data: dict) -> dict:
+        """Durations (seconds) and speeds (tokens/s) of a finished response."""
+        timings = {}
+        for key in ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration"):
+            if data.get(key) is not None:
+                # Ollama reports nanoseconds
+                timings[key] = data[key] / 1e9
+        for count, duration, name in (
+            ("eval_count", "eval_duration", "tokens_per_second"),
+            ("prompt_eval_count", "prompt_eval_duration", "prompt_tokens_per_second"),
+        ):
+            if data.get(count) and data.get(duration):
+                timings[name] = round(data[count] / (data[duration] / 1e9), 2)
+        return timings
 
     def _parse_response(self, data: dict) -> LLMResponse:
         """Parse Ollama response to unified format."""
         message = data.get("message", {})
         content = message.get("content", "")
 
-        # Ollama doesn't provide detailed usage info in standard format
-        usage = None
-        if "eval_count" in data or "prompt_eval_count" in data:
-            usage = {
-                "prompt_tokens": data.get("prompt_eval_count", 0),
-                "completion_tokens": data.get("eval_count", 0),
-                "total_tokens": (
-                    data.get("prompt_eval_count", 0)
-                    + data.get("eval_count", 0)
-                ),
-            }
-
         return LLMResponse(
             content=content,
             model=data.get("model", self.config.model),
             finish_reason=data.get("done_reason"),
-            usage=usage,
+            usage=self._usage(data),
+            metadata={"timings": self._timings(data)} if data.get("done") else None,
         )
 
     async def health_check(self) -> bool:
         """Check Ollama API connectivity."""
         try:
-            response = await self.client.get("/api/tags", timeout=5)
+            response = await self.client.get("/api/version", timeout=HEALTH_CHECK_TIMEOUT)
             return response.status_code == 200
         except Exception:
             return False
 
-    async def list_models(self) -> List[str]:
-        """List available Ollama models.
-
-        Returns:
-            List of available model names.
+    async def fetch_models(self) -> List[ModelInfo]:
+        """Fetch the models pulled into the Ollama server with their context lengths."""
+        response = await self.client.get("/api/tags")
+        response.raise_for_status()
+        names = [model["name"] for model in response.json().get("models", [])]
+        lengths = await asyncio.gather(*(self._context_length(name) for name in names))
+        return [
+            ModelInfo(id=name, context_length=length) for name, length in zip(names, lengths)
+        ]
+
+    async def _context_length(self, model: str) -> Optional[int]:
+        """Context window Ollama runs ``model`` with, if it can be found.
+
+        Ollama truncates prompts to ``num_ctx``: the one this adapter sends
+        in its options, else the model's Modelfile parameter, else the
+        server default. The model's trained context length from
+        ``/api/show`` only caps that default; Ollama does not run with it.
         """
+        num_ctx = (self.config.extra_params or {}).get("num_ctx")
+        if num_ctx:
+            return int(num_ctx)
         try:
-            response = await self.client.get("/api/tags")
-            if response.status_code == 200:
-                data = response.json()
-                return [model["name"] for model in data.get("models", [])]
-            return []
+            response = await self.client.post("/api/show", json={"name": model})
+            response.raise_for_status()
+            data = response.json()
         except Exception:
-            return []
+            return None
+        # "parameters" holds Modelfile lines such as "num_ctx 8192"
+        for line in (data.get("parameters") or "").splitlines():
+            key, _, value = line.partition(" ")
+            if key == "num_ctx" and value.strip().isdigit():
+                return int(value.strip())
+        default = self._default_context_length()
+        for key, value in (data.get("model_info") or {}).items():
+            if key.endswith(".context_length") and isinstance(value, int):
+                return min(value, default)
+        return default
+
+    def _default_context_length(self) -> int:
+        """num_ctx Ollama runs any model with unless its Modelfile sets one."""
+        num_ctx = (self.config.extra_params or {}).get("num_ctx")
+        if num_ctx:
+            return int(num_ctx)
+        return int(getattr(self.config, "default_num_ctx", None) or DEFAULT_NUM_CTX)
 
     def get_capabilities(self) -> AdapterCapabilities:
         """Get Ollama adapter capabilities."""
@@ -158,8 +229,9 @@ class OllamaAdapter(BaseLLMAdapter):
             supports_streaming=True,
             supports_tools=False,  # Ollama doesn't support function calling yet
             supports_function_calling=False,
-            max_context_length=None,  # Varies by model
-            supported_models=[],  # Dynamic - fetched via list_models()
+            # Used until the catalog has the model's own num_ctx
+            max_context_length=self._default_context_length(),
+            supported_models=[],  # Dynamic - fetched via fetch_models()
         )
 
     async def close(self) -> None:
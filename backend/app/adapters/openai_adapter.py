@@ -6,15 +6,17 @@ from typing import AsyncIterator, List, Optional
 from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionChunk, ChatCompletionMessageParam
 
-from app.core.base_adapter import BaseLLMAdapter
+from app.core.base_adapter import HEALTH_CHECK_TIMEOUT, BaseLLMAdapter
+from app.core.http_transport import transport_registry
 from app.core.schemas import (
     AdapterCapabilities,
     LLMConfig,
     LLMResponse,
     Message,
-    MessageRole,
-    StreamChunk,
+    ModelInfo,
 )
+from app.core.streaming import RawChunk
+from app.core.tool_calls import ToolCallAssembler, make_tool_call
 
 
 class OpenAIAdapter(BaseLLMAdapter):
@@ -26,10 +28,20 @@ class OpenAIAdapter(BaseLLMAdapter):
         api_key = config.api_key or os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OpenAI API key is required")
+        base_url = config.base_url or "https://api.openai.com/v1"
         self.client = AsyncOpenAI(
             api_key=api_key,
-            base_url=config.base_url or "https://api.openai.com/v1",
+            base_url=base_url,
             timeout=config.timeout,
+            # Retries are handled by the chat service's retry policy
+            max_retries=0,
+            http_client=transport_registry.create_client(
+                base_url=base_url,
+                timeout=config.timeout,
+                config=config.transport,
+                follow_redirects=True,
+                event_hooks={"response": [self._on_response]},
+            ),
         )
 
     def _validate_config(self) -> None:
@@ -46,7 +58,7 @@ class OpenAIAdapter(BaseLLMAdapter):
         openai_messages = []
         for msg in messages:
             message_dict: ChatCompletionMessageParam = {
-                "role": msg.role.value,
+                "role": msg.role,
                 "content": msg.content,
             }
             if msg.name:
@@ -63,7 +75,7 @@ class OpenAIAdapter(BaseLLMAdapter):
         messages: List[Message],
         stream: bool = False,
         **kwargs,
-    ) -> LLMResponse | AsyncIterator[StreamChunk]:
+    ) -> LLMResponse | AsyncIterator[RawChunk]:
         """Send chat completion request to OpenAI."""
         normalized_messages = self.normalize_messages(messages)
 
@@ -86,37 +98,86 @@ class OpenAIAdapter(BaseLLMAdapter):
 
     async def _stream_response(
         self, params: dict
-    ) -> AsyncIterator[StreamChunk]:
-        """Stream OpenAI responses."""
+    ) -> AsyncIterator[RawChunk]:
+        """Stream OpenAI responses.
+
+        Unless ``stream_usage: false`` is set for the provider (for
+        OpenAI-compatible servers that reject ``stream_options``), token
+        usage is requested and arrives in a trailing chunk without choices,
+        so the finishing chunk is held back until then and carries it as
+        ``usage``.
+        """
         params["stream"] = True
+        stream_usage = getattr(self.config, "stream_usage", True)
+        if stream_usage:
+            params["extra_body"] = {
+                "stream_options": {"include_usage": True},
+                **(params.get("extra_body") or {}),
+            }
         stream = await self.client.chat.completions.create(**params)
 
-        async for chunk in stream:
-            if isinstance(chunk, ChatCompletionChunk):
-                delta = chunk.choices[0].delta if chunk.choices else None
-                if delta:
-                    content = delta.content or ""
-                    tool_calls = delta.tool_calls
-                    finished = chunk.choices[0].finish_reason is not None
-
-                    yield StreamChunk(
-                        content=content,
-                        finished=finished,
-                        tool_calls=[
-                            {
-                                "id": tc.id,
-                                "type": tc.type,
-                                "function": {
-                                    "name": tc.function.name,
-                                    "arguments": tc.function.arguments,
-                                },
-                            }
-                            for tc in tool_calls or []
-                        ]
-                        if tool_calls
-                        else None,
-                        metadata={"model": chunk.model, "id": chunk.id},
-                    )
+        assembler = ToolCallAssembler()
+        final: Optional[RawChunk] = None
+        usage = None
+        try:
+            async for chunk in stream:
+                if isinstance(chunk, ChatCompletionChunk):
+                    if getattr(chunk, "usage", None):
+                        usage = self._usage(chunk.usage)
+                    delta = chunk.choices[0].delta if chunk.choices else None
+                    if delta:
+                        content = delta.content or ""
+                        finished = chunk.choices[0].finish_reason is not None
+
+                        # Only complete calls are passed on, never fragments
+                        tool_calls = []
+                        for tc in delta.tool_calls or []:
+                            function = tc.function
+                            tool_calls += assembler.add(
+                                tc.index,
+                                tc.id,
+                                function.name if function else None,
+                                function.arguments if function else None,
+                            )
+                        if finished:
+                            tool_calls += assembler.finish()
+                        if delta.tool_calls and not (content or tool_calls or finished):
+                            continue
+
+                        raw = RawChunk(
+                            content=content,
+                            finished=finished,
+                            tool_calls=tool_calls or None,
+                            metadata={
+                                "model": chunk.model,
+                                "id": chunk.id,
+                                "finish_reason": chunk.choices[0].finish_reason,
+                            },
+                        )
+                        if finished and stream_usage:
+                            final = raw
+                        else:
+                            yield raw
+            if final is not None:
+                final.metadata["usage"] = usage
+                yield final
+            leftover = assembler.finish()
+            if leftover:
+                yield RawChunk(content="", tool_calls=leftover)
+        finally:
+            # Release the connection so an abandoned stream stops generating
+            await stream.response.aclose()
+
+    @staticmethod
+    def _usage(usage) -> dict:
+        """Convert streamed usage (a dict on older SDKs) to the unified shape."""
+        if not isinstance(usage, dict):
+            usage = usage.model_dump()
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+        }
 
     def _parse_response(self, response) -> LLMResponse:
         """Parse OpenAI response to unified format."""
@@ -126,14 +187,7 @@ class OpenAIAdapter(BaseLLMAdapter):
         tool_calls = None
         if message.tool_calls:
             tool_calls = [
-                {
-                    "id": tc.id,
-                    "type": tc.type,
-                    "function": {
-                        "name": tc.function.name,
-                        "arguments": tc.function.arguments,
-                    },
-                }
+                make_tool_call(tc.id, tc.function.name, tc.function.arguments)
                 for tc in message.tool_calls
             ]
 
@@ -152,14 +206,21 @@ class OpenAIAdapter(BaseLLMAdapter):
         )
 
     async def health_check(self) -> bool:
-        """Check OpenAI API connectivity."""
+        """Check OpenAI API connectivity.
+
+        Retrieves the configured model instead of listing every model.
+        """
         try:
-            # Simple health check - list models
-            await self.client.models.list()
+            await self.client.models.retrieve(self.config.model, timeout=HEALTH_CHECK_TIMEOUT)
             return True
         except Exception:
             return False
 
+    async def fetch_models(self) -> List[ModelInfo]:
+        """Fetch the models available to this API key."""
+        page = await self.client.models.list()
+        return [ModelInfo(id=model.id) for model in page.data]
+
     def get_capabilities(self) -> AdapterCapabilities:
         """Get OpenAI adapter capabilities."""
         return AdapterCapabilities(
@@ -178,3 +239,6 @@ class OpenAIAdapter(BaseLLMAdapter):
             ],
         )
 
+    async def close(self) -> None:
+        """Close the underlying HTTP client."""
+        await self.client.close()
@@ -0,0 +1,104 @@
+"""API routes for server-side conversation history."""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from app.core.conversations import conversation_store
+from app.core.schemas import Conversation, Message
+
+router = APIRouter(prefix="/api/v1/conversations", tags=["conversations"])
+
+
+class ConversationCreate(BaseModel):
+    """Request model for starting a conversation."""
+
+    title: Optional[str] = None
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    messages: List[Message] = []
+
+
+class ConversationUpdate(BaseModel):
+    """Request model for renaming or starring a conversation."""
+
+    title: Optional[str] = None
+    starred: Optional[bool] = None
+
+
+@router.post("", response_model=Conversation)
+async def create_conversation(request: ConversationCreate):
+    """Start a conversation; pass its id as ``conversation_id`` to /chat."""
+    return await conversation_store.create(
+        title=request.title,
+        provider=request.provider,
+        model=request.model,
+        messages=request.messages,
+    )
+
+
+@router.get("")
+async def list_conversations(
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    starred: Optional[bool] = None,
+):
+    """List conversations, most recently updated first.
+
+    Pass ``next_cursor`` back as ``cursor`` for the next page, and
+    ``starred=true`` for the Starred view.
+    """
+    try:
+        conversations, next_cursor = await conversation_store.list(limit, cursor, starred)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"conversations": conversations, "next_cursor": next_cursor}
+
+
+@router.get("/{conversation_id}", response_model=Conversation)
+async def get_conversation(conversation_id: str):
+    """Get a conversation's details."""
+    conversation = await conversation_store.get(conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail=f"Conversation '{conversation_id}' not found")
+    return conversation
+
+
+@router.patch("/{conversation_id}", response_model=Conversation)
+async def update_conversation(conversation_id: str, request: ConversationUpdate):
+    """Rename or (un)star a conversation."""
+    try:
+        return await conversation_store.update(
+            conversation_id, title=request.title, starred=request.starred
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Conversation '{conversation_id}' not found")
+
+
+@router.delete("/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """Delete a conversation and its messages."""
+    try:
+        await conversation_store.delete(conversation_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Conversation '{conversation_id}' not found")
+    return {"message": f"Conversation '{conversation_id}' deleted successfully"}
+
+
+@router.get("/{conversation_id}/messages")
+async def list_conversation_messages(
+    conversation_id: str,
+    limit: Optional[int] = Query(None, ge=1),
+    before: Optional[int] = Query(None, ge=0),
+):
+    """Page through a conversation's messages, newest page first.
+
+    Each page is in chronological order; pass ``previous`` back as
+    ``before`` to load the page preceding it.
+    """
+    try:
+        messages, previous = await conversation_store.messages(conversation_id, limit, before)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Conversation '{conversation_id}' not found")
+    return {"messages": messages, "previous": previous}
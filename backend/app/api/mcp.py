@@ -1,13 +1,21 @@
 """API routes for MCP server configuration."""
 
-import os
-import yaml
-from pathlib import Path
+import asyncio
 from typing import Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
 from pydantic import BaseModel
 
+from app.core.mcp_client import mcp_manager
+from app.core.mcp_config import (
+    PreconditionFailedError,
+    etag_matches,
+    is_weak_etag,
+    make_etag,
+    mcp_config,
+)
+from app.core.tool_catalog import tool_catalog
+
 router = APIRouter(prefix="/api/v1/settings/mcp", tags=["mcp"])
 
 
@@ -20,132 +28,150 @@ class MCPServerConfig(BaseModel):
     env: Optional[Dict[str, str]] = None
 
 
-def get_config_path() -> Path:
-    """Get the path to the config file."""
-    # Try project root config directory
-    config_path = Path(__file__).parent.parent.parent.parent / "config" / "config.yaml"
-    if not config_path.exists():
-        # Create directory if it doesn't exist
-        config_path.parent.mkdir(parents=True, exist_ok=True)
-        # Create empty config file
-        config_path.write_text(yaml.dump({"mcp_servers": {}}))
-    return config_path
-
-
-def load_config() -> Dict:
-    """Load configuration from YAML file."""
-    config_path = get_config_path()
-    
-    if not config_path.exists():
-        return {"mcp_servers": {}}
-
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f) or {}
-    
-    if "mcp_servers" not in config:
-        config["mcp_servers"] = {}
-    
-    return config
-
-
-def save_config(config: Dict) -> None:
-    """Save configuration to YAML file."""
-    config_path = get_config_path()
-    
-    # Ensure directory exists
-    config_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(config_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+def require_strong_etags(if_match: Optional[str]) -> None:
+    """Reject weak ETags in If-Match, which can never satisfy it (RFC 7232 3.1).
+
+    Raises:
+        HTTPException: 412 if ``if_match`` lists a weak ETag.
+    """
+    if if_match is not None and any(is_weak_etag(tag) for tag in if_match.split(",")):
+        raise HTTPException(status_code=412, detail="If-Match requires strong ETags")
+
+
+def server_view(name: str, server_config: Dict) -> Dict:
+    """Shape a stored server definition for API responses."""
+    return {
+        "name": name,
+        "command": server_config.get("command", ""),
+        "args": server_config.get("args", []),
+        "env": server_config.get("env", {}),
+    }
 
 
 @router.get("/servers", response_model=List[Dict])
-async def list_mcp_servers():
-    """List all configured MCP servers."""
-    config = load_config()
-    servers = config.get("mcp_servers", {})
-    
-    # Convert to list format
-    result = []
-    for name, server_config in servers.items():
-        result.append({
-            "name": name,
-            "command": server_config.get("command", ""),
-            "args": server_config.get("args", []),
-            "env": server_config.get("env", {}),
-        })
-    
-    return result
+async def list_mcp_servers(
+    response: Response, if_none_match: Optional[str] = Header(None)
+):
+    """List all configured MCP servers.
+
+    The response carries an ETag for the whole list; send it back in
+    If-None-Match to get a 304 when nothing changed.
+    """
+    servers = await mcp_config.servers()
+    etag = make_etag(servers)
+    if etag_matches(if_none_match, etag, weak=True):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return [server_view(name, server_config) for name, server_config in servers.items()]
 
 
 @router.post("/servers")
-async def save_mcp_server(server: MCPServerConfig):
-    """Save or update an MCP server configuration."""
-    config = load_config()
-    
-    if "mcp_servers" not in config:
-        config["mcp_servers"] = {}
-    
+async def save_mcp_server(
+    server: MCPServerConfig,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Save or update an MCP server configuration.
+
+    Send the server's ETag in If-Match to only overwrite the version you
+    read, or ``If-None-Match: *`` to only create a new server.
+    """
+    require_strong_etags(if_match)
+
     # Prepare server config
     server_config = {
         "command": server.command,
         "args": server.args,
     }
-    
+
     if server.env:
         server_config["env"] = server.env
-    
-    # Save to config
-    config["mcp_servers"][server.name] = server_config
-    
+
     try:
-        save_config(config)
-        return {
-            "message": f"MCP server '{server.name}' saved successfully",
-            "server": server.dict(),
-        }
+        etag = await mcp_config.save(
+            server.name, server_config, if_match=if_match, if_none_match=if_none_match
+        )
+    except PreconditionFailedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save config: {str(e)}")
 
+    response.headers["ETag"] = etag
+    return {
+        "message": f"MCP server '{server.name}' saved successfully",
+        "server": server.dict(),
+    }
+
 
 @router.delete("/servers/{server_name}")
-async def delete_mcp_server(server_name: str):
-    """Delete an MCP server configuration."""
-    config = load_config()
-    
-    if "mcp_servers" not in config:
-        config["mcp_servers"] = {}
-    
-    if server_name not in config["mcp_servers"]:
-        raise HTTPException(status_code=404, detail=f"MCP server '{server_name}' not found")
-    
-    # Remove server
-    del config["mcp_servers"][server_name]
-    
+async def delete_mcp_server(server_name: str, if_match: Optional[str] = Header(None)):
+    """Delete an MCP server configuration.
+
+    Send the server's ETag in If-Match to only delete the version you read.
+    """
+    require_strong_etags(if_match)
     try:
-        save_config(config)
-        return {"message": f"MCP server '{server_name}' deleted successfully"}
+        await mcp_config.delete(server_name, if_match=if_match)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"MCP server '{server_name}' not found")
+    except PreconditionFailedError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save config: {str(e)}")
 
+    return {"message": f"MCP server '{server_name}' deleted successfully"}
+
 
 @router.get("/servers/{server_name}")
-async def get_mcp_server(server_name: str):
-    """Get a specific MCP server configuration."""
-    config = load_config()
-    
-    if "mcp_servers" not in config:
-        config["mcp_servers"] = {}
-    
-    if server_name not in config["mcp_servers"]:
+async def get_mcp_server(
+    server_name: str, response: Response, if_none_match: Optional[str] = Header(None)
+):
+    """Get a specific MCP server configuration.
+
+    The response carries the server's ETag for conditional requests.
+    """
+    server_config = await mcp_config.get(server_name)
+    if server_config is None:
         raise HTTPException(status_code=404, detail=f"MCP server '{server_name}' not found")
-    
-    server_config = config["mcp_servers"][server_name]
-    
-    return {
-        "name": server_name,
-        "command": server_config.get("command", ""),
-        "args": server_config.get("args", []),
-        "env": server_config.get("env", {}),
-    }
 
+    etag = make_etag(server_config)
+    if etag_matches(if_none_match, etag, weak=True):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return server_view(server_name, server_config)
+
+
+@router.get("/status")
+async def mcp_server_status():
+    """State of launched MCP server processes (pid, uptime, restarts)."""
+    return mcp_manager.snapshot()
+
+
+@router.get("/tools")
+async def list_mcp_tools():
+    """Tools offered by each configured MCP server.
+
+    Served from the tool catalog, so servers are only asked for their tools
+    again after they report a change, are reconfigured or restart.
+    """
+    names = list(await mcp_config.servers())
+    results = await asyncio.gather(
+        *(tool_catalog.server_tools(name) for name in names), return_exceptions=True
+    )
+    servers = []
+    for name, tools in zip(names, results):
+        if isinstance(tools, Exception):
+            servers.append({"name": name, "status": "error", "error": str(tools), "tools": []})
+            continue
+        servers.append({
+            "name": name,
+            "status": "connected",
+            "tools": [
+                {"name": tool["name"], "description": tool.get("description", ""), "server": name}
+                for tool in tools
+            ],
+        })
+    return servers
@@ -1,14 +1,34 @@
 """API routes for chat and LLM operations."""
 
-import os
-from typing import Optional
+import json
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
 from app.core.adapter_factory import AdapterFactory
-from app.core.schemas import Message, LLMResponse
+from app.core.adapter_pool import adapter_pool
+from app.core.bulkhead import BulkheadRejectedError
+from app.core.chat_service import chat_service
+from app.core.circuit_breaker import CircuitOpenError, circuit_breakers
+from app.core.conversations import conversation_store
+from app.core.config import get_env_llm_config
+from app.core.model_catalog import model_catalog
+from app.core.rate_limiter import RateLimitedError
+from app.core.response_cache import CACHE_BYPASS, cache_mode, response_cache
+from app.core.routing import provider_router
+from app.core.schemas import LLMResponse, Message, MessageRole, ToolLoopEvent
+from app.core.streaming import (
+    RawChunk,
+    aclose_stream,
+    cancel_on_disconnect,
+    encode_sse,
+    stream_coalescer,
+    stream_stats,
+)
+from app.core.tool_loop import tool_loop
 
 router = APIRouter(prefix="/api/v1", tags=["chat"])
 
@@ -16,66 +36,236 @@ router = APIRouter(prefix="/api/v1", tags=["chat"])
 class ChatRequest(BaseModel):
     """Request model for chat completion."""
 
-    provider: str
+    provider: str  # Provider name, or a route name such as "auto"
     messages: list[Message]
     model: Optional[str] = None
     stream: bool = False
+    use_tools: bool = False  # Run MCP tool calls on the server until the model answers
+    mcp_servers: Optional[List[str]] = None  # Servers offering tools; None means all
+    # Stored conversation to continue; ``messages`` then holds only the new ones
+    conversation_id: Optional[str] = None
+
+
+async def load_history(request: ChatRequest) -> List[Message]:
+    """Full conversation for a request: stored history plus the new messages."""
+    if not request.conversation_id:
+        return request.messages
+    try:
+        history = await conversation_store.history(request.conversation_id)
+    except KeyError:
+        raise HTTPException(
+            status_code=404, detail=f"Conversation '{request.conversation_id}' not found"
+        )
+    return history + request.messages
+
+
+async def record_turn(request: ChatRequest, result: LLMResponse) -> None:
+    """Append the new messages and the answer to the request's conversation."""
+    if not request.conversation_id:
+        return
+    # Tool loops report the tool calls and results they added
+    added = [Message(**msg) for msg in (result.metadata or {}).get("messages", [])]
+    answer = Message(
+        role=MessageRole.ASSISTANT, content=result.content, tool_calls=result.tool_calls
+    )
+    await conversation_store.append(
+        request.conversation_id,
+        [*request.messages, *added, answer],
+        provider=(result.metadata or {}).get("provider", request.provider),
+        model=result.model or request.model,
+    )
 
 
 @router.post("/chat", response_model=LLMResponse)
-async def chat_completion(request: ChatRequest):
+async def chat_completion(request: ChatRequest, http_request: Request, response: Response):
     """Send a chat completion request.
 
+    Non-streaming responses may be served from the response cache; send
+    ``Cache-Control: no-cache`` to refresh an entry, or ``no-store`` (or
+    ``X-Cache-Bypass: 1``) to skip the cache. ``X-Cache`` reports the outcome.
+
+    With ``use_tools`` the server runs the MCP tool calls the model makes and
+    calls the model again until it answers; streaming then sends the loop's
+    progress as SSE events (``step``, ``tool_call``, ``tool_result``,
+    ``limit``, ``error``) ending with a ``message`` event.
+
+    With ``conversation_id`` only the new messages are sent; the server
+    prepends the stored history and records the new messages and the answer
+    once the response is complete.
+
     Args:
         request: Chat request containing provider, messages, model, and stream flag.
+        http_request: Incoming HTTP request, used to detect client disconnects
+            and read cache headers.
+        response: Outgoing response, used to set the ``X-Cache`` header.
 
     Returns:
         LLMResponse or streaming response.
     """
+    messages = await load_history(request)
     try:
         # Get API key from environment if available
-        env_key = f"{request.provider.upper()}_API_KEY"
-        api_key = os.getenv(env_key)
-        
-        config = None
-        if api_key:
-            # Build provider-specific config
-            config = {"api_key": api_key}
-            if request.provider == "openai":
-                config["base_url"] = "https://api.openai.com/v1"
-                config["model"] = request.model or "gpt-4"
-            elif request.provider == "anthropic":
-                config["base_url"] = "https://api.anthropic.com"
-                config["model"] = request.model or "claude-3-5-sonnet-20241022"
-            elif request.provider == "gemini":
-                config["base_url"] = "https://generativelanguage.googleapis.com/v1"
-                config["model"] = request.model or "gemini-pro"
-            elif request.provider == "ollama":
-                config["base_url"] = "http://localhost:11434"
-                config["model"] = request.model or "llama2"
-                # Ollama doesn't need API key
-        
-        adapter = AdapterFactory.create(
-            request.provider, config=config, model=request.model
-        )
+        config = get_env_llm_config(request.provider, request.model)
+
+        if request.use_tools:
+            return await run_tool_loop(request, messages, config, http_request)
 
         if request.stream:
+            chunks = await open_stream(request, messages, config)
+
             # Return SSE stream
             async def generate():
-                async for chunk in adapter.chat(request.messages, stream=True):
-                    yield {
-                        "data": chunk.model_dump_json(),
-                    }
+                async with aclosing(
+                    cancel_on_disconnect(
+                        chunks, http_request.is_disconnected, label=request.provider
+                    )
+                ) as relay:
+                    try:
+                        async for chunk in relay:
+                            yield encode_sse(chunk)
+                    except Exception as e:
+                        # Headers are gone; report the failure in the stream instead
+                        yield {"event": "error", "data": json.dumps({"detail": str(e)})}
             return EventSourceResponse(generate())
         else:
-            response = await adapter.chat(request.messages, stream=False)
-            await adapter.close()
-            return response
+            mode = cache_mode(http_request.headers)
+            result = await chat_service.complete(
+                request.provider,
+                messages,
+                config=config,
+                model=request.model,
+                cache_mode=mode,
+            )
+            if mode == CACHE_BYPASS:
+                response.headers["X-Cache"] = "BYPASS"
+            elif (result.metadata or {}).get("cache") == "hit":
+                response.headers["X-Cache"] = "HIT"
+            else:
+                response.headers["X-Cache"] = "MISS"
+            await record_turn(request, result)
+            return result
 
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+        raise http_exception(e)
+
+
+def http_exception(e: Exception) -> HTTPException:
+    """HTTP error reported for a failed chat request."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, (BulkheadRejectedError, CircuitOpenError, RateLimitedError)):
+        return HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    if isinstance(e, ValueError):
+        return HTTPException(status_code=400, detail=str(e))
+    return HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+async def open_stream(
+    request: ChatRequest, messages: List[Message], config: dict
+) -> AsyncIterator[RawChunk]:
+    """Start streaming a chat request's answer.
+
+    The first chunk has arrived when this returns, so admission and
+    provider failures before it raise here; later failures are raised
+    while iterating. Tiny deltas are coalesced when enabled, and a
+    complete answer is recorded to the request's conversation before its
+    finishing chunk is passed on.
+    """
+    chunks = await chat_service.stream(
+        request.provider, messages, config=config, model=request.model
+    )
+    # Merges tiny deltas into fewer frames when enabled
+    chunks = stream_coalescer.wrap(chunks)
+    if not request.conversation_id:
+        return chunks
+
+    async def recorded():
+        content, tool_calls = [], []
+        try:
+            async for chunk in chunks:
+                content.append(chunk.content)
+                tool_calls.extend(chunk.tool_calls or [])
+                # Only complete answers become part of the conversation
+                if chunk.finished:
+                    await record_turn(
+                        request,
+                        LLMResponse(
+                            content="".join(content),
+                            model=request.model or "",
+                            tool_calls=tool_calls or None,
+                        ),
+                    )
+                yield chunk
+        finally:
+            await aclose_stream(chunks)
+    return recorded()
+
+
+async def open_tool_loop(
+    request: ChatRequest, messages: List[Message], config: dict
+) -> AsyncIterator[ToolLoopEvent]:
+    """Start a streamed tool loop for a chat request.
+
+    The first event has arrived when this returns, so configuration errors
+    raise here. The final answer is recorded to the request's conversation
+    before its ``message`` event is passed on.
+    """
+    events = tool_loop.run(
+        request.provider,
+        messages,
+        config=config,
+        model=request.model,
+        servers=request.mcp_servers,
+    )
+    try:
+        first = await events.__anext__()
+    except BaseException:
+        await events.aclose()
+        raise
+
+    async def relay():
+        try:
+            event = first
+            while True:
+                if event.type == "message":
+                    await record_turn(request, LLMResponse.model_validate(event.data))
+                yield event
+                event = await events.__anext__()
+        except StopAsyncIteration:
+            return
+        finally:
+            await events.aclose()
+    return relay()
+
+
+async def run_tool_loop(
+    request: ChatRequest, messages: List[Message], config: dict, http_request: Request
+):
+    """Serve a chat request through the server-side tool loop."""
+    if not request.stream:
+        result = await tool_loop.complete(
+            request.provider,
+            messages,
+            config=config,
+            model=request.model,
+            servers=request.mcp_servers,
+        )
+        await record_turn(request, result)
+        return result
+
+    events = await open_tool_loop(request, messages, config)
+
+    async def generate():
+        async with aclosing(
+            cancel_on_disconnect(events, http_request.is_disconnected, label=request.provider)
+        ) as relay:
+            try:
+                async for event in relay:
+                    yield {"event": event.type, "data": event.model_dump_json()}
+            except Exception as e:
+                # Headers are gone; report the failure in the stream instead
+                yield {"event": "error", "data": json.dumps({"detail": str(e)})}
+    return EventSourceResponse(generate())
 
 
 @router.get("/providers")
@@ -85,18 +275,50 @@ async def list_providers():
     return {"providers": providers}
 
 
+@router.get("/routes")
+async def list_routes():
+    """List routes with their targets in current preference order."""
+    try:
+        return {"routes": provider_router.snapshot()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/cache")
+async def cache_stats():
+    """Response cache hit/miss counters and size."""
+    return await response_cache.snapshot()
+
+
+@router.delete("/cache")
+async def clear_cache():
+    """Remove every cached response."""
+    await response_cache.clear()
+    return {"status": "cleared"}
+
+
+@router.get("/streams")
+async def stream_counters():
+    """How relayed streams ended: completed, cancelled by the client, or failed."""
+    return stream_stats.as_dict()
+
+
 @router.get("/providers/{provider}/health")
 async def provider_health(provider: str):
-    """Check health of a specific provider."""
+    """Check health of a specific provider.
+
+    Runs the adapter's lightweight probe and reports the circuit breaker
+    state built from real traffic.
+    """
     try:
-        adapter = AdapterFactory.create(provider)
-        is_healthy = await adapter.health_check()
-        capabilities = adapter.get_capabilities()
-        await adapter.close()
+        async with adapter_pool.lease(provider) as adapter:
+            is_healthy = await adapter.health_check()
+            capabilities = model_catalog.capabilities(adapter)
 
         return {
             "provider": provider,
             "healthy": is_healthy,
+            "circuit": circuit_breakers.get(provider).as_dict(),
             "capabilities": capabilities.dict(),
         }
     except Exception as e:
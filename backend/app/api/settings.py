@@ -1,12 +1,16 @@
 """API routes for settings and API key management."""
 
 import os
-from typing import Dict, Optional
+from typing import Dict
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from app.core.adapter_factory import AdapterFactory
+from app.core.adapter_pool import adapter_pool
+from app.core.model_catalog import model_catalog
+from app.core.provider_status import provider_status
+from app.core.schemas import ModelInfo, ProviderStatus
 
 router = APIRouter(prefix="/api/v1/settings", tags=["settings"])
 
@@ -26,16 +30,6 @@ class APIKeyResponse(BaseModel):
     message: str
 
 
-class ProviderStatus(BaseModel):
-    """Provider status information."""
-
-    provider: str
-    configured: bool
-    healthy: bool
-    available_models: list[str] = []
-    error: Optional[str] = None
-
-
 @router.post("/api-keys", response_model=APIKeyResponse)
 async def set_api_key(request: APIKeyRequest):
     """Set API key for a provider.
@@ -49,6 +43,10 @@ async def set_api_key(request: APIKeyRequest):
     # Set in environment (session-only)
     env_key = f"{request.provider.upper()}_API_KEY"
     os.environ[env_key] = request.api_key
+    # Drop warm adapters, statuses and model lists tied to the previous key
+    await adapter_pool.invalidate(request.provider)
+    provider_status.invalidate(request.provider)
+    model_catalog.invalidate(request.provider)
 
     return APIKeyResponse(
         provider=request.provider,
@@ -71,77 +69,29 @@ async def check_api_key(provider: str):
 
 @router.get("/providers/status", response_model=list[ProviderStatus])
 async def get_providers_status():
-    """Get status of all providers (configured, healthy, available models)."""
-    providers = AdapterFactory.get_supported_providers()
-    statuses = []
-
-    for provider in providers:
-        env_key = f"{provider.upper()}_API_KEY"
-        api_key = os.getenv(env_key)
-        configured = api_key is not None and api_key != ""
-
-        healthy = False
-        available_models = []
-        error = None
-
-        if configured:
-            try:
-                # Try to create adapter and check health
-                config = {
-                    "api_key": api_key,
-                    "model": "default",  # Temporary model
-                    "base_url": "",
-                }
-
-                # Set appropriate defaults
-                if provider == "openai":
-                    config["model"] = "gpt-4"
-                    config["base_url"] = "https://api.openai.com/v1"
-                elif provider == "anthropic":
-                    config["model"] = "claude-3-5-sonnet-20241022"
-                    config["base_url"] = "https://api.anthropic.com"
-                elif provider == "gemini":
-                    config["model"] = "gemini-pro"
-                    config["base_url"] = "https://generativelanguage.googleapis.com/v1"
-                elif provider == "ollama":
-                    config["model"] = "llama2"
-                    config["base_url"] = "http://localhost:11434"
-                    # Ollama doesn't need API key
-                    configured = True
-
-                adapter = AdapterFactory.create(provider, config=config)
-                healthy = await adapter.health_check()
-
-                # Get available models
-                capabilities = adapter.get_capabilities()
-                available_models = capabilities.supported_models
-
-                # Some adapters can list models dynamically
-                if hasattr(adapter, "list_models"):
-                    try:
-                        dynamic_models = await adapter.list_models()
-                        if dynamic_models:
-                            available_models = dynamic_models
-                    except Exception:
-                        pass
-
-                await adapter.close()
-
-            except Exception as e:
-                error = str(e)
-                healthy = False
-
-        statuses.append(
-            ProviderStatus(
-                provider=provider,
-                configured=configured,
-                healthy=healthy,
-                available_models=available_models,
-                error=error,
-            )
-        )
-
-    return statuses
+    """Get status of all providers (configured, healthy, available models).
+
+    Statuses are served from a short-lived cache that is refreshed in the
+    background, so this returns quickly even when a provider is slow.
+    """
+    return await provider_status.statuses()
+
+
+@router.get("/providers/{provider}/models", response_model=list[ModelInfo])
+async def get_provider_models(provider: str, refresh: bool = False):
+    """List a provider's models with context lengths where known.
+
+    Served from the model catalog; pass ``refresh=true`` to fetch the list
+    from the provider now.
+    """
+    if provider not in AdapterFactory.get_supported_providers():
+        raise HTTPException(status_code=400, detail=f"Unsupported provider: {provider}")
+    if not refresh:
+        return await model_catalog.models(provider)
+    try:
+        return await model_catalog.refresh(provider)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Could not list {provider} models: {e}")
 
 
 @router.delete("/api-keys/{provider}")
@@ -153,6 +103,9 @@ async def delete_api_key(provider: str):
     env_key = f"{provider.upper()}_API_KEY"
     if env_key in os.environ:
         del os.environ[env_key]
+    await adapter_pool.invalidate(provider)
+    provider_status.invalidate(provider)
+    model_catalog.invalidate(provider)
 
     return {"message": f"API key removed for {provider}"}
 
@@ -0,0 +1,234 @@
+"""WebSocket endpoint multiplexing chat streams over one connection."""
+
+import asyncio
+import json
+import logging
+from contextlib import aclosing
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, WebSocket
+from pydantic import BaseModel, ValidationError
+
+from app.api.router import (
+    ChatRequest,
+    http_exception,
+    load_history,
+    open_stream,
+    open_tool_loop,
+)
+from app.core.config import get_env_llm_config, load_config
+from app.core.schemas import WebSocketConfig
+from app.core.streaming import chunk_data, dumps
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1", tags=["chat"])
+
+
+class ClientMessage(BaseModel):
+    """Message sent by the client over the chat WebSocket."""
+
+    type: str  # "chat", "cancel" or "ack"
+    id: str  # Stream the message is about, chosen by the client
+    request: Optional[ChatRequest] = None  # For "chat"
+    frames: int = 1  # For "ack": frames the client has processed
+
+
+class _Stream:
+    """One chat stream running on a connection."""
+
+    __slots__ = ("task", "window", "credits", "credit_changed")
+
+    def __init__(self, window: int):
+        self.task: Optional[asyncio.Task] = None
+        self.window = window
+        # Frames that may be sent before the client acknowledges more
+        self.credits = window
+        self.credit_changed = asyncio.Condition()
+
+    async def take_credit(self) -> None:
+        """Wait until a frame may be sent, and count it as outstanding."""
+        if self.window <= 0:
+            return
+        async with self.credit_changed:
+            await self.credit_changed.wait_for(lambda: self.credits > 0)
+            self.credits -= 1
+
+    async def grant(self, frames: int) -> None:
+        """Return credit for acknowledged frames, never beyond the window."""
+        if self.window <= 0:
+            return
+        async with self.credit_changed:
+            self.credits = min(self.window, self.credits + max(frames, 0))
+            self.credit_changed.notify_all()
+
+
+class ChatMultiplexer:
+    """Serves concurrent chat streams over a single WebSocket.
+
+    Each ``chat`` message starts a stream under a client-chosen id, through
+    the same pipeline as ``POST /api/v1/chat`` with ``stream: true``
+    (coalescing, tool loop and conversation recording included). Every
+    frame sent back carries the stream's id. ``cancel`` stops a stream and
+    its upstream provider call.
+
+    Flow control is credit based: a stream sends at most ``window`` chunk
+    or event frames the client has not acknowledged with ``ack``, after
+    which it stops reading from the provider until credit arrives. Acks
+    never raise a stream's credit above ``window``. Frames from all streams
+    go through one bounded send queue, so a slow socket pauses every stream
+    instead of buffering without limit.
+    """
+
+    def __init__(self, websocket: WebSocket, config: WebSocketConfig):
+        """Initialize the multiplexer.
+
+        Args:
+            websocket: Accepted connection.
+            config: Stream limits and flow control settings.
+        """
+        self.websocket = websocket
+        self.config = config
+        self.streams: Dict[str, _Stream] = {}
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=config.send_queue_size)
+
+    async def run(self) -> None:
+        """Serve the connection until the client disconnects."""
+        writer = asyncio.create_task(self._write())
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                text = message.get("text")
+                if text is None:
+                    # A binary frame is a client error, not a reason to drop every stream
+                    await self._send(None, "error", status_code=400, detail="Text frames only")
+                    continue
+                await self._handle(text)
+        finally:
+            tasks = [stream.task for stream in self.streams.values() if stream.task]
+            self.streams.clear()
+            for task in tasks:
+                task.cancel()
+            writer.cancel()
+            await asyncio.gather(*tasks, writer, return_exceptions=True)
+
+    async def _handle(self, text: str) -> None:
+        """Act on one client message."""
+        try:
+            message = ClientMessage.model_validate_json(text)
+        except ValidationError as e:
+            await self._send(self._raw_id(text), "error", status_code=400, detail=str(e))
+            return
+
+        if message.type == "chat":
+            if message.request is None:
+                await self._send(message.id, "error", status_code=400, detail="Missing request")
+            elif message.id in self.streams:
+                await self._send(
+                    message.id,
+                    "error",
+                    status_code=409,
+                    detail=f"Stream '{message.id}' is already running",
+                )
+            elif len(self.streams) >= self.config.max_streams:
+                await self._send(
+                    message.id,
+                    "error",
+                    status_code=429,
+                    detail=f"At most {self.config.max_streams} streams may run at once",
+                )
+            else:
+                stream = _Stream(self.config.window)
+                self.streams[message.id] = stream
+                stream.task = asyncio.create_task(
+                    self._serve(message.id, message.request, stream)
+                )
+        elif message.type == "cancel":
+            stream = self.streams.pop(message.id, None)
+            if stream is not None:
+                stream.task.cancel()
+                await self._send(message.id, "cancelled")
+        elif message.type == "ack":
+            stream = self.streams.get(message.id)
+            # Acks for streams that already ended are harmless
+            if stream is not None:
+                await stream.grant(message.frames)
+        else:
+            await self._send(
+                message.id, "error", status_code=400, detail=f"Unknown type '{message.type}'"
+            )
+
+    async def _serve(self, stream_id: str, request: ChatRequest, stream: _Stream) -> None:
+        """Run one chat stream, sending its frames tagged with ``stream_id``."""
+        try:
+            messages = await load_history(request)
+            config = get_env_llm_config(request.provider, request.model)
+            if request.use_tools:
+                items = await open_tool_loop(request, messages, config)
+            else:
+                items = await open_stream(request, messages, config)
+
+            async with aclosing(items):
+                async for item in items:
+                    await stream.take_credit()
+                    if request.use_tools:
+                        await self._send(
+                            stream_id, "event", event=item.type, data=item.model_dump(mode="json")
+                        )
+                    else:
+                        await self._send(stream_id, "chunk", data=chunk_data(item))
+            await self._send(stream_id, "done")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = http_exception(e)
+            await self._send(stream_id, "error", status_code=error.status_code, detail=error.detail)
+        finally:
+            if self.streams.get(stream_id) is stream:
+                del self.streams[stream_id]
+
+    async def _send(self, stream_id: Optional[str], frame_type: str, **fields: Any) -> None:
+        """Queue a frame for the client."""
+        await self.outbox.put(dumps({"id": stream_id, "type": frame_type, **fields}).decode())
+
+    async def _write(self) -> None:
+        """Send queued frames one at a time; WebSocket sends must not interleave."""
+        try:
+            while True:
+                await self.websocket.send_text(await self.outbox.get())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The receive loop notices the disconnect and cleans up
+            logger.debug("WebSocket send failed", exc_info=True)
+
+    @staticmethod
+    def _raw_id(text: str) -> Optional[str]:
+        """Best-effort stream id of a message that failed validation."""
+        try:
+            stream_id = json.loads(text).get("id")
+        except (ValueError, AttributeError):
+            return None
+        return stream_id if isinstance(stream_id, str) else None
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """Multiplex chat streams over one WebSocket.
+
+    Client messages (JSON text frames, ``id`` chosen by the client)::
+
+        {"type": "chat", "id": "a", "request": {...same body as POST /chat...}}
+        {"type": "cancel", "id": "a"}
+        {"type": "ack", "id": "a", "frames": 16}
+
+    Server frames carry the stream's ``id`` and a ``type``: ``chunk`` (a
+    StreamChunk in ``data``), ``event`` (a tool loop event named by
+    ``event``), then one of ``done``, ``cancelled`` or ``error``
+    (``status_code`` and ``detail``, as the HTTP endpoint would report).
+    """
+    await websocket.accept()
+    config = WebSocketConfig(**(load_config().get("websocket") or {}))
+    await ChatMultiplexer(websocket, config).run()
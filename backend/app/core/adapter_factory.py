@@ -3,7 +3,7 @@
 from typing import Dict, Optional
 
 from app.adapters import AnthropicAdapter, GeminiAdapter, OllamaAdapter, OpenAIAdapter
-from app.core.config import get_llm_config
+from app.core.config import get_provider_config
 from app.core.schemas import LLMConfig
 
 
@@ -34,6 +34,31 @@ class AdapterFactory:
         Returns:
             Initialized adapter instance.
 
+        Raises:
+            ValueError: If provider is not supported.
+        """
+        llm_config = cls.build_config(provider, config=config, model=model)
+
+        # Instantiate adapter
+        return cls.create_from_config(llm_config)
+
+    @classmethod
+    def build_config(
+        cls,
+        provider: str,
+        config: Optional[Dict] = None,
+        model: Optional[str] = None,
+    ) -> LLMConfig:
+        """Resolve the LLMConfig an adapter for ``provider`` would be built with.
+
+        Args:
+            provider: Provider name (e.g., 'openai', 'anthropic', 'ollama').
+            config: Optional provider config dict. If None, loads from file.
+            model: Optional model name override.
+
+        Returns:
+            Validated LLMConfig.
+
         Raises:
             ValueError: If provider is not supported.
         """
@@ -43,23 +68,37 @@ class AdapterFactory:
                 f"Supported: {list(cls._adapters.keys())}"
             )
 
-        # Load config
+        # Settings from config.yaml are validated once per file change
         if config is None:
-            config = get_llm_config(provider)
+            llm_config = get_provider_config(provider)
+            if model and model != llm_config.model:
+                llm_config = llm_config.model_copy(update={"model": model})
+            return llm_config
+
+        config = dict(config)
 
         # Override model if provided
         if model:
             config["model"] = model
 
-        # Create LLMConfig
-        llm_config = LLMConfig(
+        return LLMConfig(
             provider=provider,
             **config,
         )
 
-        # Instantiate adapter
-        adapter_class = cls._adapters[provider]
-        return adapter_class(llm_config)
+    @classmethod
+    def create_from_config(
+        cls, llm_config: LLMConfig
+    ) -> OpenAIAdapter | AnthropicAdapter | OllamaAdapter | GeminiAdapter:
+        """Instantiate an adapter from an already resolved LLMConfig.
+
+        Args:
+            llm_config: Resolved provider configuration.
+
+        Returns:
+            Initialized adapter instance.
+        """
+        return cls._adapters[llm_config.provider](llm_config)
 
     @classmethod
     def get_supported_providers(cls) -> list[str]:
@@ -0,0 +1,211 @@
+"""Pool of long-lived LLM adapters shared across requests."""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.base_adapter import BaseLLMAdapter
+from app.core.config import config_store
+from app.core.schemas import LLMConfig
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str, str, str]
+
+
+def credential_fingerprint(api_key: Optional[str]) -> str:
+    """Return a short, non-reversible fingerprint of an API key.
+
+    Args:
+        api_key: API key or None.
+
+    Returns:
+        Hex digest prefix, or an empty string when no key is set.
+    """
+    if not api_key:
+        return ""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class _PoolEntry:
+    """Bookkeeping for a pooled adapter."""
+
+    __slots__ = ("adapter", "leases", "retired")
+
+    def __init__(self, adapter: BaseLLMAdapter):
+        self.adapter = adapter
+        self.leases = 0
+        self.retired = False
+
+
+class AdapterPool:
+    """Keeps warm adapter instances (and their HTTP connections) alive.
+
+    Adapters are keyed by (provider, model, base_url, credential fingerprint),
+    so a changed API key or model automatically maps to a different adapter.
+    Callers lease an adapter with :meth:`acquire` and hand it back with
+    :meth:`release`; adapters that are invalidated while leased are closed
+    once their last lease is released.
+    """
+
+    def __init__(self, max_idle: int = 32):
+        """Initialize the pool.
+
+        Args:
+            max_idle: Maximum number of pooled adapters kept around. The least
+                recently used idle adapters are closed beyond this limit.
+        """
+        self.max_idle = max_idle
+        self._entries: "OrderedDict[PoolKey, _PoolEntry]" = OrderedDict()
+        self._leased: Dict[int, _PoolEntry] = {}
+        self._closing: List[asyncio.Task] = []
+
+    @staticmethod
+    def make_key(config: LLMConfig) -> PoolKey:
+        """Build the pool key for a resolved provider config."""
+        return (
+            config.provider,
+            config.model,
+            config.base_url or "",
+            credential_fingerprint(config.api_key),
+        )
+
+    def acquire(
+        self,
+        provider: str,
+        config: Optional[Dict] = None,
+        model: Optional[str] = None,
+    ) -> BaseLLMAdapter:
+        """Lease a pooled adapter, creating it on first use.
+
+        Args:
+            provider: Provider name.
+            config: Optional provider config dict. If None, loads from file.
+            model: Optional model name override.
+
+        Returns:
+            Adapter instance. Must be handed back with :meth:`release`.
+
+        Raises:
+            ValueError: If the provider or its configuration is invalid.
+        """
+        llm_config = AdapterFactory.build_config(provider, config=config, model=model)
+        key = self.make_key(llm_config)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PoolEntry(AdapterFactory.create_from_config(llm_config))
+            self._entries[key] = entry
+            self._evict_idle()
+        else:
+            self._entries.move_to_end(key)
+
+        entry.leases += 1
+        self._leased[id(entry.adapter)] = entry
+        return entry.adapter
+
+    async def release(self, adapter: BaseLLMAdapter) -> None:
+        """Return a leased adapter to the pool.
+
+        Args:
+            adapter: Adapter previously obtained from :meth:`acquire`.
+        """
+        entry = self._leased.get(id(adapter))
+        if entry is None:
+            return
+        entry.leases -= 1
+        if entry.leases <= 0:
+            del self._leased[id(adapter)]
+            if entry.retired:
+                await self._close_adapter(entry.adapter)
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        provider: str,
+        config: Optional[Dict] = None,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[BaseLLMAdapter]:
+        """Context manager around :meth:`acquire`/:meth:`release`."""
+        adapter = self.acquire(provider, config=config, model=model)
+        try:
+            yield adapter
+        finally:
+            await self.release(adapter)
+
+    async def invalidate(self, provider: Optional[str] = None) -> None:
+        """Drop pooled adapters so the next request builds fresh ones.
+
+        Args:
+            provider: Only invalidate adapters for this provider. If None,
+                every pooled adapter is invalidated.
+        """
+        for key in [k for k in self._entries if provider is None or k[0] == provider]:
+            await self._retire(self._entries.pop(key))
+
+    def on_config_change(self, providers: Set[str]) -> None:
+        """Swap out adapters whose provider settings changed in config.yaml.
+
+        Requests already holding one finish on it; the next lease builds a
+        fresh adapter from the new settings.
+        """
+        for key in [k for k in self._entries if k[0] in providers]:
+            entry = self._entries.pop(key)
+            entry.retired = True
+            if entry.leases <= 0:
+                self._schedule_close(entry.adapter)
+
+    async def close(self) -> None:
+        """Close every pooled adapter. Called on application shutdown."""
+        await self.invalidate()
+        for entry in list(self._leased.values()):
+            await self._close_adapter(entry.adapter)
+        self._leased.clear()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+            self._closing.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _retire(self, entry: _PoolEntry) -> None:
+        entry.retired = True
+        if entry.leases <= 0:
+            await self._close_adapter(entry.adapter)
+
+    def _evict_idle(self) -> None:
+        while len(self._entries) > self.max_idle:
+            for key, entry in self._entries.items():
+                if entry.leases <= 0:
+                    del self._entries[key]
+                    entry.retired = True
+                    self._schedule_close(entry.adapter)
+                    break
+            else:
+                # Everything is leased; let the pool grow temporarily.
+                return
+
+    def _schedule_close(self, adapter: BaseLLMAdapter) -> None:
+        try:
+            task = asyncio.get_running_loop().create_task(self._close_adapter(adapter))
+        except RuntimeError:
+            return
+        self._closing.append(task)
+        task.add_done_callback(self._closing.remove)
+
+    @staticmethod
+    async def _close_adapter(adapter: BaseLLMAdapter) -> None:
+        try:
+            await adapter.close()
+        except Exception:
+            logger.warning(
+                "Failed to close %s adapter", adapter.config.provider, exc_info=True
+            )
+
+
+adapter_pool = AdapterPool()
+config_store.add_listener(adapter_pool.on_config_change)
@@ -1,15 +1,21 @@
 """Base adapter interface for all LLM providers."""
 
 from abc import ABC, abstractmethod
-from typing import AsyncIterator, List, Optional
+from typing import AsyncIterator, Callable, List, Optional
+
+import httpx
 
 from app.core.schemas import (
     AdapterCapabilities,
     LLMConfig,
     LLMResponse,
     Message,
-    StreamChunk,
+    ModelInfo,
 )
+from app.core.streaming import RawChunk
+
+# Seconds allowed for a health check probe
+HEALTH_CHECK_TIMEOUT = 5.0
 
 
 class BaseLLMAdapter(ABC):
@@ -26,6 +32,7 @@ class BaseLLMAdapter(ABC):
             config: LLM configuration containing API keys, model, etc.
         """
         self.config = config
+        self._response_listeners: List[Callable[[int, httpx.Headers], None]] = []
         self._validate_config()
 
     @abstractmethod
@@ -43,7 +50,7 @@ class BaseLLMAdapter(ABC):
         messages: List[Message],
         stream: bool = False,
         **kwargs,
-    ) -> LLMResponse | AsyncIterator[StreamChunk]:
+    ) -> LLMResponse | AsyncIterator[RawChunk]:
         """Send a chat completion request.
 
         Args:
@@ -52,7 +59,7 @@ class BaseLLMAdapter(ABC):
             **kwargs: Additional provider-specific parameters.
 
         Returns:
-            Either a complete LLMResponse or an async iterator of StreamChunk
+            Either a complete LLMResponse or an async iterator of RawChunk
             objects if streaming is enabled.
 
         Raises:
@@ -64,6 +71,9 @@ class BaseLLMAdapter(ABC):
     async def health_check(self) -> bool:
         """Check if the adapter can connect to the provider API.
 
+        Implementations should use a cheap, non-billable request bounded by
+        ``HEALTH_CHECK_TIMEOUT``.
+
         Returns:
             True if the adapter is healthy and can make requests.
         """
@@ -78,6 +88,34 @@ class BaseLLMAdapter(ABC):
         """
         pass
 
+    @property
+    def completion_budget(self) -> Optional[int]:
+        """Most tokens a response may use, or None if unbounded by the request.
+
+        Override where the adapter sends a default ``max_tokens`` of its own.
+        """
+        return self.config.max_tokens
+
+    async def fetch_models(self) -> List[ModelInfo]:
+        """Fetch the models the provider currently offers.
+
+        Unlike :meth:`list_models`, errors are raised so callers can tell a
+        failed fetch from an empty list. Defaults to the static
+        ``supported_models`` of :meth:`get_capabilities`; override where the
+        provider has a model listing API.
+
+        Returns:
+            Models with their context lengths where the provider reports them.
+        """
+        return [ModelInfo(id=model) for model in self.get_capabilities().supported_models]
+
+    async def list_models(self) -> List[str]:
+        """List available model names, or an empty list if listing fails."""
+        try:
+            return [model.id for model in await self.fetch_models()]
+        except Exception:
+            return []
+
     def normalize_messages(self, messages: List[Message]) -> List[Message]:
         """Normalize messages to ensure consistent format.
 
@@ -91,6 +129,27 @@ class BaseLLMAdapter(ABC):
         """
         return messages
 
+    def add_response_listener(
+        self, listener: Callable[[int, httpx.Headers], None]
+    ) -> None:
+        """Register a callback for every HTTP response from the provider.
+
+        Adapters install :meth:`_on_response` as an httpx response hook, so
+        listeners see status codes and headers (e.g. rate-limit headers)
+        for streaming and non-streaming calls alike. Registering the same
+        listener twice has no effect.
+
+        Args:
+            listener: Callable receiving (status_code, headers).
+        """
+        if listener not in self._response_listeners:
+            self._response_listeners.append(listener)
+
+    async def _on_response(self, response: httpx.Response) -> None:
+        """httpx response event hook that notifies listeners."""
+        for listener in self._response_listeners:
+            listener(response.status_code, response.headers)
+
     async def close(self) -> None:
         """Clean up resources (close connections, etc.).
 
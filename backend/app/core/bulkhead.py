@@ -0,0 +1,224 @@
+"""Per-provider and per-model concurrency bulkheads."""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from app.core.config import config_store, get_llm_config
+from app.core.schemas import BulkheadConfig, ConcurrencyConfig
+
+
+class BulkheadRejectedError(Exception):
+    """Raised when a request cannot get a concurrency slot."""
+
+    status_code = 503
+
+    def __init__(self, name: str, message: str, retry_after: float):
+        """Initialize the error.
+
+        Args:
+            name: Bulkhead name (provider or provider/model).
+            message: Human readable reason.
+            retry_after: Suggested seconds before retrying.
+        """
+        super().__init__(message)
+        self.name = name
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """HTTP headers to send with the rejection."""
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class BulkheadFullError(BulkheadRejectedError):
+    """The wait queue is full; the caller should back off."""
+
+    status_code = 429
+
+
+class BulkheadTimeoutError(BulkheadRejectedError):
+    """Waited in the queue longer than the configured timeout."""
+
+    status_code = 503
+
+
+class Bulkhead:
+    """Limits concurrent calls, queueing excess callers in FIFO order."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: Optional[int] = None,
+        max_queue: int = 100,
+        queue_timeout: float = 30.0,
+    ):
+        """Initialize the bulkhead.
+
+        Args:
+            name: Name used in error messages.
+            max_concurrent: Maximum calls in flight. None means unlimited.
+            max_queue: Maximum callers waiting for a slot.
+            queue_timeout: Seconds a caller may wait for a slot.
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_hold = 1.0
+
+    @classmethod
+    def from_config(cls, name: str, config: BulkheadConfig) -> "Bulkhead":
+        """Build a bulkhead from its config model."""
+        return cls(
+            name,
+            max_concurrent=config.max_concurrent,
+            max_queue=config.max_queue,
+            queue_timeout=config.queue_timeout,
+        )
+
+    @property
+    def queued(self) -> int:
+        """Number of callers currently waiting."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def retry_after(self) -> float:
+        """Estimate seconds until a slot frees up for a new caller."""
+        slots = self.max_concurrent or 1
+        return self._avg_hold * (self.queued + 1) / slots
+
+    async def acquire(self) -> float:
+        """Wait for a slot.
+
+        Returns:
+            Monotonic timestamp at which the slot was granted.
+
+        Raises:
+            BulkheadFullError: If the wait queue is full.
+            BulkheadTimeoutError: If no slot became free within queue_timeout.
+        """
+        if self.max_concurrent is None or (
+            self.active < self.max_concurrent and not self._waiters
+        ):
+            self.active += 1
+            return time.monotonic()
+
+        if self.queued >= self.max_queue:
+            raise BulkheadFullError(
+                self.name,
+                f"Too many concurrent requests for {self.name}",
+                self.retry_after(),
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # A slot was handed over as we gave up; pass it on.
+                self._release_slot()
+            else:
+                waiter.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                raise BulkheadTimeoutError(
+                    self.name,
+                    f"Timed out waiting for a free {self.name} slot",
+                    self.retry_after(),
+                ) from None
+            raise
+        return time.monotonic()
+
+    def release(self, acquired_at: Optional[float] = None) -> None:
+        """Give a slot back, handing it to the next waiter if any.
+
+        Args:
+            acquired_at: Timestamp returned by :meth:`acquire`, used to track
+                how long slots are held for Retry-After estimates.
+        """
+        if acquired_at is not None:
+            held = time.monotonic() - acquired_at
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Ownership of the slot moves to the waiter; active is unchanged.
+                waiter.set_result(None)
+                return
+        self.active = max(0, self.active - 1)
+
+
+class BulkheadPermit:
+    """Slots held for one request; release exactly once."""
+
+    def __init__(self, held: List[Tuple[Bulkhead, float]]):
+        self._held = held
+
+    def release(self) -> None:
+        """Release every slot held by this permit."""
+        held, self._held = self._held, []
+        for bulkhead, acquired_at in reversed(held):
+            bulkhead.release(acquired_at)
+
+
+class BulkheadRegistry:
+    """Creates bulkheads lazily from each provider's ``concurrency`` config."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._bulkheads: Dict[Tuple[str, Optional[str]], Optional[Bulkhead]] = {}
+
+    def get(self, provider: str, model: Optional[str] = None) -> Optional[Bulkhead]:
+        """Get the bulkhead for a provider, or for one of its models.
+
+        Returns:
+            The bulkhead, or None if no limit is configured.
+        """
+        key = (provider, model)
+        if key not in self._bulkheads:
+            config = ConcurrencyConfig(**(get_llm_config(provider).get("concurrency") or {}))
+            if model is None:
+                bulkhead = Bulkhead.from_config(provider, config)
+            elif model in config.models:
+                bulkhead = Bulkhead.from_config(f"{provider}/{model}", config.models[model])
+            else:
+                bulkhead = None
+            self._bulkheads[key] = bulkhead
+        return self._bulkheads[key]
+
+    async def acquire(self, provider: str, model: Optional[str] = None) -> BulkheadPermit:
+        """Acquire the model slot (if limited) and then the provider slot.
+
+        Raises:
+            BulkheadRejectedError: If either bulkhead rejects the request.
+        """
+        held: List[Tuple[Bulkhead, float]] = []
+        try:
+            for bulkhead in (self.get(provider, model) if model else None, self.get(provider)):
+                if bulkhead is not None:
+                    held.append((bulkhead, await bulkhead.acquire()))
+        except BaseException:
+            BulkheadPermit(held).release()
+            raise
+        return BulkheadPermit(held)
+
+    def reset(self, provider: Optional[str] = None) -> None:
+        """Forget bulkheads so they are rebuilt from config on next use."""
+        for key in [k for k in self._bulkheads if provider is None or k[0] == provider]:
+            del self._bulkheads[key]
+
+    def on_config_change(self, providers: Set[str]) -> None:
+        """Rebuild the bulkheads of providers whose settings changed in config.yaml."""
+        for provider in providers:
+            self.reset(provider)
+
+
+bulkheads = BulkheadRegistry()
+config_store.add_listener(bulkheads.on_config_change)
@@ -0,0 +1,584 @@
+"""Chat request execution shared by the HTTP endpoints."""
+
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.adapter_pool import AdapterPool, adapter_pool
+from app.core.base_adapter import BaseLLMAdapter
+from app.core.bulkhead import BulkheadPermit, BulkheadRegistry, bulkheads
+from app.core.circuit_breaker import CircuitBreakerRegistry, circuit_breakers
+from app.core.coalescing import SingleFlight, StreamFanout
+from app.core.config import get_env_llm_config
+from app.core.context_window import ContextWindow, context_window
+from app.core.rate_limiter import (
+    ProviderRateLimiter,
+    RateLimitedError,
+    RateLimiterRegistry,
+    error_status_code,
+    estimate_tokens,
+    rate_limiters,
+)
+from app.core.resilience import (
+    ResiliencePolicy,
+    ResilienceRegistry,
+    hedge,
+    resilience,
+    retry_async,
+)
+from app.core.response_cache import (
+    CACHE_BYPASS,
+    CACHE_DEFAULT,
+    ResponseCache,
+    cache_key,
+    response_cache,
+)
+from app.core.routing import ProviderRouter, provider_router
+from app.core.schemas import LLMConfig, LLMResponse, Message, RouteTarget
+from app.core.streaming import RawChunk, aclose_stream
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _generation_settings(llm_config: LLMConfig) -> Dict:
+    """Resolved settings, besides model and temperature, that shape a response."""
+    return {
+        "base_url": llm_config.base_url,
+        "max_tokens": llm_config.max_tokens,
+        "extra_params": llm_config.extra_params,
+        # Provider-specific settings allowed by LLMConfig
+        "extra": llm_config.model_extra or None,
+    }
+
+
+class _Admission:
+    """Resources held by one admitted request; released exactly once."""
+
+    def __init__(
+        self,
+        pool: AdapterPool,
+        adapter: BaseLLMAdapter,
+        permit: Optional[BulkheadPermit] = None,
+        limiter: Optional[ProviderRateLimiter] = None,
+        reserved_tokens: int = 0,
+    ):
+        self.pool = pool
+        self.adapter = adapter
+        self.messages: List[Message] = []  # As sent, trimmed to the context window
+        self.permit = permit
+        self.limiter = limiter
+        self.reserved_tokens = reserved_tokens
+        self._released = False
+        self._settled = False
+
+    async def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        if self.permit is not None:
+            self.permit.release()
+        await self.pool.release(self.adapter)
+
+    def settle(self, usage: Optional[Dict[str, int]]) -> None:
+        """Correct the token reservation with the usage of the request, once."""
+        if self.limiter is not None and not self._settled:
+            self._settled = True
+            self.limiter.settle(self.reserved_tokens, usage)
+
+    def translate_error(self, exc: Exception) -> Exception:
+        """Map provider rate-limit errors to RateLimitedError."""
+        if error_status_code(exc) == 429 and self.limiter is not None:
+            return RateLimitedError(
+                f"{self.adapter.config.provider} rate limit exceeded: {exc}",
+                self.limiter.retry_after() or 1.0,
+            )
+        return exc
+
+
+class ChatStream:
+    """Async iterator over a provider stream that owns its admission.
+
+    The adapter lease, bulkhead slot and upstream response are released
+    when the stream is exhausted, fails, or is closed with :meth:`aclose`,
+    even if iteration never started. ``on_open`` is called once with the
+    time to first chunk and the error if opening the stream failed.
+
+    The rate limiter's token reservation is settled when the stream ends,
+    with the usage reported in its final chunk or, for providers that do
+    not report it, an estimate from the prompt and the generated text.
+    """
+
+    def __init__(
+        self,
+        admission: _Admission,
+        policy: ResiliencePolicy,
+        messages: List[Message],
+        kwargs: Dict,
+        on_open: Optional[Callable[[float, Optional[Exception]], None]] = None,
+    ):
+        self._admission = admission
+        self._policy = policy
+        self._on_open = on_open
+        self._messages = messages
+        self._usage: Optional[Dict[str, int]] = None
+        self._generated = 0  # Characters of content and tool call arguments
+        self._prefetched: List[RawChunk] = []
+        self._chunks = self._run(messages, kwargs)
+
+    def __aiter__(self) -> "ChatStream":
+        return self
+
+    async def __anext__(self) -> RawChunk:
+        if self._prefetched:
+            return self._prefetched.pop()
+        return await self._chunks.__anext__()
+
+    async def start(self) -> "ChatStream":
+        """Wait for the first chunk, so failures before it raise here.
+
+        The stream is closed if it fails to start.
+        """
+        try:
+            self._prefetched.append(await self._chunks.__anext__())
+        except StopAsyncIteration:
+            pass
+        except BaseException:
+            await self.aclose()
+            raise
+        return self
+
+    async def aclose(self) -> None:
+        """Cancel the upstream stream and release the admission."""
+        await self._chunks.aclose()
+        self._settle()
+        await self._admission.release()
+
+    async def _run(self, messages: List[Message], kwargs: Dict) -> AsyncIterator[RawChunk]:
+        admission = self._admission
+        try:
+            started = time.monotonic()
+            try:
+                chunks, first = await retry_async(
+                    lambda: self._open(messages, kwargs),
+                    self._policy.retry,
+                    label=admission.adapter.config.provider,
+                )
+            except Exception as e:
+                if self._on_open is not None:
+                    self._on_open(time.monotonic() - started, e)
+                raise
+            if self._on_open is not None:
+                self._on_open(time.monotonic() - started, None)
+            try:
+                if first is not None:
+                    self._account(first)
+                    yield first
+                    async for chunk in chunks:
+                        self._account(chunk)
+                        yield chunk
+            finally:
+                await aclose_stream(chunks)
+        except Exception as e:
+            translated = admission.translate_error(e)
+            if translated is e:
+                raise
+            raise translated from e
+        finally:
+            self._settle()
+            await admission.release()
+
+    def _account(self, chunk: RawChunk) -> None:
+        """Count what the provider generated, to settle the rate limiter."""
+        self._generated += len(chunk.content)
+        for call in chunk.tool_calls or ():
+            self._generated += len(call["function"].get("arguments") or "")
+        if chunk.metadata and chunk.metadata.get("usage"):
+            self._usage = chunk.metadata["usage"]
+
+    def _settle(self) -> None:
+        """Settle the token reservation; estimate usage the stream did not report."""
+        usage = self._usage or {
+            "total_tokens": estimate_tokens(self._messages) + self._generated // 4
+        }
+        self._admission.settle(usage)
+
+    async def _open(
+        self, messages: List[Message], kwargs: Dict
+    ) -> Tuple[AsyncIterator[RawChunk], Optional[RawChunk]]:
+        """Start the upstream stream and wait for its first chunk.
+
+        Nothing has been sent to the client until the first chunk arrives,
+        so failures up to this point are safe to retry.
+        """
+        chunks = await self._admission.adapter.chat(messages, stream=True, **kwargs)
+        try:
+            return chunks, await chunks.__anext__()
+        except StopAsyncIteration:
+            return chunks, None
+        except BaseException:
+            await aclose_stream(chunks)
+            raise
+
+
+class ChatService:
+    """Runs chat requests through the adapter pool and admission controls.
+
+    Each request passes the provider's circuit breaker, leases a pooled
+    adapter, is trimmed to the model's context window, takes a bulkhead slot
+    and is paced by the provider key's rate limiter before reaching the
+    provider.
+    Transient failures are retried with jittered backoff, and slow
+    non-streaming calls may be hedged. A route name (or ``"auto"``) in
+    place of a provider picks the best target of that route and fails over
+    to the next one if a target errors before its first token. Complete
+    (non-streaming) responses are served from and stored in the response
+    cache. Identical requests in flight at the same time share one upstream
+    call, and identical streams share one upstream stream.
+    """
+
+    def __init__(
+        self,
+        pool: AdapterPool = adapter_pool,
+        bulkhead_registry: BulkheadRegistry = bulkheads,
+        limiter_registry: RateLimiterRegistry = rate_limiters,
+        resilience_registry: ResilienceRegistry = resilience,
+        router: ProviderRouter = provider_router,
+        cache: ResponseCache = response_cache,
+        breaker_registry: CircuitBreakerRegistry = circuit_breakers,
+        context: ContextWindow = context_window,
+    ):
+        """Initialize the service.
+
+        Args:
+            pool: Adapter pool to lease adapters from.
+            bulkhead_registry: Concurrency bulkheads per provider/model.
+            limiter_registry: Rate limiters per provider key.
+            resilience_registry: Retry and hedging policies per provider.
+            router: Target selection for routes, fed with call outcomes.
+            cache: Exact-match cache for complete responses.
+            breaker_registry: Circuit breakers per provider, fed with call
+                outcomes.
+            context: Trims prompts to the target model's context window.
+        """
+        self.pool = pool
+        self.bulkheads = bulkhead_registry
+        self.rate_limiters = limiter_registry
+        self.resilience = resilience_registry
+        self.router = router
+        self.cache = cache
+        self.breakers = breaker_registry
+        self.context = context
+        self.flights: SingleFlight[LLMResponse] = SingleFlight()
+        self.fanout: StreamFanout[RawChunk] = StreamFanout()
+
+    async def complete(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict] = None,
+        model: Optional[str] = None,
+        cache_mode: str = CACHE_DEFAULT,
+        **kwargs,
+    ) -> LLMResponse:
+        """Run a non-streaming chat completion.
+
+        Args:
+            provider: Provider name, or a route name such as ``"auto"``.
+            messages: Conversation messages.
+            config: Provider config dict; ignored for routes.
+            model: Model override; ignored for routes.
+            cache_mode: One of the ``response_cache.CACHE_*`` modes. Cache
+                hits are marked with ``metadata["cache"] == "hit"``.
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open.
+            BulkheadRejectedError: If no concurrency slot is available.
+            RateLimitedError: If the provider key is rate limited.
+            ContextWindowExceededError: If the newest turn alone exceeds the
+                model's context window.
+            ValueError: If the provider configuration is invalid.
+        """
+        key, temperature = self._request_key(provider, messages, config, model, kwargs)
+        ttl = 0.0
+        if cache_mode == CACHE_BYPASS:
+            self.cache.stats.bypasses += 1
+        else:
+            ttl = self.cache.ttl_for(provider, temperature)
+
+        if ttl and cache_mode == CACHE_DEFAULT:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                cached.metadata = {**(cached.metadata or {}), "cache": "hit"}
+                return cached
+
+        async def call() -> LLMResponse:
+            response = await self._dispatch_complete(provider, messages, config, model, **kwargs)
+            # Stored once by the shared call, not once per coalesced caller
+            if ttl:
+                await self.cache.set(key, response, ttl)
+            return response
+
+        return await self.flights.do(key, call)
+
+    async def _dispatch_complete(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict],
+        model: Optional[str],
+        **kwargs,
+    ) -> LLMResponse:
+        if self.router.is_route(provider):
+
+            async def attempt(target: RouteTarget) -> LLMResponse:
+                response = await self._complete(
+                    target.provider,
+                    messages,
+                    get_env_llm_config(target.provider, target.model),
+                    target.model,
+                    **kwargs,
+                )
+                response.metadata = {
+                    **(response.metadata or {}),
+                    "route": provider,
+                    "provider": target.provider,
+                }
+                return response
+
+            return await self._failover(provider, attempt)
+        return await self._complete(provider, messages, config, model, **kwargs)
+
+    async def stream(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict] = None,
+        model: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncIterator[RawChunk]:
+        """Admit a streaming chat request.
+
+        Admission happens and the first chunk is awaited before this returns,
+        so rejections and failures to open the stream surface before any
+        response has been sent to the client, and a route can swap targets.
+        An identical stream already in flight is shared rather than opened
+        again while it is young enough to replay; joining subscribers replay
+        it from the start.
+
+        Returns:
+            Async iterator of RawChunk objects with ``aclose``.
+        """
+        key, _ = self._request_key(provider, messages, config, model, kwargs)
+        return await self.fanout.subscribe(
+            key, lambda: self._dispatch_stream(provider, messages, config, model, **kwargs)
+        )
+
+    async def _dispatch_stream(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict],
+        model: Optional[str],
+        **kwargs,
+    ) -> ChatStream:
+        if self.router.is_route(provider):
+
+            async def attempt(target: RouteTarget) -> ChatStream:
+                stream = await self._stream(
+                    target.provider,
+                    messages,
+                    get_env_llm_config(target.provider, target.model),
+                    target.model,
+                    **kwargs,
+                )
+                return await stream.start()
+
+            return await self._failover(provider, attempt)
+        stream = await self._stream(provider, messages, config, model, **kwargs)
+        return await stream.start()
+
+    def _request_key(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict],
+        model: Optional[str],
+        kwargs: Dict,
+    ) -> Tuple[str, Optional[float]]:
+        """Identity of a request for caching and coalescing, and its temperature.
+
+        Provider requests are keyed on the resolved settings the adapter
+        would send; route requests on the route name and the settings of
+        each of its targets, and the highest temperature any of them would
+        use.
+        """
+        temperature = kwargs.get("temperature")
+        if self.router.is_route(provider):
+            route_temperature, settings = self._route_settings(provider)
+            if temperature is None:
+                temperature = route_temperature
+        else:
+            llm_config = AdapterFactory.build_config(provider, config=config, model=model)
+            model = llm_config.model
+            if temperature is None:
+                temperature = llm_config.temperature
+            settings = _generation_settings(llm_config)
+        extra = {k: v for k, v in kwargs.items() if k not in ("temperature", "tools")}
+        if extra:
+            settings = {**(settings or {}), "kwargs": extra}
+        key = cache_key(provider, model, messages, temperature, kwargs.get("tools"), settings)
+        return key, temperature
+
+    def _route_settings(self, route: str) -> Tuple[Optional[float], Optional[Dict]]:
+        """Highest temperature a route's targets use and their settings.
+
+        Both are None if a target's configuration cannot be resolved.
+        """
+        temperatures = []
+        targets = []
+        for target in self.router.route(route).targets:
+            try:
+                llm_config = AdapterFactory.build_config(
+                    target.provider,
+                    config=get_env_llm_config(target.provider, target.model),
+                    model=target.model,
+                )
+            except Exception:
+                return None, None
+            temperatures.append(llm_config.temperature)
+            targets.append(
+                {
+                    "provider": target.provider,
+                    "model": llm_config.model,
+                    "temperature": llm_config.temperature,
+                    **_generation_settings(llm_config),
+                }
+            )
+        return max(temperatures), {"targets": targets}
+
+    async def _complete(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict],
+        model: Optional[str],
+        **kwargs,
+    ) -> LLMResponse:
+        admission = await self._admit(provider, messages, config, model)
+        adapter, limiter, messages = admission.adapter, admission.limiter, admission.messages
+        policy = self.resilience.get(provider)
+        latency = policy.latency(adapter.config.model)
+        hedged_tokens = 0
+
+        async def attempt() -> LLMResponse:
+            started = time.monotonic()
+            response = await adapter.chat(messages, stream=False, **kwargs)
+            latency.record(time.monotonic() - started)
+            return response
+
+        def can_hedge() -> bool:
+            # A hedge is a real second request; only send it if the rate
+            # limiter has room right now.
+            nonlocal hedged_tokens
+            if not limiter.try_acquire(admission.reserved_tokens):
+                return False
+            hedged_tokens += admission.reserved_tokens
+            return True
+
+        async def hedged_attempt() -> LLMResponse:
+            return await hedge(attempt, policy.hedge_delay(adapter.config.model), can_hedge)
+
+        started = time.monotonic()
+        try:
+            response = await retry_async(hedged_attempt, policy.retry, label=provider)
+        except Exception as e:
+            self.router.record(provider, model, error=True)
+            self.breakers.get(provider).record(e)
+            translated = admission.translate_error(e)
+            if translated is e:
+                raise
+            raise translated from e
+        finally:
+            # Only the winning attempt's tokens are settled from its usage;
+            # the cancelled one's reservation is returned
+            limiter.refund(hedged_tokens)
+            await admission.release()
+
+        self.router.record(provider, model, latency=time.monotonic() - started)
+        self.breakers.get(provider).record()
+        admission.settle(response.usage)
+        return response
+
+    async def _stream(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict],
+        model: Optional[str],
+        **kwargs,
+    ) -> ChatStream:
+        admission = await self._admit(provider, messages, config, model)
+
+        def on_open(latency: float, error: Optional[Exception]) -> None:
+            self.router.record(provider, model, latency=latency, error=error is not None)
+            self.breakers.get(provider).record(error)
+
+        return ChatStream(
+            admission, self.resilience.get(provider), admission.messages, kwargs, on_open=on_open
+        )
+
+    async def _failover(
+        self, route: str, attempt: Callable[[RouteTarget], Awaitable[T]]
+    ) -> T:
+        """Run ``attempt`` on the route's targets in rank order until one succeeds.
+
+        Raises:
+            The error of the last target tried if all of them fail.
+        """
+        *fallbacks, last = self.router.rank(route)
+        for target in fallbacks:
+            try:
+                return await attempt(target)
+            except Exception as e:
+                logger.warning(
+                    "Route %s: %s/%s failed (%s), failing over",
+                    route, target.provider, target.model or "default", type(e).__name__,
+                )
+        return await attempt(last)
+
+    async def _admit(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict],
+        model: Optional[str],
+    ) -> _Admission:
+        breaker = self.breakers.get(provider)
+        trial = breaker.before_call()
+        admission = None
+        try:
+            adapter = self.pool.acquire(provider, config=config, model=model)
+            admission = _Admission(self.pool, adapter)
+            messages = admission.messages = self.context.prepare(adapter, messages)
+            admission.permit = await self.bulkheads.acquire(provider, adapter.config.model)
+
+            limiter = self.rate_limiters.get(provider, adapter.config.api_key)
+            limiter.attach(adapter)
+            admission.limiter = limiter
+            admission.reserved_tokens = await limiter.acquire(
+                estimate_tokens(messages, adapter.completion_budget)
+            )
+        except BaseException:
+            # Nothing reached the provider, so no trial of its circuit ran
+            if trial:
+                breaker.cancel_trial()
+            if admission is not None:
+                await admission.release()
+            raise
+        return admission
+
+
+chat_service = ChatService()
@@ -0,0 +1,180 @@
+"""Per-provider circuit breakers fed by real request outcomes."""
+
+import logging
+import math
+import time
+from typing import Dict, Optional, Set
+
+from app.core.config import config_store, get_llm_config
+from app.core.resilience import is_transient
+from app.core.schemas import CircuitBreakerConfig
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit is open and calls are short-circuited."""
+
+    status_code = 503
+
+    def __init__(self, name: str, retry_after: float):
+        """Initialize the error.
+
+        Args:
+            name: Provider name.
+            retry_after: Seconds until a trial call will be allowed.
+        """
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """HTTP headers to send with the rejection."""
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class CircuitBreaker:
+    """Closed/open/half-open state machine for one provider.
+
+    Consecutive transient failures open the circuit, after which calls fail
+    fast with :class:`CircuitOpenError`. Once ``recovery_timeout`` has passed
+    the circuit is half-open: one trial call goes through, closing the
+    circuit on success or reopening it on failure. A trial that never
+    reports back is replaced after another ``recovery_timeout``.
+    """
+
+    def __init__(self, name: str, config: Optional[CircuitBreakerConfig] = None):
+        """Initialize a closed breaker.
+
+        Args:
+            name: Name used in errors and logs.
+            config: Thresholds and timeouts.
+        """
+        self.name = name
+        self.config = config or CircuitBreakerConfig()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        """Current state: ``closed``, ``open`` or ``half_open``."""
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at < self.config.recovery_timeout:
+            return OPEN
+        return HALF_OPEN
+
+    def retry_after(self) -> float:
+        """Seconds until a call may be attempted."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.config.recovery_timeout - time.monotonic())
+
+    def before_call(self) -> bool:
+        """Admit a call or short-circuit it.
+
+        Returns:
+            True if the call is the half-open trial. If it then never
+            reaches the provider, give the slot back with :meth:`cancel_trial`.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                trial call already in flight.
+        """
+        if not self.config.enabled:
+            return False
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN:
+            now = time.monotonic()
+            if (
+                self._trial_started is None
+                or now - self._trial_started >= self.config.recovery_timeout
+            ):
+                self._trial_started = now
+                return True
+        raise CircuitOpenError(self.name, self.retry_after() or self.config.recovery_timeout)
+
+    def cancel_trial(self) -> None:
+        """Let another call take the trial slot of one that was never sent."""
+        self._trial_started = None
+
+    def record(self, error: Optional[BaseException] = None) -> None:
+        """Record a call outcome.
+
+        Only transient errors (timeouts, connection failures, 5xx) count as
+        failures; anything else shows the provider is reachable.
+        """
+        if error is not None and is_transient(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        if self.opened_at is not None:
+            logger.info("Circuit for %s closed", self.name)
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit at the threshold."""
+        if not self.config.enabled:
+            return
+        self.failures += 1
+        self._trial_started = None
+        if self.opened_at is not None or self.failures >= self.config.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(
+                    "Circuit for %s opened after %d consecutive failures",
+                    self.name, self.failures,
+                )
+            self.opened_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        """Return the breaker state as a plain dict."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after": round(self.retry_after(), 3),
+        }
+
+
+class CircuitBreakerRegistry:
+    """One breaker per provider, built from the ``circuit_breaker`` config."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> CircuitBreaker:
+        """Get (or create) the breaker for a provider."""
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            config = CircuitBreakerConfig(
+                **(get_llm_config(provider).get("circuit_breaker") or {})
+            )
+            breaker = self._breakers[provider] = CircuitBreaker(provider, config)
+        return breaker
+
+    def reset(self, provider: Optional[str] = None) -> None:
+        """Forget breakers so they are rebuilt from config on next use."""
+        for key in [k for k in self._breakers if provider is None or k == provider]:
+            del self._breakers[key]
+
+    def on_config_change(self, providers: Set[str]) -> None:
+        """Rebuild the breakers of providers whose settings changed in config.yaml."""
+        for provider in providers:
+            self.reset(provider)
+
+
+circuit_breakers = CircuitBreakerRegistry()
+config_store.add_listener(circuit_breakers.on_config_change)
@@ -0,0 +1,291 @@
+"""Coalescing of identical concurrent requests into one upstream call."""
+
+import asyncio
+import copy
+from typing import AsyncIterator, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
+
+from app.core.streaming import aclose_stream
+
+T = TypeVar("T")
+
+
+class CoalescingStats:
+    """Counters describing how often requests were shared."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self.leaders = 0
+        self.followers = 0
+
+    def as_dict(self) -> dict:
+        """Return the counters as a plain dict."""
+        return {"leaders": self.leaders, "followers": self.followers}
+
+
+class _Flight(Generic[T]):
+    """One shared call and the number of callers waiting on it."""
+
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """Runs at most one call per key at a time; later callers share its result.
+
+    The shared call runs in its own task, so a caller giving up does not
+    cancel it for the others. It is cancelled only once every caller waiting
+    on it has gone.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._flights: Dict[str, _Flight[T]] = {}
+        self.stats = CoalescingStats()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run ``call``, or wait for the in-flight call with the same key.
+
+        Args:
+            key: Identity of the request.
+            call: Zero-argument coroutine function making the request.
+
+        Returns:
+            The shared result. Exceptions are raised to every caller.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.stats.leaders += 1
+        else:
+            self.stats.followers += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight[T]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+def _fresh_error(error: BaseException) -> BaseException:
+    """Copy of a shared error for one subscriber to raise.
+
+    Raising one instance from several tasks would grow a single traceback
+    with every subscriber's frames. Errors whose constructor does not
+    accept their ``args`` cannot be copied and lose their traceback instead.
+    """
+    try:
+        clone = copy.copy(error)
+    except Exception:
+        return error.with_traceback(None)
+    clone.__cause__ = error.__cause__
+    clone.__context__ = error.__context__
+    clone.__suppress_context__ = error.__suppress_context__
+    return clone.with_traceback(error.__traceback__)
+
+
+class _Broadcast(Generic[T]):
+    """One upstream stream replayed to every subscriber.
+
+    Upstream is read on demand by whichever subscriber is furthest ahead.
+    Chunks are kept so slower and late subscribers replay them, until
+    ``max_replay`` chunks have been read; the stream then stops taking new
+    subscribers and only keeps the chunks its slowest subscriber has yet
+    to read.
+    """
+
+    def __init__(
+        self,
+        fanout: "StreamFanout[T]",
+        key: str,
+        opener: Callable[[], Awaitable[AsyncIterator[T]]],
+        max_replay: int,
+    ):
+        self.fanout = fanout
+        self.key = key
+        self.max_replay = max_replay
+        self.chunks: List[T] = []
+        self.offset = 0  # Stream index of chunks[0]
+        self.joinable = True
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscriptions: List["_Subscription[T]"] = []
+        self._opening = asyncio.ensure_future(opener())
+        self._upstream: Optional[AsyncIterator[T]] = None
+        self._pull: Optional[asyncio.Future] = None
+
+    async def open(self) -> None:
+        """Wait until the upstream stream has been opened."""
+        try:
+            self._upstream = await asyncio.shield(self._opening)
+            return
+        except Exception as e:
+            error = e
+        raise _fresh_error(error)
+
+    async def chunk(self, index: int) -> T:
+        """Return chunk ``index``, reading it from upstream if needed.
+
+        Raises:
+            StopAsyncIteration: Once the stream is exhausted.
+        """
+        while index >= self.offset + len(self.chunks):
+            if self.done:
+                if self.error is not None:
+                    raise _fresh_error(self.error)
+                raise StopAsyncIteration
+            if self._pull is None:
+                self._pull = asyncio.ensure_future(self._upstream.__anext__())
+            pull = self._pull
+            try:
+                chunk = await asyncio.shield(pull)
+            except StopAsyncIteration:
+                await self._finish()
+                continue
+            except Exception as e:
+                await self._finish(e)
+                continue
+            if self._pull is pull:
+                self._pull = None
+                self.chunks.append(chunk)
+                if self.joinable and self.offset + len(self.chunks) > self.max_replay:
+                    # Too far along to replay to newcomers; they open their own
+                    self.joinable = False
+                    self.fanout._forget(self)
+        return self.chunks[index - self.offset]
+
+    def trim(self) -> None:
+        """Drop chunks every subscriber has read, once no one can join."""
+        if self.joinable or not self.subscriptions:
+            return
+        lowest = min(subscription.index for subscription in self.subscriptions)
+        if lowest > self.offset:
+            del self.chunks[: lowest - self.offset]
+            self.offset = lowest
+
+    async def leave(self, subscription: "_Subscription[T]") -> None:
+        """Drop a subscriber, cancelling upstream when none are left."""
+        self.subscriptions.remove(subscription)
+        if self.subscriptions or self.done:
+            self.trim()
+            return
+        self.fanout._forget(self)
+        self.done = True
+        if self._pull is not None:
+            self._pull.cancel()
+            await asyncio.gather(self._pull, return_exceptions=True)
+        if not self._opening.done():
+            self._opening.cancel()
+            await asyncio.gather(self._opening, return_exceptions=True)
+        elif not self._opening.cancelled() and self._opening.exception() is None:
+            await aclose_stream(self._opening.result())
+
+    async def _finish(self, error: Optional[BaseException] = None) -> None:
+        if self.done:
+            return
+        self.done = True
+        self.error = error
+        self._pull = None
+        self.fanout._forget(self)
+        if self._upstream is not None:
+            await aclose_stream(self._upstream)
+
+
+class _Subscription(Generic[T]):
+    """A subscriber's position in a broadcast; close exactly once."""
+
+    def __init__(self, broadcast: _Broadcast[T]):
+        self._broadcast = broadcast
+        self.index = 0
+        self._closed = False
+        broadcast.subscriptions.append(self)
+
+    def __aiter__(self) -> "_Subscription[T]":
+        return self
+
+    async def __anext__(self) -> T:
+        if self._closed:
+            raise StopAsyncIteration
+        try:
+            chunk = await self._broadcast.chunk(self.index)
+        except BaseException:
+            await self.aclose()
+            raise
+        self.index += 1
+        self._broadcast.trim()
+        return chunk
+
+    async def aclose(self) -> None:
+        """Stop receiving chunks; cancels upstream if this was the last subscriber."""
+        if not self._closed:
+            self._closed = True
+            await self._broadcast.leave(self)
+
+
+class StreamFanout(Generic[T]):
+    """Shares one upstream stream among identical concurrent stream requests.
+
+    Subscribers that join while the stream is in flight receive every chunk
+    from the beginning, as long as no more than ``max_replay_chunks`` have
+    been read; later requests open a stream of their own. Upstream is
+    closed when it is exhausted or when the last subscriber leaves.
+    """
+
+    def __init__(self, max_replay_chunks: int = 256):
+        """Initialize with no streams in flight.
+
+        Args:
+            max_replay_chunks: Chunks kept for subscribers joining late.
+        """
+        self.max_replay_chunks = max_replay_chunks
+        self._broadcasts: Dict[str, _Broadcast[T]] = {}
+        self.stats = CoalescingStats()
+
+    def __len__(self) -> int:
+        return len(self._broadcasts)
+
+    async def subscribe(
+        self, key: str, opener: Callable[[], Awaitable[AsyncIterator[T]]]
+    ) -> AsyncIterator[T]:
+        """Subscribe to the stream for ``key``, opening it if needed.
+
+        Args:
+            key: Identity of the request.
+            opener: Coroutine function opening the upstream stream. Errors
+                it raises are raised to every subscriber waiting on it.
+
+        Returns:
+            Async iterator over the stream's chunks, with ``aclose``.
+        """
+        broadcast = self._broadcasts.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast(self, key, opener, self.max_replay_chunks)
+            self._broadcasts[key] = broadcast
+            self.stats.leaders += 1
+        else:
+            self.stats.followers += 1
+
+        subscription = _Subscription(broadcast)
+        try:
+            await broadcast.open()
+        except BaseException:
+            self._forget(broadcast)
+            await subscription.aclose()
+            raise
+        return subscription
+
+    def _forget(self, broadcast: _Broadcast[T]) -> None:
+        if self._broadcasts.get(broadcast.key) is broadcast:
+            del self._broadcasts[broadcast.key]
@@ -1,12 +1,20 @@
 """Configuration management for the application."""
 
+import logging
+import math
 import os
+import re
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 import yaml
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.core.schemas import LLMConfig
+
+logger = logging.getLogger(__name__)
+
 
 class Settings(BaseSettings):
     """Application settings."""
@@ -33,9 +41,226 @@ class Settings(BaseSettings):
     secret_key: str = os.getenv("SECRET_KEY", "change-me-in-production")
 
 
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent.parent.parent / "config" / "config.yaml"
+
+# $NAME or ${NAME}, as understood by os.path.expandvars
+_ENV_VAR = re.compile(r"\$(\w+|\{[^}]*\})")
+
+_DEFAULT_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "anthropic": "https://api.anthropic.com",
+    "ollama": "http://localhost:11434",
+    "gemini": "https://generativelanguage.googleapis.com/v1",
+}
+
+# Models used with an API key from the environment when none is configured
+_DEFAULT_MODELS = {
+    "openai": "gpt-4",
+    "anthropic": "claude-3-5-sonnet-20241022",
+    "ollama": "llama2",
+    "gemini": "gemini-pro",
+}
+
+
+def _expand_env(value: Any, names: Set[str]) -> Any:
+    """Expand environment variables in every string of a parsed config.
+
+    Expanded values are parsed as YAML scalars, so ``port: ${PORT}`` still
+    yields an int. Names of referenced variables are added to ``names``.
+    """
+    if isinstance(value, dict):
+        return {key: _expand_env(item, names) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_expand_env(item, names) for item in value]
+    if not isinstance(value, str) or "$" not in value:
+        return value
+    names.update(name.strip("{}") for name in _ENV_VAR.findall(value))
+    expanded = os.path.expandvars(value)
+    if expanded == value:
+        return value
+    try:
+        parsed = yaml.safe_load(expanded)
+    except yaml.YAMLError:
+        return expanded
+    return expanded if isinstance(parsed, (dict, list)) else parsed
+
+
+def _read_yaml(config_path: Path) -> Dict:
+    """Parse a config file without expanding environment variables."""
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _provider_settings(provider: str, config: Dict) -> Dict:
+    """A provider's block of ``llm_providers`` with defaults filled in."""
+    providers = config.get("llm_providers") or {}
+    provider_config = providers.get(provider) or {}
+
+    # Fill in defaults
+    defaults = {
+        "base_url": _DEFAULT_BASE_URLS.get(provider, ""),
+        "timeout": 30,
+        "temperature": 0.7,
+    }
+
+    return {**defaults, **provider_config}
+
+
+class ConfigStore:
+    """config.yaml, parsed once and cached until the file changes.
+
+    The file is stat'ed at most every ``check_interval`` seconds and only
+    re-parsed when its mtime, size or inode changes. Environment variables
+    referenced in the file are checked on every read and re-expanded from
+    the cached YAML when they change. Each provider's settings are validated
+    into an :class:`LLMConfig` once per change, and listeners are told which
+    providers changed so warm adapters built from old settings are swapped.
+    Section listeners are called when a top-level block such as ``routes``
+    changes, so components caching it reload it.
+    """
+
+    def __init__(self, path: Optional[Path] = None, check_interval: float = 1.0):
+        """Initialize the store.
+
+        Args:
+            path: Config file. Defaults to config/config.yaml.
+            check_interval: Minimum seconds between checks of the file.
+        """
+        self.path = Path(path) if path is not None else DEFAULT_CONFIG_PATH
+        self.check_interval = check_interval
+        self._raw: Dict = {}
+        self._config: Optional[Dict] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._checked_at = -math.inf
+        self._env_names: Tuple[str, ...] = ()
+        self._env_values: Tuple[Optional[str], ...] = ()
+        self._llm_configs: Dict[str, Union[LLMConfig, ValueError]] = {}
+        self._listeners: List[Callable[[Set[str]], None]] = []
+        self._section_listeners: Dict[str, List[Callable[[], None]]] = {}
+
+    def get(self) -> Dict:
+        """The current configuration. Treat it as read-only; it is shared."""
+        now = time.monotonic()
+        if self._config is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            signature = self._stat()
+            if self._config is None or signature != self._signature:
+                self._reload(signature)
+                return self._config
+        if self._env_names and self._env_values != self._read_env():
+            self._rebuild()
+        return self._config
+
+    def llm_config(self, provider: str) -> LLMConfig:
+        """Validated settings for ``provider`` from config.yaml.
+
+        Raises:
+            ValueError: If the provider's settings are invalid.
+        """
+        self.get()
+        llm_config = self._llm_configs.get(provider)
+        if llm_config is None:
+            llm_config = self._validate(provider)
+            self._llm_configs[provider] = llm_config
+        if isinstance(llm_config, ValueError):
+            raise llm_config
+        return llm_config
+
+    def add_listener(self, listener: Callable[[Set[str]], None]) -> None:
+        """Call ``listener`` with the names of providers whose settings changed."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def add_section_listener(self, section: str, listener: Callable[[], None]) -> None:
+        """Call ``listener`` when the top-level ``section`` of config.yaml changes."""
+        listeners = self._section_listeners.setdefault(section, [])
+        if listener not in listeners:
+            listeners.append(listener)
+
+    def invalidate(self) -> None:
+        """Re-check the file on next read."""
+        self._checked_at = -math.inf
+        self._signature = None
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _read_env(self) -> Tuple[Optional[str], ...]:
+        return tuple(os.environ.get(name) for name in self._env_names)
+
+    def _reload(self, signature: Optional[Tuple[int, int, int]]) -> None:
+        self._signature = signature
+        if signature is None:
+            # Default config structure
+            raw = {"llm_providers": {}, "mcp_servers": {}}
+        else:
+            try:
+                raw = _read_yaml(self.path)
+            except (OSError, yaml.YAMLError):
+                if self._config is None:
+                    raise
+                logger.error(
+                    "Keeping previous configuration; could not load %s", self.path, exc_info=True
+                )
+                return
+        self._raw = raw
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Re-expand the cached YAML and re-validate provider settings."""
+        names: Set[str] = set()
+        config = _expand_env(self._raw, names)
+        self._env_names = tuple(sorted(names))
+        self._env_values = self._read_env()
+
+        previous = self._config
+        self._config = config
+        self._llm_configs = {}
+        for provider in config.get("llm_providers") or {}:
+            llm_config = self._llm_configs[provider] = self._validate(provider)
+            if isinstance(llm_config, ValueError):
+                logger.error("Invalid settings for provider %s: %s", provider, llm_config)
+
+        if previous is None:
+            return
+        changed = {
+            provider
+            for provider in {
+                *(previous.get("llm_providers") or {}),
+                *(config.get("llm_providers") or {}),
+            }
+            if _provider_settings(provider, previous) != _provider_settings(provider, config)
+        }
+        if changed:
+            logger.info("Settings changed for providers: %s", ", ".join(sorted(changed)))
+            for listener in self._listeners:
+                listener(changed)
+        for section, listeners in self._section_listeners.items():
+            if previous.get(section) != config.get(section):
+                logger.info("Settings changed for %s", section)
+                for listener in listeners:
+                    listener()
+
+    def _validate(self, provider: str) -> Union[LLMConfig, ValueError]:
+        try:
+            return LLMConfig(provider=provider, **_provider_settings(provider, self._config))
+        except ValueError as e:
+            return e
+
+
+config_store = ConfigStore()
+
+
 def load_config(config_path: Optional[str] = None) -> Dict:
     """Load configuration from YAML file.
 
+    The default config file is served from :data:`config_store`, so it is
+    only re-parsed when it changes. The result is shared; don't mutate it.
+
     Args:
         config_path: Path to config file. Defaults to config/config.yaml.
 
@@ -43,7 +268,7 @@ def load_config(config_path: Optional[str] = None) -> Dict:
         Dictionary containing configuration.
     """
     if config_path is None:
-        config_path = Path(__file__).parent.parent.parent.parent / "config" / "config.yaml"
+        return config_store.get()
 
     config_path = Path(config_path)
 
@@ -54,15 +279,7 @@ def load_config(config_path: Optional[str] = None) -> Dict:
             "mcp_servers": {},
         }
 
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f) or {}
-
-    # Expand environment variables in config
-    config_str = yaml.dump(config)
-    config_str = os.path.expandvars(config_str)
-    config = yaml.safe_load(config_str)
-
-    return config
+    return _expand_env(_read_yaml(config_path), set())
 
 
 def get_llm_config(provider: str, config: Optional[Dict] = None) -> Dict:
@@ -78,21 +295,48 @@ def get_llm_config(provider: str, config: Optional[Dict] = None) -> Dict:
     if config is None:
         config = load_config()
 
-    providers = config.get("llm_providers", {})
-    provider_config = providers.get(provider, {})
+    return _provider_settings(provider, config)
 
-    # Fill in defaults
-    defaults = {
-        "base_url": {
-            "openai": "https://api.openai.com/v1",
-            "anthropic": "https://api.anthropic.com",
-            "ollama": "http://localhost:11434",
-        }.get(provider, ""),
-        "timeout": 30,
-        "temperature": 0.7,
-    }
 
-    return {**defaults, **provider_config}
+def get_provider_config(provider: str) -> LLMConfig:
+    """Validated settings for a provider from config.yaml, cached until it changes.
+
+    Args:
+        provider: Provider name.
+
+    Returns:
+        The shared LLMConfig; copy it before changing fields.
+
+    Raises:
+        ValueError: If the provider's settings are invalid.
+    """
+    return config_store.llm_config(provider)
+
+
+def get_env_llm_config(provider: str, model: Optional[str] = None) -> Optional[Dict]:
+    """Build a provider config from an API key set in the environment.
+
+    Keys saved through the settings API are exported as ``<PROVIDER>_API_KEY``
+    and take precedence over config.yaml. The provider's other settings in
+    config.yaml (``transport``, ``timeout``, ``temperature``...) still apply.
+
+    Args:
+        provider: Provider name.
+        model: Optional model name; falls back to the configured or the
+            provider's default model.
+
+    Returns:
+        Provider config dict, or None if no key is set for the provider.
+    """
+    api_key = os.getenv(f"{provider.upper()}_API_KEY")
+    if not api_key:
+        return None
+
+    config = {**get_llm_config(provider), "api_key": api_key}
+    model = model or config.get("model") or _DEFAULT_MODELS.get(provider)
+    if model:
+        config["model"] = model
+    return config
 
 
 settings = Settings()
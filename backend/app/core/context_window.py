@@ -0,0 +1,275 @@
+"""Fitting conversations into a model's context window."""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import List, Optional
+
+from app.core.base_adapter import BaseLLMAdapter
+from app.core.config import load_config
+from app.core.model_catalog import ModelCatalog, model_catalog
+from app.core.schemas import ContextWindowConfig, Message, MessageRole
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on installed extras
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Tokens every message costs beyond its content (role, separators)
+MESSAGE_OVERHEAD = 4
+
+TRUNCATION_MARKER = "\n[truncated to fit the context window]"
+
+# Context lengths of models whose providers do not report them, by model
+# name prefix; the longest matching prefix wins
+MODEL_CONTEXT_LENGTHS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-0125": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-3.5-turbo": 16385,
+    "o1": 128000,
+}
+
+
+def known_context_length(model: Optional[str]) -> Optional[int]:
+    """Context length of ``model`` from :data:`MODEL_CONTEXT_LENGTHS`, if listed."""
+    if not model:
+        return None
+    prefixes = [prefix for prefix in MODEL_CONTEXT_LENGTHS if model.startswith(prefix)]
+    if not prefixes:
+        return None
+    return MODEL_CONTEXT_LENGTHS[max(prefixes, key=len)]
+
+
+class ContextWindowExceededError(ValueError):
+    """The newest turn alone does not fit the model's context window."""
+
+    def __init__(self, needed: int, limit: int):
+        """Initialize the error.
+
+        Args:
+            needed: Tokens the smallest sendable conversation needs.
+            limit: Tokens available for the prompt.
+        """
+        super().__init__(
+            f"Conversation needs about {needed} tokens but the model's context "
+            f"window leaves {limit} for the prompt"
+        )
+        self.needed = needed
+        self.limit = limit
+
+
+class TokenCounter:
+    """Counts message tokens, caching counts by message hash.
+
+    Uses tiktoken's ``cl100k_base`` encoding when tiktoken is installed and
+    roughly 4 characters per token otherwise. Counts are approximate for
+    models with other tokenizers either way, which the context window's
+    safety margin absorbs. Conversations are resent every turn, so almost
+    every message is counted from the cache.
+    """
+
+    def __init__(self, max_entries: int = 10000, encoding: str = "cl100k_base"):
+        """Initialize the counter.
+
+        Args:
+            max_entries: Counts kept before the least recently used is evicted.
+            encoding: tiktoken encoding to count with, if available.
+        """
+        self.max_entries = max_entries
+        self._encoding_name = encoding
+        self._encoding = None
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def encoding(self):
+        """tiktoken encoding, or None to count characters."""
+        if self._encoding is None and tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(self._encoding_name)
+            except Exception:
+                # Encodings are downloaded on first use; count characters offline
+                logger.warning("tiktoken encoding unavailable, estimating tokens", exc_info=True)
+                self._encoding = False
+        return self._encoding or None
+
+    def count_text(self, text: str) -> int:
+        """Tokens in ``text``."""
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def count(self, message: Message) -> int:
+        """Tokens a message takes up in a prompt."""
+        key = self._key(message)
+        count = self._counts.get(key)
+        if count is not None:
+            self.hits += 1
+            self._counts.move_to_end(key)
+            return count
+        self.misses += 1
+        count = MESSAGE_OVERHEAD + self.count_text(message.content)
+        if message.tool_calls:
+            count += self.count_text(json.dumps(message.tool_calls))
+        self._counts[key] = count
+        while len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+        return count
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut ``text`` to about ``max_tokens`` tokens, marking the cut."""
+        encoding = self.encoding
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            return encoding.decode(tokens[:max_tokens]) + TRUNCATION_MARKER
+        if len(text) <= max_tokens * 4:
+            return text
+        return text[: max_tokens * 4] + TRUNCATION_MARKER
+
+    @staticmethod
+    def _key(message: Message) -> str:
+        digest = hashlib.sha1(message.role.encode())
+        digest.update(message.content.encode())
+        if message.tool_calls:
+            digest.update(json.dumps(message.tool_calls, sort_keys=True).encode())
+        return digest.hexdigest()
+
+
+class ContextWindow:
+    """Trims conversations to fit a model's context window before sending.
+
+    The window is taken from the ``context_lengths`` setting, else the
+    length the provider reported to the model catalog, else
+    :data:`MODEL_CONTEXT_LENGTHS`, else the adapter's capabilities. Room for
+    the answer (the adapter's completion budget, or ``response_budget``
+    capped at a quarter of the window) and a safety margin are kept free.
+    Oversized tool results are truncated first; then the oldest turns (a
+    user message and everything up to the next one) are dropped until the
+    rest fits. System messages and the newest turn are always kept.
+    """
+
+    def __init__(
+        self,
+        config: Optional[ContextWindowConfig] = None,
+        counter: Optional[TokenCounter] = None,
+        catalog: ModelCatalog = model_catalog,
+    ):
+        """Initialize the context window manager.
+
+        Args:
+            config: Settings. Loaded from config.yaml if None.
+            counter: Token counter. Created from the settings if None.
+            catalog: Source of per-model context lengths reported by providers.
+        """
+        self._config = config
+        self._counter = counter
+        self.catalog = catalog
+
+    @property
+    def config(self) -> ContextWindowConfig:
+        """Settings."""
+        if self._config is None:
+            self._config = ContextWindowConfig(**(load_config().get("context_window") or {}))
+        return self._config
+
+    @property
+    def counter(self) -> TokenCounter:
+        """Token counter."""
+        if self._counter is None:
+            self._counter = TokenCounter(self.config.cache_size)
+        return self._counter
+
+    def context_length(self, adapter: BaseLLMAdapter) -> Optional[int]:
+        """Context window of ``adapter``'s model, if known."""
+        provider, model = adapter.config.provider, adapter.config.model
+        overrides = self.config.context_lengths
+        return (
+            overrides.get(f"{provider}/{model}")
+            or overrides.get(model)
+            or self.catalog.context_length(provider, model)
+            or known_context_length(model)
+            or adapter.get_capabilities().max_context_length
+        )
+
+    def prompt_limit(self, adapter: BaseLLMAdapter) -> Optional[int]:
+        """Tokens available for the prompt with ``adapter``, if known."""
+        config = self.config
+        context_length = self.context_length(adapter)
+        if not context_length:
+            return None
+        # The same budget the rate limiter reserves for the answer
+        response_budget = adapter.completion_budget
+        if response_budget is None:
+            # Small windows, such as Ollama's default, cannot spare the full default
+            response_budget = min(config.response_budget, context_length // 4)
+        return int((context_length - response_budget) * (1 - config.safety_margin))
+
+    def prepare(self, adapter: BaseLLMAdapter, messages: List[Message]) -> List[Message]:
+        """Messages to send to ``adapter``, trimmed to its context window.
+
+        Raises:
+            ContextWindowExceededError: If even the newest turn does not fit.
+        """
+        if not self.config.enabled:
+            return messages
+        limit = self.prompt_limit(adapter)
+        if limit is None:
+            return messages
+        return self.fit(messages, limit)
+
+    def fit(self, messages: List[Message], limit: int) -> List[Message]:
+        """Trim ``messages`` to at most ``limit`` prompt tokens.
+
+        Returns ``messages`` itself when nothing had to change.
+
+        Raises:
+            ContextWindowExceededError: If even the newest turn does not fit.
+        """
+        counter = self.counter
+        counts = [counter.count(msg) for msg in messages]
+        total = sum(counts)
+        if total <= limit:
+            return messages
+
+        messages = list(messages)
+        max_result = self.config.max_tool_result_tokens
+        for i, msg in enumerate(messages):
+            if msg.role == MessageRole.TOOL and counts[i] > max_result + MESSAGE_OVERHEAD:
+                content = counter.truncate(msg.content, max_result)
+                messages[i] = msg.model_copy(update={"content": content})
+                total -= counts[i]
+                counts[i] = counter.count(messages[i])
+                total += counts[i]
+
+        # Turns start at user messages; the newest one is never dropped
+        starts = [i for i, msg in enumerate(messages) if msg.role == MessageRole.USER]
+        keep = [True] * len(messages)
+        dropped = 0
+        for start, end in zip(starts, starts[1:]):
+            if total <= limit:
+                break
+            for i in range(start if start != starts[0] else 0, end):
+                if keep[i] and messages[i].role != MessageRole.SYSTEM:
+                    keep[i] = False
+                    total -= counts[i]
+                    dropped += 1
+        if total > limit:
+            raise ContextWindowExceededError(total, limit)
+
+        if dropped:
+            logger.info("Dropped %d old messages to fit a %d token prompt", dropped, limit)
+        return [msg for i, msg in enumerate(messages) if keep[i]]
+
+
+context_window = ContextWindow()
@@ -0,0 +1,431 @@
+"""Server-side conversation history, so clients only send new messages."""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import load_config
+from app.core.schemas import Conversation, ConversationStoreConfig, Message, MessageRole
+
+logger = logging.getLogger(__name__)
+
+# Length of titles derived from the first user message
+TITLE_LENGTH = 80
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS conversations ("
+    "id TEXT PRIMARY KEY, title TEXT NOT NULL DEFAULT '', provider TEXT, model TEXT, "
+    "starred INTEGER NOT NULL DEFAULT 0, message_count INTEGER NOT NULL DEFAULT 0, "
+    "created_at REAL NOT NULL, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS conversations_updated "
+    "ON conversations(updated_at, id)",
+    "CREATE INDEX IF NOT EXISTS conversations_starred "
+    "ON conversations(starred, updated_at, id)",
+    "CREATE TABLE IF NOT EXISTS messages ("
+    "conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE, "
+    "seq INTEGER NOT NULL, body TEXT NOT NULL, created_at REAL NOT NULL, "
+    "PRIMARY KEY (conversation_id, seq)) WITHOUT ROWID",
+)
+
+_COLUMNS = "id, title, provider, model, starred, message_count, created_at, updated_at"
+
+
+def _conversation(row: Sequence[Any]) -> Conversation:
+    return Conversation(
+        id=row[0],
+        title=row[1],
+        provider=row[2],
+        model=row[3],
+        starred=bool(row[4]),
+        message_count=row[5],
+        created_at=datetime.fromtimestamp(row[6]),
+        updated_at=datetime.fromtimestamp(row[7]),
+    )
+
+
+def _title(messages: Sequence[Message]) -> str:
+    """Title taken from the first user message."""
+    for msg in messages:
+        if msg.role == MessageRole.USER and msg.content.strip():
+            return " ".join(msg.content.split())[:TITLE_LENGTH]
+    return ""
+
+
+def encode_cursor(updated_at: float, conversation_id: str) -> str:
+    """Opaque position in a conversation listing."""
+    return f"{updated_at!r}:{conversation_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Inverse of :func:`encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    updated_at, _, conversation_id = cursor.partition(":")
+    if not conversation_id:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return float(updated_at), conversation_id
+
+
+class ConversationStore:
+    """Conversations and their messages in a SQLite file in WAL mode.
+
+    WAL lets the listing and history reads of the UI run while a chat
+    request appends to another conversation. Messages are stored one row
+    each, so a turn appends rows rather than rewriting the history.
+    Recently used histories are also kept parsed in memory, so a turn
+    reconstructs its context without reading or validating the whole
+    conversation again. Queries run in a worker thread.
+    """
+
+    def __init__(self, config: Optional[ConversationStoreConfig] = None):
+        """Initialize the store.
+
+        Args:
+            config: Store settings. Loaded from config.yaml if None.
+        """
+        self._config = config
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._histories: "OrderedDict[str, List[Message]]" = OrderedDict()
+
+    @property
+    def config(self) -> ConversationStoreConfig:
+        """Store settings."""
+        if self._config is None:
+            self._config = ConversationStoreConfig(**(load_config().get("conversations") or {}))
+        return self._config
+
+    @property
+    def path(self) -> Path:
+        """Database file."""
+        path = Path(self.config.path)
+        if not path.is_absolute() and self.config.path != ":memory:":
+            path = Path(__file__).parent.parent.parent.parent / path
+        return path
+
+    def page_size(self, limit: Optional[int]) -> int:
+        """Page size for a listing, bounded by ``max_page_size``."""
+        if not limit or limit < 1:
+            return self.config.page_size
+        return min(limit, self.config.max_page_size)
+
+    async def create(
+        self,
+        title: Optional[str] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        messages: Sequence[Message] = (),
+    ) -> Conversation:
+        """Start a conversation, optionally with initial messages."""
+        return await asyncio.to_thread(self._create, title, provider, model, list(messages))
+
+    async def get(self, conversation_id: str) -> Optional[Conversation]:
+        """Conversation details, or None if it does not exist."""
+        return await asyncio.to_thread(self._get, conversation_id)
+
+    async def list(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        starred: Optional[bool] = None,
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """Conversations, most recently updated first.
+
+        Args:
+            limit: Page size.
+            cursor: ``next_cursor`` of the previous page.
+            starred: Only starred (True) or unstarred (False) conversations.
+
+        Returns:
+            The page and the cursor of the next one, or None at the end.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        return await asyncio.to_thread(self._list, self.page_size(limit), position, starred)
+
+    async def update(
+        self,
+        conversation_id: str,
+        title: Optional[str] = None,
+        starred: Optional[bool] = None,
+    ) -> Conversation:
+        """Rename or (un)star a conversation.
+
+        Raises:
+            KeyError: If the conversation does not exist.
+        """
+        return await asyncio.to_thread(self._update, conversation_id, title, starred)
+
+    async def delete(self, conversation_id: str) -> None:
+        """Delete a conversation and its messages.
+
+        Raises:
+            KeyError: If the conversation does not exist.
+        """
+        await asyncio.to_thread(self._delete, conversation_id)
+
+    async def history(self, conversation_id: str) -> List[Message]:
+        """Every message of a conversation, oldest first.
+
+        The returned list is a copy and may be extended by the caller.
+
+        Raises:
+            KeyError: If the conversation does not exist.
+        """
+        return await asyncio.to_thread(self._history, conversation_id)
+
+    async def messages(
+        self, conversation_id: str, limit: Optional[int] = None, before: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """A page of messages, oldest first, ending before position ``before``.
+
+        Pages walk backwards from the newest messages, which is how chat
+        views load history while scrolling up.
+
+        Returns:
+            Messages with their ``seq`` position, and the ``before`` value
+            for the previous page, or None if this page starts the history.
+
+        Raises:
+            KeyError: If the conversation does not exist.
+        """
+        return await asyncio.to_thread(
+            self._messages, conversation_id, self.page_size(limit), before
+        )
+
+    async def append(
+        self,
+        conversation_id: str,
+        messages: Sequence[Message],
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> Conversation:
+        """Append messages to a conversation in one transaction.
+
+        Args:
+            conversation_id: Conversation to extend.
+            messages: New messages, oldest first.
+            provider: Provider that answered, recorded on the conversation.
+            model: Model that answered.
+
+        Raises:
+            KeyError: If the conversation does not exist.
+        """
+        return await asyncio.to_thread(
+            self._append, conversation_id, list(messages), provider, model
+        )
+
+    async def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._histories.clear()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.config.path != ":memory:":
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Durable enough in WAL mode, and avoids an fsync per turn
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, conversation_id: str, history: List[Message]) -> None:
+        self._histories[conversation_id] = history
+        self._histories.move_to_end(conversation_id)
+        while len(self._histories) > self.config.max_cached:
+            self._histories.popitem(last=False)
+
+    def _row(self, conn: sqlite3.Connection, conversation_id: str) -> Sequence[Any]:
+        row = conn.execute(
+            f"SELECT {_COLUMNS} FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(conversation_id)
+        return row
+
+    def _insert_messages(
+        self, conn: sqlite3.Connection, conversation_id: str, start: int, messages: List[Message]
+    ) -> None:
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, seq, body, created_at) VALUES (?, ?, ?, ?)",
+            [
+                (conversation_id, start + i, msg.model_dump_json(exclude_none=True), now)
+                for i, msg in enumerate(messages)
+            ],
+        )
+
+    def _create(
+        self,
+        title: Optional[str],
+        provider: Optional[str],
+        model: Optional[str],
+        messages: List[Message],
+    ) -> Conversation:
+        conversation_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    f"INSERT INTO conversations ({_COLUMNS}) VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                    (
+                        conversation_id,
+                        title or _title(messages),
+                        provider,
+                        model,
+                        len(messages),
+                        now,
+                        now,
+                    ),
+                )
+                self._insert_messages(conn, conversation_id, 0, messages)
+            self._remember(conversation_id, list(messages))
+            return _conversation(self._row(conn, conversation_id))
+
+    def _get(self, conversation_id: str) -> Optional[Conversation]:
+        with self._lock:
+            try:
+                return _conversation(self._row(self._connection(), conversation_id))
+            except KeyError:
+                return None
+
+    def _list(
+        self, limit: int, position: Optional[Tuple[float, str]], starred: Optional[bool]
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        clauses, params = [], []
+        if starred is not None:
+            clauses.append("starred = ?")
+            params.append(int(starred))
+        if position is not None:
+            clauses.append("(updated_at < ? OR (updated_at = ? AND id < ?))")
+            params.extend([position[0], position[0], position[1]])
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {_COLUMNS} FROM conversations {where}"
+                "ORDER BY updated_at DESC, id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][7], rows[-1][0])
+        return [_conversation(row) for row in rows], next_cursor
+
+    def _update(
+        self, conversation_id: str, title: Optional[str], starred: Optional[bool]
+    ) -> Conversation:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._row(conn, conversation_id)
+                if title is not None:
+                    conn.execute(
+                        "UPDATE conversations SET title = ? WHERE id = ?", (title, conversation_id)
+                    )
+                if starred is not None:
+                    conn.execute(
+                        "UPDATE conversations SET starred = ? WHERE id = ?",
+                        (int(starred), conversation_id),
+                    )
+            return _conversation(self._row(conn, conversation_id))
+
+    def _delete(self, conversation_id: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM conversations WHERE id = ?", (conversation_id,)
+                ).rowcount
+            self._histories.pop(conversation_id, None)
+        if not deleted:
+            raise KeyError(conversation_id)
+
+    def _history(self, conversation_id: str) -> List[Message]:
+        with self._lock:
+            history = self._histories.get(conversation_id)
+            if history is None:
+                conn = self._connection()
+                self._row(conn, conversation_id)
+                rows = conn.execute(
+                    "SELECT body FROM messages WHERE conversation_id = ? ORDER BY seq",
+                    (conversation_id,),
+                ).fetchall()
+                history = [Message.model_validate_json(row[0]) for row in rows]
+            self._remember(conversation_id, history)
+            return list(history)
+
+    def _messages(
+        self, conversation_id: str, limit: int, before: Optional[int]
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        with self._lock:
+            conn = self._connection()
+            self._row(conn, conversation_id)
+            rows = conn.execute(
+                "SELECT seq, body FROM messages WHERE conversation_id = ? AND seq < ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (conversation_id, before if before is not None else 2**62, limit),
+            ).fetchall()
+        rows.reverse()
+        page = [
+            {"seq": seq, **Message.model_validate_json(body).model_dump(exclude_none=True)}
+            for seq, body in rows
+        ]
+        previous = rows[0][0] if rows and rows[0][0] > 0 else None
+        return page, previous
+
+    def _append(
+        self,
+        conversation_id: str,
+        messages: List[Message],
+        provider: Optional[str],
+        model: Optional[str],
+    ) -> Conversation:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                row = self._row(conn, conversation_id)
+                count = row[5]
+                self._insert_messages(conn, conversation_id, count, messages)
+                conn.execute(
+                    "UPDATE conversations SET message_count = ?, updated_at = ?, "
+                    "provider = COALESCE(?, provider), model = COALESCE(?, model), "
+                    "title = CASE WHEN title = '' THEN ? ELSE title END WHERE id = ?",
+                    (
+                        count + len(messages),
+                        time.time(),
+                        provider,
+                        model,
+                        _title(messages),
+                        conversation_id,
+                    ),
+                )
+            history = self._histories.get(conversation_id)
+            if history is not None:
+                history.extend(messages)
+                self._histories.move_to_end(conversation_id)
+            return _conversation(self._row(conn, conversation_id))
+
+
+conversation_store = ConversationStore()
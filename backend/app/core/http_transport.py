@@ -0,0 +1,386 @@
+"""Shared, tuned HTTP transports for the httpx-based adapters."""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
+
+import httpcore
+import httpx
+
+from app.core.schemas import HTTPTransportConfig
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on installed extras
+    HTTP2_AVAILABLE = False
+
+# httpcore errors and the httpx errors callers (e.g. retries) expect instead
+_HTTPCORE_ERRORS = (
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+)
+
+
+@contextmanager
+def _httpx_errors() -> Iterator[None]:
+    """Re-raise httpcore errors as the most specific matching httpx error."""
+    try:
+        yield
+    except Exception as exc:
+        mapped = None
+        for source, target in _HTTPCORE_ERRORS:
+            if isinstance(exc, source) and (mapped is None or issubclass(target, mapped)):
+                mapped = target
+        if mapped is None:
+            raise
+        raise mapped(str(exc)) from exc
+
+
+def environment_proxies() -> Dict[str, Optional[str]]:
+    """Proxy per httpx mount pattern, from the standard proxy variables.
+
+    Reads ``HTTP_PROXY``, ``HTTPS_PROXY``, ``ALL_PROXY`` and ``NO_PROXY``
+    (either case) the way httpx does when it builds its own transport.
+    Hosts excluded by ``NO_PROXY`` map to None.
+    """
+    proxies = urllib.request.getproxies()
+    no_proxy = [host.strip() for host in proxies.get("no", "").split(",") if host.strip()]
+    if "*" in no_proxy:
+        return {}
+
+    mounts: Dict[str, Optional[str]] = {}
+    for scheme in ("http", "https", "all"):
+        url = proxies.get(scheme)
+        if url:
+            mounts[f"{scheme}://"] = url if "://" in url else f"http://{url}"
+    if not mounts:
+        return {}
+    for host in no_proxy:
+        if "://" in host:
+            mounts[host] = None
+            continue
+        try:
+            address = ipaddress.ip_address(host.split("/")[0])
+        except ValueError:
+            # "*example.com" matches the host and its subdomains
+            pattern = "localhost" if host.lower() == "localhost" else f"*{host}"
+            mounts[f"all://{pattern}"] = None
+        else:
+            mounts[f"all://[{host}]" if address.version == 6 else f"all://{host}"] = None
+    return mounts
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that caches DNS lookups.
+
+    Host names are resolved once per ``ttl`` seconds and the connection is
+    opened to the cached address. TLS still verifies against the original
+    host name, which httpcore passes separately to ``start_tls``.
+    """
+
+    def __init__(self, ttl: float):
+        """Initialize the backend.
+
+        Args:
+            ttl: Seconds a resolved address is reused.
+        """
+        self.ttl = ttl
+        self._backend = httpcore.AnyIOBackend()
+        self._cache: Dict[Tuple[str, int], Tuple[float, str]] = {}
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        """Open a TCP connection, resolving ``host`` through the DNS cache."""
+        address = await self._resolve(host, port)
+        try:
+            return await self._backend.connect_tcp(
+                address,
+                port,
+                timeout=timeout,
+                local_address=local_address,
+                socket_options=socket_options,
+            )
+        except (httpcore.ConnectError, httpcore.ConnectTimeout):
+            # The cached address may be stale; resolve again next time.
+            self._cache.pop((host, port), None)
+            raise
+
+    async def connect_unix_socket(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        socket_options: Optional[Iterable] = None,
+    ) -> httpcore.AsyncNetworkStream:  # pragma: no cover - not used by adapters
+        """Open a unix socket connection."""
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float) -> None:  # pragma: no cover
+        """Sleep using the underlying async backend."""
+        await self._backend.sleep(seconds)
+
+    async def _resolve(self, host: str, port: int) -> str:
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+        now = time.monotonic()
+        cached = self._cache.get((host, port))
+        if cached and cached[0] > now:
+            return cached[1]
+
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port, type=socket.SOCK_STREAM
+            )
+        except OSError:
+            # Let the regular backend surface the resolution error.
+            return host
+        if not infos:
+            return host
+
+        address = infos[0][4][0]
+        self._cache[(host, port)] = (now + self.ttl, address)
+        return address
+
+
+class _PoolResponseStream(httpx.AsyncByteStream):
+    """Response body read from an httpcore connection pool."""
+
+    def __init__(self, stream: AsyncIterator[bytes]):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+class PoolTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore connection pool built by the registry.
+
+    Does what ``httpx.AsyncHTTPTransport`` does, which offers no way to
+    choose the pool's network backend (needed for DNS caching).
+    """
+
+    def __init__(self, pool: httpcore.AsyncConnectionPool):
+        """Initialize the transport.
+
+        Args:
+            pool: Connection pool (or proxy pool) the transport owns.
+        """
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request through the connection pool."""
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = await self.pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_PoolResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        """Close every connection in the pool."""
+        await self.pool.aclose()
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """Non-owning view of a pooled transport.
+
+    Closing an ``httpx.AsyncClient`` closes its transport; adapters close
+    their clients, so they receive this wrapper and the registry keeps
+    ownership of the real connection pool.
+    """
+
+    def __init__(self, transport: PoolTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send the request through the shared connection pool."""
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """No-op; the registry owns the underlying transport."""
+
+
+class TransportRegistry:
+    """Hands out connection pools shared per origin and transport settings."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._transports: Dict[Tuple, PoolTransport] = {}
+        self._warned_http2 = False
+
+    def get_transport(
+        self, base_url: str, config: Optional[HTTPTransportConfig] = None
+    ) -> httpx.AsyncBaseTransport:
+        """Get the shared transport for an origin.
+
+        Args:
+            base_url: URL whose scheme, host and port identify the pool.
+            config: Transport settings. Defaults are used if None.
+
+        Returns:
+            Transport that may be passed to ``httpx.AsyncClient``.
+        """
+        config = config or HTTPTransportConfig()
+        url = httpx.URL(base_url)
+        key = (url.scheme, url.host, url.port, *config.model_dump().values())
+
+        transport = self._transports.get(key)
+        if transport is None:
+            transport = self._build_transport(config)
+            self._transports[key] = transport
+        return _SharedTransport(transport)
+
+    def create_client(
+        self,
+        base_url: str,
+        timeout: float,
+        config: Optional[HTTPTransportConfig] = None,
+        **kwargs,
+    ) -> httpx.AsyncClient:
+        """Create an ``httpx.AsyncClient`` backed by the shared transport.
+
+        Args:
+            base_url: Base URL for the client.
+            timeout: Request timeout in seconds.
+            config: Transport settings.
+            **kwargs: Extra ``httpx.AsyncClient`` arguments.
+
+        Returns:
+            Client whose ``aclose()`` leaves the shared pool open.
+        """
+        if kwargs.get("trust_env", True) and "mounts" not in kwargs:
+            # httpx ignores proxy variables once a transport is passed in
+            kwargs["mounts"] = self.proxy_mounts(config)
+        return httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            transport=self.get_transport(base_url, config),
+            **kwargs,
+        )
+
+    def proxy_mounts(
+        self, config: Optional[HTTPTransportConfig] = None
+    ) -> Dict[str, Optional[httpx.AsyncBaseTransport]]:
+        """Client mounts for the proxies set in the environment.
+
+        Honours ``HTTP_PROXY``, ``HTTPS_PROXY``, ``ALL_PROXY`` and
+        ``NO_PROXY`` as httpx does by default. Each proxy gets its own
+        shared pool; hosts excluded by ``NO_PROXY`` map to None, which
+        sends them through the client's regular transport.
+        """
+        config = config or HTTPTransportConfig()
+        mounts = {}
+        for pattern, proxy_url in environment_proxies().items():
+            if proxy_url is None:
+                mounts[pattern] = None
+                continue
+            key = ("proxy", proxy_url, *config.model_dump().values())
+            transport = self._transports.get(key)
+            if transport is None:
+                transport = self._build_transport(config, httpx.Proxy(proxy_url))
+                self._transports[key] = transport
+            mounts[pattern] = _SharedTransport(transport)
+        return mounts
+
+    async def aclose(self) -> None:
+        """Close every pooled transport. Called on application shutdown."""
+        transports = list(self._transports.values())
+        self._transports.clear()
+        for transport in transports:
+            await transport.aclose()
+
+    def _build_transport(
+        self, config: HTTPTransportConfig, proxy: Optional[httpx.Proxy] = None
+    ) -> PoolTransport:
+        http2 = config.http2
+        if http2 and not HTTP2_AVAILABLE:
+            if not self._warned_http2:
+                logger.warning("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1")
+                self._warned_http2 = True
+            http2 = False
+
+        options = dict(
+            ssl_context=httpx.create_ssl_context(http2=http2),
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+            http2=http2,
+            network_backend=(
+                CachingNetworkBackend(config.dns_cache_ttl) if config.dns_cache_ttl > 0 else None
+            ),
+        )
+        if proxy is None:
+            return PoolTransport(httpcore.AsyncConnectionPool(**options))
+
+        proxy_url = httpcore.URL(
+            scheme=proxy.url.raw_scheme,
+            host=proxy.url.raw_host,
+            port=proxy.url.port,
+            target=proxy.url.raw_path,
+        )
+        if proxy.url.scheme.startswith("socks"):
+            return PoolTransport(
+                httpcore.AsyncSOCKSProxy(proxy_url=proxy_url, proxy_auth=proxy.raw_auth, **options)
+            )
+        return PoolTransport(
+            httpcore.AsyncHTTPProxy(
+                proxy_url=proxy_url,
+                proxy_auth=proxy.raw_auth,
+                proxy_headers=proxy.headers.raw,
+                **options,
+            )
+        )
+
+
+transport_registry = TransportRegistry()
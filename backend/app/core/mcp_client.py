@@ -0,0 +1,588 @@
+"""Warm stdio sessions with the configured MCP servers."""
+
+import asyncio
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.core.config import load_config
+from app.core.mcp_config import MCPConfigStore, mcp_config
+from app.core.schemas import MCPProcessConfig
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "veeam-mcp-chat-client", "version": "0.1.0"}
+
+# Largest JSON-RPC line accepted from a server (tool lists can be large)
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# JSON-RPC error codes
+METHOD_NOT_FOUND = -32601
+
+NotificationListener = Callable[[str, str, Optional[dict]], None]
+
+
+class MCPError(Exception):
+    """Error response returned by an MCP server."""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        """Initialize the error.
+
+        Args:
+            code: JSON-RPC error code.
+            message: Error message from the server.
+            data: Optional extra error data.
+        """
+        super().__init__(f"{message} (code {code})")
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class MCPConnectionError(Exception):
+    """Raised when a server process is not running or exits mid-request."""
+
+    status_code = 502
+
+
+class MCPUnavailableError(Exception):
+    """Raised while a crashed server is waiting to be restarted."""
+
+    status_code = 503
+
+    def __init__(self, name: str, retry_after: float):
+        """Initialize the error.
+
+        Args:
+            name: MCP server name.
+            retry_after: Seconds until the next restart attempt.
+        """
+        super().__init__(f"MCP server '{name}' is restarting")
+        self.name = name
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """HTTP headers to send with the rejection."""
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class MCPSession:
+    """One MCP server process and its JSON-RPC session over stdio.
+
+    Messages are newline-delimited JSON. Requests get increasing ids and
+    any number may be in flight at once; a reader task matches responses
+    to waiting callers by id and hands notifications to ``on_notification``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        command: str,
+        args: Optional[List[str]] = None,
+        env: Optional[Dict[str, str]] = None,
+        request_timeout: float = 60.0,
+        on_notification: Optional[Callable[[str, Optional[dict]], None]] = None,
+        on_exit: Optional[Callable[["MCPSession"], None]] = None,
+    ):
+        """Initialize the session; call :meth:`start` to launch the server.
+
+        Args:
+            name: Server name used in logs and errors.
+            command: Executable to run.
+            args: Command-line arguments.
+            env: Extra environment variables for the process; ``$VAR``
+                references are expanded from the backend's environment.
+            request_timeout: Default seconds to wait for a response.
+            on_notification: Called with (method, params) for each notification.
+            on_exit: Called once if the process exits without :meth:`close`.
+        """
+        self.name = name
+        self.command = command
+        self.args = list(args or [])
+        self.env = dict(env or {})
+        self.request_timeout = request_timeout
+        self.on_notification = on_notification
+        self.on_exit = on_exit
+        self.server_info: Dict[str, Any] = {}
+        self.capabilities: Dict[str, Any] = {}
+        self.started_at: Optional[float] = None
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._write_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+        self._closed = asyncio.Event()
+
+    @property
+    def pid(self) -> Optional[int]:
+        """Process id of the server, if it was launched."""
+        return self._process.pid if self._process else None
+
+    @property
+    def closed(self) -> bool:
+        """Whether the server process has exited or is shutting down."""
+        return self._closing or self._closed.is_set()
+
+    async def start(self, timeout: float = 30.0) -> None:
+        """Launch the server and complete the MCP initialize handshake.
+
+        Raises:
+            MCPConnectionError: If the process cannot be started or exits.
+            MCPError: If the server rejects the handshake.
+            asyncio.TimeoutError: If the handshake takes longer than ``timeout``.
+        """
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                self.command,
+                *self.args,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env={
+                    **os.environ,
+                    **{key: os.path.expandvars(str(value)) for key, value in self.env.items()},
+                },
+                limit=MAX_MESSAGE_SIZE,
+            )
+        except OSError as e:
+            self._closed.set()
+            raise MCPConnectionError(f"Could not start MCP server '{self.name}': {e}") from e
+
+        self.started_at = time.monotonic()
+        self._tasks = [
+            asyncio.ensure_future(self._read_loop()),
+            asyncio.ensure_future(self._drain_stderr()),
+        ]
+        try:
+            result = await self.request(
+                "initialize",
+                {
+                    "protocolVersion": PROTOCOL_VERSION,
+                    "capabilities": {},
+                    "clientInfo": CLIENT_INFO,
+                },
+                timeout=timeout,
+            )
+            self.server_info = result.get("serverInfo") or {}
+            self.capabilities = result.get("capabilities") or {}
+            await self.notify("notifications/initialized")
+        except BaseException:
+            await self.close()
+            raise
+
+    async def request(
+        self, method: str, params: Optional[dict] = None, timeout: Optional[float] = None
+    ) -> Any:
+        """Send a request and wait for its result.
+
+        Args:
+            method: JSON-RPC method, e.g. ``tools/list``.
+            params: Request parameters.
+            timeout: Seconds to wait; defaults to ``request_timeout``. On
+                timeout the server is told to cancel the request.
+
+        Returns:
+            The ``result`` member of the response.
+
+        Raises:
+            MCPError: If the server returns an error.
+            MCPConnectionError: If the process exits before responding.
+            asyncio.TimeoutError: If no response arrives in time.
+        """
+        if self.closed:
+            raise MCPConnectionError(f"MCP server '{self.name}' is not running")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        try:
+            await self._send(message)
+            return await asyncio.wait_for(
+                future, self.request_timeout if timeout is None else timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if not self.closed:
+                await self._cancel_remote(request_id)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def notify(self, method: str, params: Optional[dict] = None) -> None:
+        """Send a notification (no response expected)."""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._send(message)
+
+    async def wait_closed(self) -> None:
+        """Wait until the process has exited."""
+        await self._closed.wait()
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Stop the server: close stdin, then terminate or kill if it lingers."""
+        self._closing = True
+        process = self._process
+        if process is not None and process.returncode is None:
+            try:
+                process.stdin.close()
+                await asyncio.wait_for(process.wait(), timeout)
+            except (asyncio.TimeoutError, OSError):
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), timeout)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._fail_pending()
+        self._closed.set()
+
+    async def _send(self, message: dict) -> None:
+        data = json.dumps(message, separators=(",", ":")).encode() + b"\n"
+        async with self._write_lock:
+            try:
+                self._process.stdin.write(data)
+                await self._process.stdin.drain()
+            except (ConnectionError, OSError) as e:
+                raise MCPConnectionError(f"MCP server '{self.name}' closed its input") from e
+
+    async def _cancel_remote(self, request_id: int) -> None:
+        try:
+            await self.notify(
+                "notifications/cancelled", {"requestId": request_id, "reason": "timeout"}
+            )
+        except MCPConnectionError:
+            pass
+
+    async def _read_loop(self) -> None:
+        stdout = self._process.stdout
+        try:
+            while True:
+                line = await stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    logger.warning("MCP server %s sent invalid JSON: %.200r", self.name, line)
+                    continue
+                await self._dispatch(message)
+        except (ValueError, ConnectionError) as e:
+            # ValueError: a line longer than MAX_MESSAGE_SIZE
+            logger.error("Lost stdio session with MCP server %s: %s", self.name, e)
+        finally:
+            await self._on_eof()
+
+    async def _dispatch(self, message: dict) -> None:
+        if "method" in message:
+            if "id" in message:
+                await self._answer(message)
+            elif self.on_notification is not None:
+                try:
+                    self.on_notification(message["method"], message.get("params"))
+                except Exception:
+                    logger.warning("MCP notification handler failed", exc_info=True)
+            return
+
+        future = self._pending.get(message.get("id"))
+        if future is None or future.done():
+            return
+        if "error" in message:
+            error = message["error"] or {}
+            future.set_exception(
+                MCPError(error.get("code", 0), error.get("message", ""), error.get("data"))
+            )
+        else:
+            future.set_result(message.get("result"))
+
+    async def _answer(self, message: dict) -> None:
+        """Respond to a request sent by the server."""
+        response = {"jsonrpc": "2.0", "id": message["id"]}
+        if message["method"] == "ping":
+            response["result"] = {}
+        else:
+            response["error"] = {
+                "code": METHOD_NOT_FOUND,
+                "message": f"Method not found: {message['method']}",
+            }
+        try:
+            await self._send(response)
+        except MCPConnectionError:
+            pass
+
+    async def _drain_stderr(self) -> None:
+        """Log the server's stderr so the pipe never fills up."""
+        while True:
+            line = await self._process.stderr.readline()
+            if not line:
+                return
+            logger.debug("[mcp:%s] %s", self.name, line.decode(errors="replace").rstrip())
+
+    async def _on_eof(self) -> None:
+        crashed = not self._closing
+        if crashed:
+            self._closing = True
+            if self._process.returncode is None:
+                self._process.kill()
+            await self._process.wait()
+            logger.warning(
+                "MCP server %s exited with code %s", self.name, self._process.returncode
+            )
+        self._fail_pending()
+        self._closed.set()
+        if crashed and self.on_exit is not None:
+            self.on_exit(self)
+
+    def _fail_pending(self) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(
+                    MCPConnectionError(f"MCP server '{self.name}' exited")
+                )
+
+
+class _ServerState:
+    """Session and restart bookkeeping for one configured server."""
+
+    __slots__ = (
+        "session", "starting", "restarting", "failures", "retry_at", "restarts", "last_error"
+    )
+
+    def __init__(self):
+        self.session: Optional[MCPSession] = None
+        self.starting: Optional[asyncio.Task] = None
+        self.restarting: Optional[asyncio.Task] = None
+        self.failures = 0
+        self.retry_at = 0.0
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+
+
+class MCPProcessManager:
+    """Keeps one warm session per configured MCP server.
+
+    Servers are launched at startup (or on first use) and shared by all
+    callers. A server that crashes is restarted in the background after a
+    delay that doubles with each consecutive failure; callers arriving
+    during the delay get :class:`MCPUnavailableError`. Servers whose
+    definition changes in the config store are stopped and relaunched from
+    the new definition on next use.
+    """
+
+    def __init__(
+        self,
+        store: MCPConfigStore = mcp_config,
+        config: Optional[MCPProcessConfig] = None,
+    ):
+        """Initialize the manager.
+
+        Args:
+            store: Source of server definitions.
+            config: Process settings. Loaded from config.yaml if None.
+        """
+        self.store = store
+        self._config = config
+        self._servers: Dict[str, _ServerState] = {}
+        self._listeners: List[NotificationListener] = []
+        self._task: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()
+        self._stopping = False
+        store.add_listener(self.on_config_change)
+
+    @property
+    def config(self) -> MCPProcessConfig:
+        """Process settings."""
+        if self._config is None:
+            self._config = MCPProcessConfig(**(load_config().get("mcp") or {}))
+        return self._config
+
+    def add_notification_listener(self, listener: NotificationListener) -> None:
+        """Call ``listener`` with (server, method, params) for server notifications."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    async def session(self, name: str) -> MCPSession:
+        """The warm session for ``name``, launching the server if needed.
+
+        Raises:
+            KeyError: If no server with that name is configured.
+            MCPUnavailableError: If the server crashed and is waiting to restart.
+            MCPConnectionError: If the server cannot be started.
+        """
+        state = self._servers.get(name)
+        if state is None:
+            state = self._servers[name] = _ServerState()
+        if state.session is not None and not state.session.closed:
+            return state.session
+        if state.starting is None:
+            delay = state.retry_at - time.monotonic()
+            if delay > 0:
+                raise MCPUnavailableError(name, delay)
+            state.starting = asyncio.ensure_future(self._spawn(name, state))
+            state.starting.add_done_callback(lambda _: setattr(state, "starting", None))
+        # Shield the shared launch from this caller being cancelled
+        return await asyncio.shield(state.starting)
+
+    async def request(
+        self,
+        name: str,
+        method: str,
+        params: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Send a request to server ``name`` over its warm session."""
+        session = await self.session(name)
+        return await session.request(method, params, timeout=timeout)
+
+    def start(self) -> None:
+        """Launch every configured server in the background."""
+        self._stopping = False
+        if self.config.autostart and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._start_all())
+
+    async def stop(self) -> None:
+        """Stop every server and any pending restarts."""
+        self._stopping = True
+        tasks = [
+            task
+            for state in self._servers.values()
+            for task in (state.starting, state.restarting)
+            if task is not None
+        ]
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        sessions = [state.session for state in self._servers.values() if state.session]
+        self._servers.clear()
+        await asyncio.gather(*(session.close() for session in sessions), *self._closing)
+
+    def on_config_change(self, names) -> None:
+        """Stop servers whose definitions changed; they relaunch on next use."""
+        for name in names:
+            state = self._servers.pop(name, None)
+            if state is None:
+                continue
+            for task in (state.starting, state.restarting):
+                if task is not None:
+                    task.cancel()
+            if state.session is not None:
+                task = asyncio.ensure_future(state.session.close())
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            logger.info("MCP server %s definition changed; it will be relaunched", name)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """State of every server that has been launched."""
+        now = time.monotonic()
+        result = {}
+        for name, state in self._servers.items():
+            session = state.session
+            running = session is not None and not session.closed
+            result[name] = {
+                "running": running,
+                "pid": session.pid if running else None,
+                "uptime": round(now - session.started_at, 3) if running else None,
+                "server_info": session.server_info if running else {},
+                "restarts": state.restarts,
+                "consecutive_failures": state.failures,
+                "retry_after": round(max(0.0, state.retry_at - now), 3),
+                "last_error": state.last_error,
+            }
+        return result
+
+    async def _start_all(self) -> None:
+        for name in await self.store.servers():
+            try:
+                await self.session(name)
+            except Exception as e:
+                logger.warning("Could not start MCP server %s: %s", name, e)
+
+    async def _spawn(self, name: str, state: _ServerState) -> MCPSession:
+        definition = await self.store.get(name)
+        if definition is None:
+            raise KeyError(name)
+        session = MCPSession(
+            name,
+            definition.get("command", ""),
+            definition.get("args") or [],
+            definition.get("env") or {},
+            request_timeout=self.config.request_timeout,
+            on_notification=lambda method, params: self._notify(name, method, params),
+            on_exit=lambda s: self._on_exit(name, state, s),
+        )
+        try:
+            await session.start(self.config.start_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record_failure(name, state, f"Failed to start: {e}")
+            raise
+        if self._servers.get(name) is not state:
+            # Definition changed while starting
+            await session.close()
+            raise MCPConnectionError(f"MCP server '{name}' was reconfigured while starting")
+        state.session = session
+        state.last_error = None
+        logger.info(
+            "MCP server %s started (pid %s, %s)",
+            name, session.pid, session.server_info.get("name", "unknown"),
+        )
+        return session
+
+    def _on_exit(self, name: str, state: _ServerState, session: MCPSession) -> None:
+        if self._servers.get(name) is not state or state.session is not session:
+            return
+        if time.monotonic() - session.started_at >= self.config.reset_after:
+            state.failures = 0
+        self._record_failure(name, state, "Exited unexpectedly")
+        if not self._stopping and (state.restarting is None or state.restarting.done()):
+            state.restarting = asyncio.ensure_future(self._restart(name, state))
+
+    def _record_failure(self, name: str, state: _ServerState, error: str) -> None:
+        state.failures += 1
+        state.last_error = error
+        delay = min(
+            self.config.backoff_max,
+            self.config.backoff_initial * 2 ** (state.failures - 1),
+        )
+        state.retry_at = time.monotonic() + delay
+        logger.warning("MCP server %s: %s; retrying in %.1fs", name, error, delay)
+
+    async def _restart(self, name: str, state: _ServerState) -> None:
+        """Relaunch a crashed server once its backoff delay has passed."""
+        while self._servers.get(name) is state and not self._stopping:
+            await asyncio.sleep(max(0.0, state.retry_at - time.monotonic()))
+            if self._servers.get(name) is not state:
+                return
+            try:
+                await self.session(name)
+            except MCPUnavailableError:
+                continue
+            except KeyError:
+                return
+            except Exception:
+                # Failure already recorded with a longer delay
+                continue
+            state.restarts += 1
+            return
+
+    def _notify(self, name: str, method: str, params: Optional[dict]) -> None:
+        for listener in self._listeners:
+            listener(name, method, params)
+
+
+mcp_manager = MCPProcessManager()
@@ -0,0 +1,245 @@
+"""In-memory store for MCP server definitions kept in config.yaml."""
+
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import os
+import stat
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from app.core.config import DEFAULT_CONFIG_PATH
+
+
+def make_etag(value) -> str:
+    """Strong ETag for a JSON-serializable value."""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(canonical.encode()).hexdigest()[:16] + '"'
+
+
+def is_weak_etag(tag: str) -> bool:
+    """Whether an entity tag is weak (``W/"..."``)."""
+    return tag.strip().startswith("W/")
+
+
+def etag_matches(header: Optional[str], etag: Optional[str], weak: bool = False) -> bool:
+    """Whether an If-Match/If-None-Match header value matches ``etag``.
+
+    Args:
+        header: Header value: ``*`` or a comma-separated list of ETags.
+        etag: Current ETag, or None if the resource does not exist.
+        weak: Use the weak comparison of RFC 7232 section 2.3.2, which
+            ignores ``W/``. If-None-Match uses it; If-Match needs the strong
+            comparison, where weak tags never match.
+    """
+    if header is None or etag is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    if "*" in tags:
+        return True
+    if weak:
+        return any(tag.removeprefix("W/") == etag for tag in tags)
+    return any(not is_weak_etag(tag) and tag == etag for tag in tags)
+
+
+class PreconditionFailedError(Exception):
+    """Raised when an If-Match precondition does not hold."""
+
+    status_code = 412
+
+    def __init__(self, name: str, etag: Optional[str]):
+        """Initialize the error.
+
+        Args:
+            name: MCP server name.
+            etag: The server's current ETag, or None if it does not exist.
+        """
+        super().__init__(f"MCP server '{name}' has changed; reload it and try again")
+        self.name = name
+        self.etag = etag
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """HTTP headers to send with the rejection."""
+        return {"ETag": self.etag} if self.etag else {}
+
+
+class MCPConfigStore:
+    """MCP server definitions from the ``mcp_servers`` block of config.yaml.
+
+    Definitions are kept in memory and reloaded only when the file changes
+    on disk. Mutations are serialized by an async lock and written in a
+    worker thread to a temporary file that atomically replaces config.yaml,
+    leaving every other section of the file untouched. Servers and the
+    server list carry ETags for conditional requests, and listeners are told
+    which servers changed.
+    """
+
+    def __init__(self, path: Optional[Path] = None, check_interval: float = 1.0):
+        """Initialize the store.
+
+        Args:
+            path: Config file. Defaults to config/config.yaml.
+            check_interval: Minimum seconds between checks of the file.
+        """
+        self.path = Path(path) if path is not None else DEFAULT_CONFIG_PATH
+        self.check_interval = check_interval
+        self._servers: Optional[Dict[str, Dict]] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._checked_at = -math.inf
+        self._lock = asyncio.Lock()
+        self._listeners: List[Callable[[Set[str]], None]] = []
+
+    def add_listener(self, listener: Callable[[Set[str]], None]) -> None:
+        """Call ``listener`` with the names of servers that were added, changed or removed."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    async def servers(self) -> Dict[str, Dict]:
+        """All server definitions by name. Treat them as read-only."""
+        if self._servers is None or time.monotonic() - self._checked_at >= self.check_interval:
+            async with self._lock:
+                await self._reload()
+        return self._servers
+
+    async def get(self, name: str) -> Optional[Dict]:
+        """One server's definition, or None if it is not configured."""
+        return (await self.servers()).get(name)
+
+    async def etag(self, name: Optional[str] = None) -> Optional[str]:
+        """ETag of one server, or of the whole list if ``name`` is None."""
+        servers = await self.servers()
+        if name is None:
+            return make_etag(servers)
+        return make_etag(servers[name]) if name in servers else None
+
+    async def save(
+        self,
+        name: str,
+        server: Dict,
+        if_match: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+    ) -> str:
+        """Create or replace a server definition.
+
+        Args:
+            name: Server name.
+            server: Server definition (command, args and optional env).
+            if_match: Optional If-Match header; the write only happens if it
+                matches the server's current ETag.
+            if_none_match: Optional If-None-Match header; ``*`` only creates
+                the server if it does not exist yet.
+
+        Returns:
+            The server's new ETag.
+
+        Raises:
+            PreconditionFailedError: If ``if_match`` does not match.
+        """
+        async with self._lock:
+            await self._reload()
+            self._check_precondition(name, if_match, if_none_match)
+            servers = {**self._servers, name: copy.deepcopy(server)}
+            await self._write(servers)
+        return make_etag(server)
+
+    async def delete(self, name: str, if_match: Optional[str] = None) -> None:
+        """Remove a server definition.
+
+        Raises:
+            KeyError: If the server is not configured.
+            PreconditionFailedError: If ``if_match`` does not match.
+        """
+        async with self._lock:
+            await self._reload()
+            if name not in self._servers:
+                raise KeyError(name)
+            self._check_precondition(name, if_match)
+            servers = {key: value for key, value in self._servers.items() if key != name}
+            await self._write(servers)
+
+    def _check_precondition(
+        self, name: str, if_match: Optional[str], if_none_match: Optional[str] = None
+    ) -> None:
+        current = make_etag(self._servers[name]) if name in self._servers else None
+        if if_match is not None and not etag_matches(if_match, current):
+            raise PreconditionFailedError(name, current)
+        if if_none_match is not None and etag_matches(if_none_match, current, weak=True):
+            raise PreconditionFailedError(name, current)
+
+    async def _reload(self) -> None:
+        """Reload from disk if the file changed. Call with the lock held."""
+        self._checked_at = time.monotonic()
+        signature = await asyncio.to_thread(self._stat)
+        if self._servers is not None and signature == self._signature:
+            return
+        servers = await asyncio.to_thread(self._read_servers)
+        self._signature = signature
+        self._replace(servers)
+
+    async def _write(self, servers: Dict[str, Dict]) -> None:
+        """Persist ``servers`` and make them current. Call with the lock held."""
+        self._signature = await asyncio.to_thread(self._write_servers, servers)
+        self._checked_at = time.monotonic()
+        self._replace(servers)
+
+    def _replace(self, servers: Dict[str, Dict]) -> None:
+        previous, self._servers = self._servers, servers
+        if previous is None:
+            return
+        changed = {
+            name
+            for name in {*previous, *servers}
+            if previous.get(name) != servers.get(name)
+        }
+        if changed:
+            for listener in self._listeners:
+                listener(changed)
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _read_document(self) -> Dict:
+        try:
+            with open(self.path, "r") as f:
+                return yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            return {}
+
+    def _read_servers(self) -> Dict[str, Dict]:
+        return self._read_document().get("mcp_servers") or {}
+
+    def _write_servers(self, servers: Dict[str, Dict]) -> Optional[Tuple[int, int, int]]:
+        """Rewrite the ``mcp_servers`` block atomically; returns the new signature."""
+        document = self._read_document()
+        document["mcp_servers"] = servers
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            mode = stat.S_IMODE(self.path.stat().st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            os.chmod(tmp, mode)
+            with os.fdopen(fd, "w") as f:
+                yaml.dump(document, f, default_flow_style=False, sort_keys=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return self._stat()
+
+
+mcp_config = MCPConfigStore()
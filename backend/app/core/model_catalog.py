@@ -0,0 +1,311 @@
+"""Cached per-provider model lists, persisted across restarts."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.adapter_pool import AdapterPool, adapter_pool
+from app.core.base_adapter import BaseLLMAdapter
+from app.core.config import get_env_llm_config, load_config
+from app.core.schemas import AdapterCapabilities, ModelCatalogConfig, ModelInfo
+
+logger = logging.getLogger(__name__)
+
+
+class _CatalogEntry:
+    """A provider's model list and when it was fetched (wall-clock time)."""
+
+    __slots__ = ("models", "fetched_at")
+
+    def __init__(self, models: List[ModelInfo], fetched_at: Optional[float] = None):
+        self.models = models
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+
+class ModelCatalog:
+    """Serves provider model lists from a TTL cache with stale-while-revalidate.
+
+    Lists younger than ``ttl`` are served as is; stale ones (within
+    ``max_stale``) are served while a refresh runs in the background. Only
+    a provider with no usable list waits for a fetch, bounded by
+    ``fetch_timeout``. The catalog is written to ``path`` after every
+    refresh, so a restart starts from the last known lists.
+    """
+
+    def __init__(
+        self,
+        pool: AdapterPool = adapter_pool,
+        config: Optional[ModelCatalogConfig] = None,
+    ):
+        """Initialize the catalog.
+
+        Args:
+            pool: Adapter pool used to fetch model lists.
+            config: Cache settings. Loaded from config.yaml if None.
+        """
+        self.pool = pool
+        self._config = config
+        self._entries: Dict[str, _CatalogEntry] = {}
+        self._loaded = False
+        self._loading: Optional[asyncio.Future] = None
+        self._discarded: Set[str] = set()  # Invalidated before the file was read
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._save_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def config(self) -> ModelCatalogConfig:
+        """Cache settings."""
+        if self._config is None:
+            self._config = ModelCatalogConfig(**(load_config().get("model_catalog") or {}))
+        return self._config
+
+    @property
+    def path(self) -> Path:
+        """File the catalog is persisted to."""
+        path = Path(self.config.path)
+        if not path.is_absolute():
+            path = Path(__file__).parent.parent.parent.parent / path
+        return path
+
+    @property
+    def entries(self) -> Dict[str, _CatalogEntry]:
+        """Cached entries.
+
+        The persisted catalog is read in a worker thread on first use; until
+        it has been read, only lists fetched since startup are known.
+        """
+        if not self._loaded:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                self._merge(self._read())
+            else:
+                self._start_loading()
+        return self._entries
+
+    async def load(self) -> None:
+        """Read the persisted catalog without blocking the event loop."""
+        if not self._loaded:
+            self._merge(await asyncio.shield(self._start_loading()))
+
+    def cached(self, provider: str) -> Optional[List[ModelInfo]]:
+        """Models for ``provider`` without waiting, or None if unknown.
+
+        Schedules a background refresh when the list is stale or missing.
+        """
+        entry = self.entries.get(provider)
+        age = time.time() - entry.fetched_at if entry else None
+        if entry is None or age > self.config.ttl:
+            self._revalidate(provider)
+        if entry is None or age > self.config.max_stale:
+            return None
+        return entry.models
+
+    async def models(self, provider: str, wait: bool = True) -> List[ModelInfo]:
+        """Models for ``provider``, from cache where possible.
+
+        Args:
+            provider: Provider name.
+            wait: Whether to wait (up to ``fetch_timeout``) for a fetch when
+                nothing usable is cached. If False an empty list is returned
+                and the fetch continues in the background.
+
+        Returns:
+            The model list. If a fetch fails, the last known list, however
+            old, or an empty list.
+        """
+        models = self.cached(provider)
+        if models is not None:
+            return models
+        if wait:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.shield(self._revalidate(provider)), self.config.fetch_timeout
+                )
+            except Exception:
+                pass
+        entry = self.entries.get(provider)
+        return entry.models if entry else []
+
+    async def refresh(self, provider: str) -> List[ModelInfo]:
+        """Fetch ``provider``'s models now, ignoring the cache.
+
+        Raises:
+            Exception: Whatever the adapter raised if the fetch failed.
+        """
+        return await asyncio.shield(self._revalidate(provider))
+
+    def context_length(self, provider: str, model: Optional[str]) -> Optional[int]:
+        """Cached context length of one model, if the provider reported it.
+
+        Schedules a background refresh when the provider's list is stale or
+        missing, so the length is known for later requests.
+        """
+        self.cached(provider)
+        entry = self.entries.get(provider)
+        if entry is None or model is None:
+            return None
+        for info in entry.models:
+            if info.id == model:
+                return info.context_length
+        return None
+
+    def capabilities(self, adapter: BaseLLMAdapter) -> AdapterCapabilities:
+        """Adapter capabilities with model details filled in from the catalog.
+
+        Falls back to the adapter's static capabilities when nothing is
+        cached yet; a refresh is scheduled in that case.
+        """
+        capabilities = adapter.get_capabilities()
+        models = self.cached(capabilities.provider)
+        if not models:
+            return capabilities
+        update = {"supported_models": [model.id for model in models]}
+        context_length = self.context_length(capabilities.provider, adapter.config.model)
+        if context_length:
+            update["max_context_length"] = context_length
+        return capabilities.model_copy(update=update)
+
+    def invalidate(self, provider: Optional[str] = None) -> None:
+        """Forget cached lists, e.g. after an API key changes.
+
+        Fetches already running are detached so their results are discarded.
+        """
+        for key in [k for k in self.entries if provider is None or k == provider]:
+            del self.entries[key]
+        if not self._loaded:
+            if provider is None:
+                self._loaded = True
+            else:
+                self._discarded.add(provider)
+        for key in [k for k in self._refreshing if provider is None or k == provider]:
+            del self._refreshing[key]
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(self._serialize())
+        else:
+            asyncio.ensure_future(self._save())
+
+    def start(self) -> None:
+        """Load the persisted catalog and refresh stale configured providers.
+
+        Runs in the background so startup never waits on a listing call.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._warm())
+
+    async def close(self) -> None:
+        """Stop any fetches in progress."""
+        tasks = list(self._refreshing.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _warm(self) -> None:
+        await self.load()
+        for provider in AdapterFactory.get_supported_providers():
+            # Keyless providers such as Ollama are configured by config.yaml alone
+            try:
+                AdapterFactory.build_config(provider, config=get_env_llm_config(provider))
+            except Exception:
+                continue
+            self.cached(provider)
+
+    def _revalidate(self, provider: str) -> asyncio.Task:
+        """Start (or join) a fetch of ``provider``'s models that updates the cache."""
+        task = self._refreshing.get(provider)
+        if task is None:
+            task = asyncio.ensure_future(self._update(provider))
+            self._refreshing[provider] = task
+            task.add_done_callback(lambda _: self._forget(provider, task))
+        return task
+
+    def _forget(self, provider: str, task: asyncio.Task) -> None:
+        if self._refreshing.get(provider) is task:
+            del self._refreshing[provider]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Could not list %s models: %s", provider, task.exception())
+
+    async def _update(self, provider: str) -> List[ModelInfo]:
+        config = get_env_llm_config(provider)
+        async with self.pool.lease(provider, config=config) as adapter:
+            models = await adapter.fetch_models()
+        if self._refreshing.get(provider) is not asyncio.current_task():
+            # Invalidated while fetching; the result may be out of date
+            return models
+        self.entries[provider] = _CatalogEntry(models)
+        await self._save()
+        return models
+
+    def _start_loading(self) -> asyncio.Future:
+        """Start reading the persisted catalog in a worker thread, once."""
+        if self._loading is None or self._loading.cancelled():
+            self._loading = asyncio.ensure_future(asyncio.to_thread(self._read))
+            self._loading.add_done_callback(
+                lambda task: None if task.cancelled() else self._merge(task.result())
+            )
+        return self._loading
+
+    def _merge(self, entries: Dict[str, _CatalogEntry]) -> None:
+        """Add persisted entries; lists fetched or invalidated since startup win."""
+        if self._loaded:
+            return
+        self._loaded = True
+        for provider, entry in entries.items():
+            if provider not in self._discarded:
+                self._entries.setdefault(provider, entry)
+        self._discarded.clear()
+
+    def _serialize(self) -> dict:
+        return {
+            provider: {
+                "fetched_at": entry.fetched_at,
+                "models": [model.model_dump(exclude_none=True) for model in entry.models],
+            }
+            for provider, entry in self.entries.items()
+        }
+
+    async def _save(self) -> None:
+        # Writing before the file was read would drop the lists it holds
+        await self.load()
+        async with self._save_lock:
+            try:
+                await asyncio.to_thread(self._write, self._serialize())
+            except Exception:
+                logger.warning("Could not persist the model catalog", exc_info=True)
+
+    def _write(self, data: dict) -> None:
+        """Replace the catalog file atomically via a temporary file."""
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data))
+        os.replace(tmp, path)
+
+    def _read(self) -> Dict[str, _CatalogEntry]:
+        try:
+            data = json.loads(self.path.read_text())
+            return {
+                provider: _CatalogEntry(
+                    [ModelInfo(**model) for model in entry["models"]], entry["fetched_at"]
+                )
+                for provider, entry in data.items()
+            }
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            logger.warning("Ignoring unreadable model catalog at %s", self.path, exc_info=True)
+            return {}
+
+
+model_catalog = ModelCatalog()
@@ -0,0 +1,216 @@
+"""Cached, concurrently refreshed provider status for the settings page."""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.adapter_pool import AdapterPool, adapter_pool
+from app.core.config import get_env_llm_config, load_config
+from app.core.model_catalog import ModelCatalog, model_catalog
+from app.core.schemas import ProviderStatus, ProviderStatusConfig
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """A cached status and when it was checked and last read."""
+
+    __slots__ = ("status", "checked_at", "read_at")
+
+    def __init__(self, status: ProviderStatus):
+        self.status = status
+        self.checked_at = time.monotonic()
+        self.read_at = self.checked_at
+
+
+class ProviderStatusMonitor:
+    """Serves provider statuses from a TTL cache with stale-while-revalidate.
+
+    Fresh statuses are returned as is. Stale ones (older than ``ttl`` but
+    within ``max_stale``) are returned immediately while a refresh runs in
+    the background; anything older is checked before returning. All checks
+    run concurrently, each bounded by ``check_timeout``, and a background
+    task keeps statuses that are being polled fresh.
+    """
+
+    def __init__(
+        self,
+        pool: AdapterPool = adapter_pool,
+        config: Optional[ProviderStatusConfig] = None,
+        catalog: ModelCatalog = model_catalog,
+    ):
+        """Initialize the monitor.
+
+        Args:
+            pool: Adapter pool used for the checks.
+            config: Cache settings. Loaded from config.yaml if None.
+            catalog: Source of each provider's available models.
+        """
+        self.pool = pool
+        self.catalog = catalog
+        self._config = config
+        self._entries: Dict[str, _Entry] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def config(self) -> ProviderStatusConfig:
+        """Cache settings."""
+        if self._config is None:
+            self._config = ProviderStatusConfig(**(load_config().get("provider_status") or {}))
+        return self._config
+
+    async def statuses(self, providers: Optional[List[str]] = None) -> List[ProviderStatus]:
+        """Status of each provider, from cache where possible.
+
+        Args:
+            providers: Providers to report. Defaults to all supported ones.
+        """
+        providers = providers or AdapterFactory.get_supported_providers()
+        now = time.monotonic()
+        statuses: Dict[str, ProviderStatus] = {}
+        pending: Dict[str, asyncio.Task] = {}
+        for provider in providers:
+            entry = self._entries.get(provider)
+            age = now - entry.checked_at if entry else None
+            if entry is None or age > self.config.max_stale:
+                pending[provider] = self._revalidate(provider)
+                continue
+            entry.read_at = now
+            statuses[provider] = entry.status
+            if age > self.config.ttl:
+                self._revalidate(provider)
+
+        if pending:
+            # Shield the shared checks from this caller being cancelled
+            checked = await asyncio.gather(*(asyncio.shield(task) for task in pending.values()))
+            statuses.update(zip(pending, checked))
+        return [statuses[provider] for provider in providers]
+
+    async def refresh(self, providers: Optional[List[str]] = None) -> List[ProviderStatus]:
+        """Check providers now, ignoring cached statuses."""
+        providers = providers or AdapterFactory.get_supported_providers()
+        return list(
+            await asyncio.gather(
+                *(asyncio.shield(self._revalidate(provider)) for provider in providers)
+            )
+        )
+
+    def invalidate(self, provider: Optional[str] = None) -> None:
+        """Forget cached statuses, e.g. after an API key changes.
+
+        Checks already running are detached so their results are discarded.
+        """
+        for key in [k for k in self._entries if provider is None or k == provider]:
+            del self._entries[key]
+        for key in [k for k in self._refreshing if provider is None or k == provider]:
+            del self._refreshing[key]
+
+    def start(self) -> None:
+        """Start the background refresh task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop background refreshing and any checks in progress."""
+        tasks = list(self._refreshing.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _revalidate(self, provider: str) -> asyncio.Task:
+        """Start (or join) a check of ``provider`` that updates the cache."""
+        task = self._refreshing.get(provider)
+        if task is None:
+            task = asyncio.ensure_future(self._update(provider))
+            self._refreshing[provider] = task
+            task.add_done_callback(lambda _: self._forget(provider, task))
+        return task
+
+    def _forget(self, provider: str, task: asyncio.Task) -> None:
+        if self._refreshing.get(provider) is task:
+            del self._refreshing[provider]
+
+    async def _update(self, provider: str) -> ProviderStatus:
+        status = await self.check(provider)
+        if self._refreshing.get(provider) is not asyncio.current_task():
+            # Invalidated while checking; the result may be out of date
+            return status
+        previous = self._entries.get(provider)
+        entry = _Entry(status)
+        if previous is not None:
+            entry.read_at = previous.read_at
+        self._entries[provider] = entry
+        return status
+
+    async def check(self, provider: str) -> ProviderStatus:
+        """Check one provider's health and models, bounded by ``check_timeout``.
+
+        Models come from the catalog; if it has no list yet and cannot fetch
+        one in time, the adapter's static model list is reported and the
+        fetch carries on in the background.
+        """
+        config = get_env_llm_config(provider)
+        if config is None:
+            return ProviderStatus(
+                provider=provider, configured=False, healthy=False, checked_at=datetime.now()
+            )
+
+        timeout = self.config.check_timeout
+        healthy = False
+        available_models: List[str] = []
+        error = None
+        try:
+            async with self.pool.lease(provider, config=config) as adapter:
+                available_models = adapter.get_capabilities().supported_models
+                health, models = await asyncio.gather(
+                    asyncio.wait_for(adapter.health_check(), timeout),
+                    asyncio.wait_for(self.catalog.models(provider), timeout),
+                    return_exceptions=True,
+                )
+
+            if isinstance(health, asyncio.TimeoutError):
+                error = f"Health check timed out after {timeout:g}s"
+            elif isinstance(health, Exception):
+                error = str(health)
+            else:
+                healthy = bool(health)
+            if models and not isinstance(models, Exception):
+                available_models = [model.id for model in models]
+        except Exception as e:
+            error = str(e)
+
+        return ProviderStatus(
+            provider=provider,
+            configured=True,
+            healthy=healthy,
+            available_models=available_models,
+            error=error,
+            checked_at=datetime.now(),
+        )
+
+    async def _refresh_loop(self) -> None:
+        """Periodically refresh statuses that clients are still polling."""
+        while True:
+            await asyncio.sleep(self.config.refresh_interval)
+            now = time.monotonic()
+            polled = [
+                provider
+                for provider, entry in self._entries.items()
+                if now - entry.read_at <= self.config.max_stale
+            ]
+            if not polled:
+                continue
+            try:
+                await self.refresh(polled)
+            except Exception:
+                logger.warning("Background provider status refresh failed", exc_info=True)
+
+
+provider_status = ProviderStatusMonitor()
@@ -0,0 +1,333 @@
+"""Client-side rate limiting that learns from provider rate-limit headers."""
+
+import asyncio
+import logging
+import math
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+from app.core.adapter_pool import credential_fingerprint
+from app.core.base_adapter import BaseLLMAdapter
+from app.core.config import config_store, get_llm_config
+from app.core.schemas import Message, RateLimitConfig
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class RateLimitedError(Exception):
+    """Raised when a request would exceed the provider's rate limit."""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: float):
+        """Initialize the error.
+
+        Args:
+            message: Human readable reason.
+            retry_after: Suggested seconds before retrying.
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """HTTP headers to send with the rejection."""
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+def estimate_tokens(messages: List[Message], max_tokens: Optional[int] = None) -> int:
+    """Roughly estimate the tokens a request will consume.
+
+    Uses ~4 characters per token for the prompt plus the completion budget,
+    which is how providers charge requests against token-per-minute limits.
+    """
+    prompt_chars = sum(len(msg.content) for msg in messages)
+    return prompt_chars // 4 + len(messages) * 4 + (max_tokens or 0)
+
+
+def usage_tokens(usage: Optional[Dict[str, int]]) -> int:
+    """Tokens a response consumed, from any provider's usage dict."""
+    if not usage:
+        return 0
+    used = usage.get("total_tokens")
+    if used is None:
+        used = sum(v for k, v in usage.items() if k.endswith("_tokens"))
+    return used
+
+
+def parse_reset(value: str) -> Optional[float]:
+    """Parse a rate-limit reset header into seconds from now.
+
+    Accepts OpenAI style durations (``"1s"``, ``"6m0s"``, ``"20ms"``), plain
+    seconds, and Anthropic style RFC 3339 timestamps.
+    """
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Read ``retry-after-ms``/``retry-after`` (seconds or HTTP date)."""
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Token bucket refilled continuously over a one minute window.
+
+    Reservations may drive the level negative; the deficit is how long the
+    caller has to wait, which keeps concurrent callers in arrival order.
+    """
+
+    def __init__(self, per_minute: Optional[float] = None):
+        """Initialize the bucket.
+
+        Args:
+            per_minute: Capacity per minute. None means unlimited.
+        """
+        self.capacity = per_minute
+        self.level = per_minute or 0.0
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        """Refill rate in units per second."""
+        return (self.capacity or 0.0) / 60.0
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` from the bucket.
+
+        Returns:
+            Seconds the caller must wait before using the reservation.
+        """
+        if self.capacity is None:
+            return 0.0
+        self._refill()
+        self.level -= amount
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+    def refund(self, amount: float) -> None:
+        """Return a reservation that was not used."""
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + amount)
+
+    def observe(self, limit: Optional[float], remaining: Optional[float]) -> None:
+        """Adjust capacity and level to what the provider reports."""
+        self._refill()
+        if limit is not None and limit > 0:
+            if self.capacity is None:
+                self.level = limit
+            self.capacity = limit
+            self.level = min(self.level, limit)
+        if remaining is not None and self.capacity is not None:
+            self.level = min(self.level, remaining)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class ProviderRateLimiter:
+    """Paces requests and tokens for one provider API key."""
+
+    # (limit, remaining, reset) header names per bucket, OpenAI then Anthropic
+    REQUEST_HEADERS = (
+        (
+            "x-ratelimit-limit-requests",
+            "x-ratelimit-remaining-requests",
+            "x-ratelimit-reset-requests",
+        ),
+        (
+            "anthropic-ratelimit-requests-limit",
+            "anthropic-ratelimit-requests-remaining",
+            "anthropic-ratelimit-requests-reset",
+        ),
+    )
+    TOKEN_HEADERS = (
+        ("x-ratelimit-limit-tokens", "x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+        (
+            "anthropic-ratelimit-tokens-limit",
+            "anthropic-ratelimit-tokens-remaining",
+            "anthropic-ratelimit-tokens-reset",
+        ),
+    )
+
+    def __init__(self, name: str, config: Optional[RateLimitConfig] = None):
+        """Initialize the limiter.
+
+        Args:
+            name: Name used in errors and logs.
+            config: Initial limits. Unset limits are learned from headers.
+        """
+        config = config or RateLimitConfig()
+        self.name = name
+        self.max_wait = config.max_wait
+        self.requests = TokenBucket(config.requests_per_minute)
+        self.tokens = TokenBucket(config.tokens_per_minute)
+        self.blocked_until = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> int:
+        """Wait until a request of ``estimated_tokens`` may be sent.
+
+        Returns:
+            The reserved token amount, to pass to :meth:`settle`.
+
+        Raises:
+            RateLimitedError: If the request would have to wait longer than
+                ``max_wait``.
+        """
+        wait = max(
+            self.blocked_until - time.monotonic(),
+            self.requests.reserve(1),
+            self.tokens.reserve(estimated_tokens),
+        )
+        if wait > self.max_wait:
+            self.requests.refund(1)
+            self.tokens.refund(estimated_tokens)
+            raise RateLimitedError(f"Rate limit reached for {self.name}", wait)
+        if wait > 0:
+            logger.debug("Pacing %s request for %.2fs", self.name, wait)
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # The request will never be sent; give its reservation back
+                self.requests.refund(1)
+                self.tokens.refund(estimated_tokens)
+                raise
+        return estimated_tokens
+
+    def try_acquire(self, estimated_tokens: int) -> bool:
+        """Reserve capacity only if it is available without waiting."""
+        if self.retry_after() > 0:
+            return False
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            self.requests.refund(1)
+            self.tokens.refund(estimated_tokens)
+            return False
+        return True
+
+    def refund(self, reserved: int) -> None:
+        """Return a token reservation whose request was abandoned."""
+        self.tokens.refund(reserved)
+
+    def settle(self, reserved: int, usage: Optional[Dict[str, int]]) -> None:
+        """Correct a token reservation with the usage the provider reported."""
+        if not usage:
+            return
+        self.tokens.refund(reserved - usage_tokens(usage))
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Update limits from a provider response (adapter response listener)."""
+        buckets = ((self.requests, self.REQUEST_HEADERS), (self.tokens, self.TOKEN_HEADERS))
+        for bucket, names in buckets:
+            for limit_name, remaining_name, reset_name in names:
+                if remaining_name not in headers:
+                    continue
+                limit = _to_float(headers.get(limit_name))
+                remaining = _to_float(headers.get(remaining_name))
+                bucket.observe(limit, remaining)
+                reset = headers.get(reset_name)
+                if remaining is not None and remaining <= 0 and reset:
+                    self._block_for(parse_reset(reset))
+
+        if status_code == 429:
+            self._block_for(parse_retry_after(headers) or 1.0)
+
+    def attach(self, adapter: BaseLLMAdapter) -> None:
+        """Feed this limiter from an adapter's provider responses."""
+        adapter.add_response_listener(self.observe)
+
+    def retry_after(self) -> float:
+        """Seconds until the limiter expects capacity again."""
+        return max(0.0, self.blocked_until - time.monotonic())
+
+    def _block_for(self, seconds: Optional[float]) -> None:
+        if seconds:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiterRegistry:
+    """One limiter per (provider, API key), seeded from ``rate_limits`` config."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._limiters: Dict[Tuple[str, str], ProviderRateLimiter] = {}
+
+    def get(self, provider: str, api_key: Optional[str] = None) -> ProviderRateLimiter:
+        """Get (or create) the limiter for a provider key."""
+        key = (provider, credential_fingerprint(api_key))
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            config = RateLimitConfig(**(get_llm_config(provider).get("rate_limits") or {}))
+            limiter = ProviderRateLimiter(provider, config)
+            self._limiters[key] = limiter
+        return limiter
+
+    def reset(self, provider: Optional[str] = None) -> None:
+        """Forget limiters so they are rebuilt from config on next use."""
+        for key in [k for k in self._limiters if provider is None or k[0] == provider]:
+            del self._limiters[key]
+
+    def on_config_change(self, providers: Set[str]) -> None:
+        """Rebuild the limiters of providers whose settings changed in config.yaml."""
+        for provider in providers:
+            self.reset(provider)
+
+
+def error_status_code(exc: BaseException) -> Optional[int]:
+    """Return the HTTP status carried by a provider SDK or httpx error."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+rate_limiters = RateLimiterRegistry()
+config_store.add_listener(rate_limiters.on_config_change)
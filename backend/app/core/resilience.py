@@ -0,0 +1,218 @@
+"""Retries with jittered backoff and hedged requests for provider calls."""
+
+import asyncio
+import logging
+import math
+import random
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set, TypeVar
+
+import anthropic
+import httpx
+import openai
+
+from app.core.config import config_store, get_llm_config
+from app.core.rate_limiter import error_status_code, parse_retry_after
+from app.core.schemas import HedgingConfig, RetryConfig
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 529 is Anthropic's "overloaded" status
+TRANSIENT_STATUS_CODES = {408, 409, 500, 502, 503, 504, 529}
+
+TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+    openai.APIConnectionError,
+    anthropic.APIConnectionError,
+)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether retrying the same request could plausibly succeed."""
+    if isinstance(exc, TRANSIENT_ERRORS):
+        return True
+    return error_status_code(exc) in TRANSIENT_STATUS_CODES
+
+
+def retry_delay(attempt: int, config: RetryConfig, exc: Optional[BaseException] = None) -> float:
+    """Seconds to wait before retry number ``attempt`` (starting at 1).
+
+    Uses "full jitter" exponential backoff, but never less than a
+    Retry-After the provider asked for.
+    """
+    delay = random.uniform(0, min(config.max_delay, config.base_delay * 2 ** (attempt - 1)))
+    response = getattr(exc, "response", None)
+    if isinstance(response, httpx.Response):
+        retry_after = parse_retry_after(response.headers)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, config.max_delay))
+    return delay
+
+
+async def retry_async(
+    call: Callable[[], Awaitable[T]],
+    config: RetryConfig,
+    label: str = "",
+) -> T:
+    """Run ``call`` and retry transient failures with jittered backoff.
+
+    Args:
+        call: Zero-argument coroutine function making one attempt.
+        config: Retry policy.
+        label: Name used in log messages.
+
+    Returns:
+        Result of the first successful attempt.
+    """
+    attempt = 1
+    while True:
+        try:
+            return await call()
+        except Exception as e:
+            if attempt >= config.max_attempts or not is_transient(e):
+                raise
+            delay = retry_delay(attempt, config, e)
+            logger.info(
+                "Retrying %s after %s (attempt %d/%d, %.2fs)",
+                label, type(e).__name__, attempt + 1, config.max_attempts, delay,
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def hedge(
+    call: Callable[[], Awaitable[T]],
+    delay: Optional[float],
+    can_hedge: Callable[[], bool] = lambda: True,
+) -> T:
+    """Run ``call``; if it is still pending after ``delay``, race a second one.
+
+    The first successful result wins and the other attempt is cancelled. If
+    one attempt fails, the other is still awaited.
+
+    Args:
+        call: Zero-argument coroutine function making one attempt.
+        delay: Seconds before hedging. None disables hedging.
+        can_hedge: Checked before launching the hedge (e.g. rate limits).
+    """
+    if delay is None:
+        return await call()
+
+    primary = asyncio.ensure_future(call())
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done and can_hedge():
+            pending.add(asyncio.ensure_future(call()))
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, window: int = 200):
+        """Initialize the tracker.
+
+        Args:
+            window: Number of most recent samples kept.
+        """
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        """Add a latency sample."""
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the ``q`` quantile (0-1) of the window, or None if empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[index]
+
+
+class ResiliencePolicy:
+    """Retry and hedging settings plus latency history for one provider."""
+
+    def __init__(
+        self,
+        retry: Optional[RetryConfig] = None,
+        hedging: Optional[HedgingConfig] = None,
+    ):
+        """Initialize the policy."""
+        self.retry = retry or RetryConfig()
+        self.hedging = hedging or HedgingConfig()
+        self._latency: Dict[Optional[str], LatencyTracker] = {}
+
+    def latency(self, model: Optional[str]) -> LatencyTracker:
+        """Latency tracker for a model."""
+        tracker = self._latency.get(model)
+        if tracker is None:
+            tracker = self._latency[model] = LatencyTracker()
+        return tracker
+
+    def hedge_delay(self, model: Optional[str]) -> Optional[float]:
+        """Delay before hedging a call to ``model``, or None to not hedge."""
+        if not self.hedging.enabled:
+            return None
+        if self.hedging.delay is not None:
+            return self.hedging.delay
+        tracker = self.latency(model)
+        if len(tracker) < self.hedging.min_samples:
+            return None
+        return max(self.hedging.min_delay, tracker.percentile(self.hedging.percentile))
+
+
+class ResilienceRegistry:
+    """Policies per provider, built from the ``retry``/``hedging`` config."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._policies: Dict[str, ResiliencePolicy] = {}
+
+    def get(self, provider: str) -> ResiliencePolicy:
+        """Get (or create) the policy for a provider."""
+        policy = self._policies.get(provider)
+        if policy is None:
+            config = get_llm_config(provider)
+            policy = ResiliencePolicy(
+                RetryConfig(**(config.get("retry") or {})),
+                HedgingConfig(**(config.get("hedging") or {})),
+            )
+            self._policies[provider] = policy
+        return policy
+
+    def reset(self, provider: Optional[str] = None) -> None:
+        """Forget policies so they are rebuilt from config on next use."""
+        for key in [k for k in self._policies if provider is None or k == provider]:
+            del self._policies[key]
+
+    def on_config_change(self, providers: Set[str]) -> None:
+        """Rebuild the policies of providers whose settings changed in config.yaml."""
+        for provider in providers:
+            self.reset(provider)
+
+
+resilience = ResilienceRegistry()
+config_store.add_listener(resilience.on_config_change)
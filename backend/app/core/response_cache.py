@@ -0,0 +1,365 @@
+"""Exact-match cache for non-streaming chat responses."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.core.config import config_store, load_config
+from app.core.schemas import LLMResponse, Message, ResponseCacheConfig
+
+logger = logging.getLogger(__name__)
+
+# Cache modes for a single request
+CACHE_DEFAULT = "default"  # Serve hits, store misses
+CACHE_REFRESH = "refresh"  # Skip the lookup but store the fresh response
+CACHE_BYPASS = "bypass"  # Neither read nor write
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+
+def cache_mode(headers: Mapping[str, str]) -> str:
+    """Cache mode requested by HTTP headers.
+
+    ``X-Cache-Bypass: 1`` and ``Cache-Control: no-store`` bypass the cache;
+    ``Cache-Control: no-cache`` fetches a fresh response and stores it.
+    """
+    if headers.get("x-cache-bypass", "").strip().lower() in _TRUTHY:
+        return CACHE_BYPASS
+    directives = {d.strip().lower() for d in headers.get("cache-control", "").split(",")}
+    if "no-store" in directives:
+        return CACHE_BYPASS
+    if "no-cache" in directives:
+        return CACHE_REFRESH
+    return CACHE_DEFAULT
+
+
+def cache_key(
+    provider: str,
+    model: Optional[str],
+    messages: List[Message],
+    temperature: Optional[float],
+    tools: Optional[List[Dict[str, Any]]] = None,
+    settings: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Canonical hash identifying a chat request.
+
+    Messages are reduced to their set fields with surrounding whitespace
+    stripped from content, and everything is serialized with sorted keys,
+    so equivalent requests hash the same.
+
+    Args:
+        settings: Every other setting that changes what is generated or
+            where the request goes, such as ``max_tokens``, ``base_url``
+            and ``extra_params``.
+    """
+    normalized = []
+    for msg in messages:
+        fields = msg.model_dump(exclude_none=True)
+        fields["content"] = fields["content"].strip()
+        normalized.append(fields)
+    payload = {
+        "provider": provider,
+        "model": model,
+        "messages": normalized,
+        "temperature": temperature,
+        "tools": tools or None,
+        "settings": settings or None,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1000):
+        """Initialize the backend.
+
+        Args:
+            max_entries: Entries kept before the least recently used is evicted.
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the stored value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        """Store a value for ``ttl`` seconds."""
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        """Remove every entry."""
+        self._entries.clear()
+
+    async def size(self) -> int:
+        """Number of stored entries, including expired ones not yet evicted."""
+        return len(self._entries)
+
+    async def close(self) -> None:
+        """Nothing to release for the in-memory backend."""
+
+
+class SQLiteCacheBackend:
+    """LRU cache persisted in a SQLite file, shared across restarts.
+
+    Queries run in a worker thread so the event loop is never blocked on
+    disk I/O.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 1000):
+        """Initialize the backend.
+
+        Args:
+            path: Database file; parent directories are created on first use.
+            max_entries: Entries kept before the least recently used is evicted.
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the stored value, or None if missing or expired."""
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        """Store a value for ``ttl`` seconds."""
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def clear(self) -> None:
+        """Remove every entry."""
+        await asyncio.to_thread(self._execute, "DELETE FROM responses")
+
+    async def size(self) -> int:
+        """Number of stored entries, including expired ones not yet evicted."""
+        rows = await asyncio.to_thread(self._execute, "SELECT COUNT(*) FROM responses")
+        return rows[0][0]
+
+    async def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses(used_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(sql, params).fetchall()
+            conn.commit()
+            return rows
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                value = None
+            else:
+                conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return value
+
+    def _set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY used_at DESC, rowid DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            conn.commit()
+
+
+class CacheStats:
+    """Counters describing cache effectiveness."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypasses = 0
+
+    def as_dict(self) -> dict:
+        """Return the counters as a plain dict."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "bypasses": self.bypasses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class ResponseCache:
+    """Caches complete LLM responses by request hash.
+
+    Settings come from the ``response_cache`` block of config.yaml. The TTL
+    can be overridden per provider or route name, and a TTL of 0 disables
+    caching for that name.
+    """
+
+    def __init__(self, config: Optional[ResponseCacheConfig] = None, backend=None):
+        """Initialize the cache.
+
+        Args:
+            config: Cache settings. Loaded from config.yaml if None.
+            backend: Storage backend. Built from the config if None.
+        """
+        self._config = config
+        self._backend = backend
+        self._closing: List[asyncio.Task] = []
+        self.stats = CacheStats()
+
+    @property
+    def config(self) -> ResponseCacheConfig:
+        """Cache settings."""
+        if self._config is None:
+            self._config = ResponseCacheConfig(**(load_config().get("response_cache") or {}))
+        return self._config
+
+    @property
+    def backend(self):
+        """Storage backend, created on first use."""
+        if self._backend is None:
+            config = self.config
+            if config.backend == "sqlite":
+                path = Path(config.path)
+                if not path.is_absolute():
+                    path = Path(__file__).parent.parent.parent.parent / path
+                self._backend = SQLiteCacheBackend(path, config.max_entries)
+            elif config.backend == "memory":
+                self._backend = MemoryCacheBackend(config.max_entries)
+            else:
+                raise ValueError(f"Unknown response cache backend: {config.backend}")
+        return self._backend
+
+    def ttl_for(self, name: str, temperature: Optional[float] = None) -> float:
+        """Seconds to cache responses for a provider or route; 0 means don't.
+
+        Args:
+            name: Provider or route name the request was sent to.
+            temperature: Sampling temperature of the request, if known.
+                Unknown temperatures are not cached under ``max_temperature``.
+        """
+        config = self.config
+        if not config.enabled:
+            return 0.0
+        if config.max_temperature is not None and (
+            # An unknown temperature may be above the ceiling
+            temperature is None or temperature > config.max_temperature
+        ):
+            return 0.0
+        return max(0.0, config.routes.get(name, config.ttl))
+
+    async def get(self, key: str) -> Optional[LLMResponse]:
+        """Look up a response, counting the hit or miss."""
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            logger.warning("Response cache lookup failed", exc_info=True)
+            value = None
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return LLMResponse.model_validate_json(value)
+
+    async def set(self, key: str, response: LLMResponse, ttl: float) -> None:
+        """Store a response for ``ttl`` seconds."""
+        try:
+            await self.backend.set(key, response.model_dump_json(), ttl)
+        except Exception:
+            logger.warning("Response cache store failed", exc_info=True)
+            return
+        self.stats.stores += 1
+
+    async def clear(self) -> None:
+        """Remove every cached response."""
+        await self.backend.clear()
+
+    async def snapshot(self) -> dict:
+        """Counters plus the number of stored entries."""
+        return {
+            **self.stats.as_dict(),
+            "entries": await self.backend.size(),
+            "backend": self.config.backend,
+        }
+
+    async def close(self) -> None:
+        """Release the backend."""
+        if self._backend is not None:
+            await self._backend.close()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def reset(self) -> None:
+        """Reload settings from config on next use, closing the current backend.
+
+        Requests already using the old backend finish on it; it is closed in
+        the background.
+        """
+        backend, self._config, self._backend = self._backend, None, None
+        if backend is None:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(backend.close())
+        except RuntimeError:
+            return
+        self._closing.append(task)
+        task.add_done_callback(self._closing.remove)
+
+
+response_cache = ResponseCache()
+config_store.add_section_listener("response_cache", response_cache.reset)
@@ -0,0 +1,235 @@
+"""Latency-aware selection among interchangeable providers and models."""
+
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.circuit_breaker import OPEN, CircuitBreakerRegistry, circuit_breakers
+from app.core.config import config_store, load_config
+from app.core.schemas import RouteConfig, RouteTarget, RoutingConfig
+
+logger = logging.getLogger(__name__)
+
+# Route used for ``provider: "auto"`` when config.yaml does not define one
+AUTO_ROUTE = "auto"
+
+TargetKey = Tuple[str, Optional[str]]
+
+
+class TargetStats:
+    """Exponentially weighted latency and error rate for one target."""
+
+    def __init__(self, alpha: float = 0.2):
+        """Initialize empty stats.
+
+        Args:
+            alpha: Weight of the newest sample in the moving averages.
+        """
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def record_success(self, latency: float) -> None:
+        """Add a successful call that took ``latency`` seconds."""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.alpha * (latency - self.latency)
+        self.error_rate *= 1 - self.alpha
+        self.consecutive_failures = 0
+
+    def record_failure(self, threshold: int, cooldown: float) -> None:
+        """Add a failed call, starting a cooldown after ``threshold`` in a row."""
+        self.error_rate += self.alpha * (1.0 - self.error_rate)
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= threshold:
+            self.cooldown_until = time.monotonic() + cooldown
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the target is outside a failure cooldown."""
+        return time.monotonic() >= self.cooldown_until
+
+    def as_dict(self) -> dict:
+        """Return the stats as a plain dict."""
+        return {
+            "latency": self.latency,
+            "error_rate": round(self.error_rate, 4),
+            "consecutive_failures": self.consecutive_failures,
+            "healthy": self.healthy,
+        }
+
+
+class ProviderRouter:
+    """Orders the targets of a route by observed latency, errors and health.
+
+    Routes come from the ``routes`` block of config.yaml; ``auto`` falls back
+    to every configured provider with its default model. Stats are fed by
+    all traffic through the chat service, routed or not, and are keyed by
+    provider and requested model.
+    """
+
+    def __init__(
+        self,
+        config: Optional[RoutingConfig] = None,
+        routes: Optional[Dict[str, RouteConfig]] = None,
+        breakers: CircuitBreakerRegistry = circuit_breakers,
+    ):
+        """Initialize the router.
+
+        Args:
+            config: Scoring settings. Loaded from config.yaml if None.
+            routes: Route definitions. Loaded from config.yaml if None.
+            breakers: Provider circuit breakers; open circuits rank last.
+        """
+        self._config = config
+        self._routes = routes
+        self.breakers = breakers
+        self._stats: Dict[TargetKey, TargetStats] = {}
+
+    @property
+    def config(self) -> RoutingConfig:
+        """Scoring settings."""
+        if self._config is None:
+            self._config = RoutingConfig(**(load_config().get("routing") or {}))
+        return self._config
+
+    @property
+    def routes(self) -> Dict[str, RouteConfig]:
+        """Route definitions by name."""
+        if self._routes is None:
+            raw = load_config().get("routes") or {}
+            self._routes = {name: RouteConfig(**route) for name, route in raw.items()}
+        return self._routes
+
+    def is_route(self, name: str) -> bool:
+        """Whether ``name`` refers to a route rather than a provider.
+
+        Provider names take precedence over routes with the same name.
+        """
+        if name in AdapterFactory.get_supported_providers():
+            return False
+        return name == AUTO_ROUTE or name in self.routes
+
+    def route(self, name: str) -> RouteConfig:
+        """Get a route definition.
+
+        Raises:
+            ValueError: If the route does not exist or has no targets.
+        """
+        route = self.routes.get(name)
+        if route is None and name == AUTO_ROUTE:
+            route = RouteConfig(targets=[RouteTarget(provider=p) for p in _configured_providers()])
+        if route is None:
+            raise ValueError(f"Unknown route: {name}")
+        if not route.targets:
+            raise ValueError(f"Route {name} has no targets")
+        return route
+
+    def stats(self, provider: str, model: Optional[str] = None) -> TargetStats:
+        """Get (or create) the stats for a provider/model."""
+        key = (provider, model)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = TargetStats(self.config.ewma_alpha)
+        return stats
+
+    def available(self, target: RouteTarget) -> bool:
+        """Whether a target is outside a cooldown and its circuit is not open."""
+        return (
+            self.stats(target.provider, target.model).healthy
+            and self.breakers.get(target.provider).state != OPEN
+        )
+
+    def score(self, target: RouteTarget) -> float:
+        """Expected cost of sending to ``target``; lower is better.
+
+        Untried targets score 0 so that each is tried at least once; targets
+        that have only ever failed score worst.
+        """
+        stats = self.stats(target.provider, target.model)
+        if stats.latency is None:
+            return float("inf") if stats.error_rate else 0.0
+        return stats.latency * (1.0 + self.config.error_penalty * stats.error_rate)
+
+    def rank(self, name: str) -> List[RouteTarget]:
+        """Targets of a route in the order they should be tried.
+
+        Available targets come first, best score first; targets in a failure
+        cooldown or with an open circuit are kept at the end as a last resort.
+        Ties keep config order.
+        """
+        route = self.route(name)
+        ranked = sorted(route.targets, key=lambda t: (not self.available(t), self.score(t)))
+        if route.max_failovers is not None:
+            ranked = ranked[: route.max_failovers + 1]
+        return ranked
+
+    def record(
+        self,
+        provider: str,
+        model: Optional[str],
+        latency: Optional[float] = None,
+        error: bool = False,
+    ) -> None:
+        """Record the outcome of a call.
+
+        Args:
+            provider: Provider name.
+            model: Requested model (None for the provider default).
+            latency: Seconds to the full response, or to the first chunk
+                for streams. Ignored for errors.
+            error: Whether the call failed.
+        """
+        stats = self.stats(provider, model)
+        if error:
+            stats.record_failure(self.config.failure_threshold, self.config.cooldown)
+            if not stats.healthy:
+                logger.warning(
+                    "%s/%s failed %d times in a row, cooling down",
+                    provider, model or "default", stats.consecutive_failures,
+                )
+        elif latency is not None:
+            stats.record_success(latency)
+
+    def snapshot(self) -> Dict[str, List[dict]]:
+        """Ranked targets and their stats for every route."""
+        names = list(self.routes)
+        if AUTO_ROUTE not in names and _configured_providers():
+            names.append(AUTO_ROUTE)
+        return {
+            name: [
+                {
+                    "provider": t.provider,
+                    "model": t.model,
+                    **self.stats(t.provider, t.model).as_dict(),
+                    "circuit": self.breakers.get(t.provider).state,
+                }
+                for t in self.rank(name)
+            ]
+            for name in names
+        }
+
+    def reset(self) -> None:
+        """Reload routes and settings from config on next use; stats are kept."""
+        self._config = None
+        self._routes = None
+
+
+def _configured_providers() -> List[str]:
+    """Providers configured in config.yaml or with an API key in the environment."""
+    configured = load_config().get("llm_providers") or {}
+    return [
+        provider
+        for provider in AdapterFactory.get_supported_providers()
+        if provider in configured or os.getenv(f"{provider.upper()}_API_KEY")
+    ]
+
+
+provider_router = ProviderRouter()
+config_store.add_section_listener("routes", provider_router.reset)
+config_store.add_section_listener("routing", provider_router.reset)
@@ -57,6 +57,67 @@ class LLMResponse(BaseModel):
         json_encoders = {datetime: lambda v: v.isoformat()}
 
 
+class HTTPTransportConfig(BaseModel):
+    """Connection pool settings for the shared HTTP transport."""
+
+    http2: bool = True
+    max_connections: int = 100  # Per host, the pool is shared per origin
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    dns_cache_ttl: float = 300.0  # Seconds, 0 disables DNS caching
+
+
+class BulkheadConfig(BaseModel):
+    """Concurrency limit for a provider or model."""
+
+    max_concurrent: Optional[int] = None  # None means unlimited
+    max_queue: int = 100
+    queue_timeout: float = 30.0
+
+
+class ConcurrencyConfig(BulkheadConfig):
+    """Provider-wide concurrency limit with optional per-model limits."""
+
+    models: Dict[str, BulkheadConfig] = {}
+
+
+class RateLimitConfig(BaseModel):
+    """Initial rate limits for a provider API key.
+
+    Limits are refined at runtime from provider rate-limit headers.
+    """
+
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    max_wait: float = 30.0  # Longest a request is paced before failing with 429
+
+
+class RetryConfig(BaseModel):
+    """Retry policy for transient provider errors."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+
+class HedgingConfig(BaseModel):
+    """Hedged (duplicate) requests for slow non-streaming calls."""
+
+    enabled: bool = False
+    delay: Optional[float] = None  # Fixed delay; None derives it from latency
+    percentile: float = 0.95
+    min_delay: float = 0.5
+    min_samples: int = 20
+
+
+class CircuitBreakerConfig(BaseModel):
+    """Circuit breaker that short-circuits calls to a failing provider."""
+
+    enabled: bool = True
+    failure_threshold: int = 5  # Consecutive transient failures before opening
+    recovery_timeout: float = 30.0  # Seconds open before a trial call is allowed
+
+
 class LLMConfig(BaseModel):
     """Configuration for LLM provider."""
 
@@ -68,6 +129,12 @@ class LLMConfig(BaseModel):
     max_tokens: Optional[int] = None
     timeout: int = 30
     extra_params: Optional[Dict[str, Any]] = None
+    transport: HTTPTransportConfig = Field(default_factory=HTTPTransportConfig)
+    concurrency: ConcurrencyConfig = Field(default_factory=ConcurrencyConfig)
+    rate_limits: RateLimitConfig = Field(default_factory=RateLimitConfig)
+    retry: RetryConfig = Field(default_factory=RetryConfig)
+    hedging: HedgingConfig = Field(default_factory=HedgingConfig)
+    circuit_breaker: CircuitBreakerConfig = Field(default_factory=CircuitBreakerConfig)
 
     class Config:
         """Pydantic config."""
@@ -75,6 +142,13 @@ class LLMConfig(BaseModel):
         extra = "allow"
 
 
+class ModelInfo(BaseModel):
+    """A model offered by a provider."""
+
+    id: str
+    context_length: Optional[int] = None
+
+
 class AdapterCapabilities(BaseModel):
     """Capabilities of an LLM adapter."""
 
@@ -85,3 +159,147 @@ class AdapterCapabilities(BaseModel):
     max_context_length: Optional[int] = None
     supported_models: List[str] = []
 
+
+class RouteTarget(BaseModel):
+    """One provider/model a route may send requests to."""
+
+    provider: str
+    model: Optional[str] = None  # None uses the provider's default model
+
+
+class RouteConfig(BaseModel):
+    """Named group of interchangeable targets (``routes`` in config.yaml)."""
+
+    targets: List[RouteTarget]
+    max_failovers: Optional[int] = None  # None tries every target
+
+
+class RoutingConfig(BaseModel):
+    """How routes score and skip targets (``routing`` in config.yaml)."""
+
+    ewma_alpha: float = 0.2
+    error_penalty: float = 4.0  # Score multiplier per unit of error rate
+    failure_threshold: int = 3  # Consecutive failures before a cooldown
+    cooldown: float = 30.0
+
+
+class ResponseCacheConfig(BaseModel):
+    """Exact-match cache for non-streaming responses (``response_cache``)."""
+
+    enabled: bool = True
+    backend: str = "memory"  # "memory" or "sqlite"
+    path: str = "data/response_cache.db"  # SQLite file, relative to the repo root
+    max_entries: int = 1000
+    ttl: float = 300.0
+    # Only cache requests at or below this temperature; None caches any
+    max_temperature: Optional[float] = 0.0
+    routes: Dict[str, float] = Field(default_factory=dict)  # TTL per provider/route
+
+
+class ProviderStatus(BaseModel):
+    """Provider status information."""
+
+    provider: str
+    configured: bool
+    healthy: bool
+    available_models: list[str] = []
+    error: Optional[str] = None
+    checked_at: Optional[datetime] = None
+
+
+class ProviderStatusConfig(BaseModel):
+    """Caching of provider status checks (``provider_status`` in config.yaml)."""
+
+    ttl: float = 30.0  # Seconds a status is served without revalidation
+    max_stale: float = 300.0  # Seconds a stale status may be served while refreshing
+    check_timeout: float = 5.0  # Per health/model-list check
+    refresh_interval: float = 30.0  # Background refresh of recently read statuses
+
+
+class ModelCatalogConfig(BaseModel):
+    """Caching of provider model lists (``model_catalog`` in config.yaml)."""
+
+    ttl: float = 3600.0  # Seconds a model list is served without refreshing
+    max_stale: float = 604800.0  # Seconds a stale list may be served while refreshing
+    fetch_timeout: float = 10.0  # Seconds to wait when no list is cached yet
+    path: str = "data/model_catalog.json"  # Relative to the repo root
+
+
+class MCPProcessConfig(BaseModel):
+    """Lifecycle of MCP server processes (``mcp`` in config.yaml)."""
+
+    autostart: bool = True  # Launch every configured server at startup
+    start_timeout: float = 30.0  # Seconds to spawn a server and finish the handshake
+    request_timeout: float = 60.0  # Default seconds to wait for a response
+    backoff_initial: float = 1.0  # Seconds before the first restart after a crash
+    backoff_max: float = 60.0  # Upper bound for the doubling restart delay
+    reset_after: float = 60.0  # Seconds of uptime after which the backoff resets
+
+
+class ToolLoopConfig(BaseModel):
+    """Server-side execution of model tool calls (``tool_loop`` in config.yaml)."""
+
+    max_steps: int = 8  # Model calls per request, including the final answer
+    max_wall_time: float = 120.0  # Seconds for the whole loop
+    max_total_tokens: Optional[int] = 200000  # Summed over every model call
+    tool_timeout: float = 60.0  # Seconds per tool call
+    max_parallel_tools: int = 8  # Tool calls of one step run at the same time
+    max_result_chars: int = 20000  # Longer tool output is truncated
+
+
+class ToolLoopEvent(BaseModel):
+    """Progress of a server-side tool loop, sent as one SSE event."""
+
+    type: str  # "step", "tool_call", "tool_result", "limit", "message" or "error"
+    step: int
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+
+class Conversation(BaseModel):
+    """A stored conversation, without its messages."""
+
+    id: str
+    title: str = ""
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    starred: bool = False
+    message_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+
+class ConversationStoreConfig(BaseModel):
+    """Server-side conversation history (``conversations`` in config.yaml)."""
+
+    path: str = "data/conversations.db"  # SQLite file, relative to the repo root
+    max_cached: int = 256  # Recently used histories kept parsed in memory
+    page_size: int = 50  # Default page size for listings
+    max_page_size: int = 200
+
+
+class ContextWindowConfig(BaseModel):
+    """Trimming of prompts to the model's window (``context_window`` in config.yaml)."""
+
+    enabled: bool = True
+    response_budget: int = 4096  # Tokens kept for the answer when max_tokens is unset
+    safety_margin: float = 0.05  # Share of the window left free for counting errors
+    max_tool_result_tokens: int = 8000  # Longer tool results are truncated when trimming
+    cache_size: int = 10000  # Per-message token counts kept
+    # Context lengths by "provider/model" or model name, where the reported one is wrong
+    context_lengths: Dict[str, int] = Field(default_factory=dict)
+
+
+class StreamCoalescingConfig(BaseModel):
+    """Merging of small stream deltas (``stream_coalescing`` in config.yaml)."""
+
+    enabled: bool = False
+    window: float = 0.03  # Seconds deltas are held to merge with the ones after them
+    max_bytes: int = 512  # Held text is sent once it reaches this size; 0 for no limit
+
+
+class WebSocketConfig(BaseModel):
+    """Multiplexed chat over WebSocket (``websocket`` in config.yaml)."""
+
+    max_streams: int = 16  # Concurrent chat streams per connection
+    window: int = 64  # Frames sent per stream before the client must ack; 0 for no limit
+    send_queue_size: int = 256  # Frames waiting to be written before streams are paused
@@ -0,0 +1,273 @@
+"""Helpers for relaying adapter streams to HTTP clients."""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+
+from app.core.config import load_config
+from app.core.schemas import StreamChunk, StreamCoalescingConfig
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on installed extras
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class StreamStats:
+    """Counters describing how streamed responses ended."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def as_dict(self) -> dict:
+        """Return the counters as a plain dict."""
+        return {
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+
+
+stream_stats = StreamStats()
+
+
+class RawChunk:
+    """Stream chunk passed between adapters and the HTTP layer.
+
+    Has the same fields as :class:`StreamChunk`, which stays the public
+    schema, but is a plain slotted object: building one per token skips
+    pydantic validation, and :func:`encode_sse` serializes it without a
+    model dump.
+    """
+
+    __slots__ = ("content", "finished", "tool_calls", "metadata")
+
+    def __init__(
+        self,
+        content: str = "",
+        finished: bool = False,
+        tool_calls: Optional[List[Dict[str, Any]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        self.content = content
+        self.finished = finished
+        self.tool_calls = tool_calls
+        self.metadata = metadata
+
+    def __repr__(self) -> str:
+        return (
+            f"RawChunk(content={self.content!r}, finished={self.finished!r}, "
+            f"tool_calls={self.tool_calls!r}, metadata={self.metadata!r})"
+        )
+
+    def as_dict(self) -> dict:
+        """Return the chunk in the :class:`StreamChunk` JSON shape."""
+        return {
+            "content": self.content,
+            "finished": self.finished,
+            "tool_calls": self.tool_calls,
+            "metadata": self.metadata,
+        }
+
+    def to_model(self) -> StreamChunk:
+        """Return the chunk as the public, validated schema."""
+        return StreamChunk(**self.as_dict())
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize ``data`` to compact JSON, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+
+def chunk_data(chunk: Union[RawChunk, StreamChunk]) -> dict:
+    """Return either kind of chunk in the :class:`StreamChunk` JSON shape."""
+    return chunk.as_dict() if isinstance(chunk, RawChunk) else chunk.model_dump()
+
+
+def encode_sse(chunk: Union[RawChunk, StreamChunk], event: Optional[str] = None) -> bytes:
+    """Encode a chunk as a complete server-sent event frame.
+
+    ``EventSourceResponse`` sends bytes as they are, so the frame is built
+    once here rather than through a dict and ``ServerSentEvent``. JSON
+    escapes line breaks, so the payload always fits one ``data`` line.
+    """
+    frame = b"data: " + dumps(chunk_data(chunk)) + b"\r\n\r\n"
+    if event:
+        frame = b"event: " + event.encode() + b"\r\n" + frame
+    return frame
+
+
+async def aclose_stream(stream: AsyncIterator) -> None:
+    """Close an async iterator if it supports it, ignoring close errors."""
+    aclose = getattr(stream, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception:
+        logger.debug("Error while closing upstream stream", exc_info=True)
+
+
+async def cancel_on_disconnect(
+    chunks: AsyncIterator[T],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    label: str = "",
+    check_interval: float = 0.25,
+) -> AsyncIterator[T]:
+    """Relay ``chunks`` until the client goes away, then cancel upstream.
+
+    The upstream iterator is always closed when this generator finishes,
+    so provider streams release their HTTP response (which stops generation
+    on the provider side) whether the client read everything, disconnected,
+    or the task was cancelled by the server.
+
+    Args:
+        chunks: Upstream async iterator (typically an adapter stream).
+        is_disconnected: Coroutine function reporting client disconnects,
+            e.g. ``starlette.requests.Request.is_disconnected``.
+        label: Name used when logging cancellations.
+        check_interval: Minimum seconds between disconnect checks.
+
+    Yields:
+        Items from ``chunks``.
+    """
+    outcome = "cancelled"
+    last_check = time.monotonic()
+    try:
+        async for chunk in chunks:
+            now = time.monotonic()
+            if now - last_check >= check_interval:
+                last_check = now
+                if await is_disconnected():
+                    break
+            yield chunk
+        else:
+            outcome = "completed"
+    except Exception:
+        outcome = "failed"
+        raise
+    finally:
+        await aclose_stream(chunks)
+        if outcome == "cancelled":
+            stream_stats.cancelled += 1
+            logger.info("Client disconnected, cancelled upstream %s stream", label)
+        elif outcome == "completed":
+            stream_stats.completed += 1
+        else:
+            stream_stats.failed += 1
+
+
+class StreamCoalescer:
+    """Merges small text deltas before they are sent to clients.
+
+    Providers often stream one or two characters at a time; sent one per
+    frame they multiply writes and frontend re-renders. While enabled,
+    plain text deltas are held for up to ``window`` seconds, or until
+    ``max_bytes`` of text is held, and sent as one chunk. The first delta,
+    chunks with tool calls and the finishing chunk are never delayed, so
+    time to first token and the end of the answer are unaffected.
+    """
+
+    def __init__(self, config: Optional[StreamCoalescingConfig] = None):
+        """Initialize the coalescer.
+
+        Args:
+            config: Settings. Loaded from config.yaml if None.
+        """
+        self._config = config
+
+    @property
+    def config(self) -> StreamCoalescingConfig:
+        """Settings."""
+        if self._config is None:
+            self._config = StreamCoalescingConfig(
+                **(load_config().get("stream_coalescing") or {})
+            )
+        return self._config
+
+    def wrap(self, chunks: AsyncIterator[RawChunk]) -> AsyncIterator[RawChunk]:
+        """Coalesce ``chunks`` if enabled, else return them unchanged."""
+        config = self.config
+        if not config.enabled or config.window <= 0:
+            return chunks
+        return self._coalesce(chunks, config.window, config.max_bytes)
+
+    @staticmethod
+    async def _coalesce(
+        chunks: AsyncIterator[RawChunk], window: float, max_bytes: int
+    ) -> AsyncIterator[RawChunk]:
+        loop = asyncio.get_running_loop()
+        pending: Optional[asyncio.Future] = None
+        held: List[str] = []
+        held_bytes = 0
+        metadata: Optional[Dict[str, Any]] = None
+        deadline = 0.0
+        first = True
+
+        def flush() -> RawChunk:
+            nonlocal held, held_bytes, metadata
+            chunk = RawChunk("".join(held), metadata=metadata)
+            held, held_bytes, metadata = [], 0, None
+            return chunk
+
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(chunks.__anext__())
+                if held:
+                    # The next delta is only waited for until the window closes
+                    done, _ = await asyncio.wait({pending}, timeout=deadline - loop.time())
+                    if not done:
+                        yield flush()
+                        continue
+                else:
+                    await asyncio.wait({pending})
+                try:
+                    chunk = pending.result()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    pending = None
+
+                if first or chunk.finished or chunk.tool_calls:
+                    # Empty chunks (e.g. OpenAI's role-only delta) are not the first token
+                    first = first and not (chunk.content or chunk.tool_calls)
+                    if held:
+                        yield flush()
+                    yield chunk
+                    continue
+                if not held:
+                    deadline = loop.time() + window
+                held.append(chunk.content)
+                held_bytes += len(chunk.content.encode())
+                if chunk.metadata:
+                    # Later deltas describe the response at least as well
+                    metadata = {**(metadata or {}), **chunk.metadata}
+                if (max_bytes and held_bytes >= max_bytes) or loop.time() >= deadline:
+                    yield flush()
+            if held:
+                yield flush()
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+                try:
+                    await pending
+                except (asyncio.CancelledError, StopAsyncIteration):
+                    pass
+                except Exception:
+                    logger.debug("Upstream stream failed while closing", exc_info=True)
+            await aclose_stream(chunks)
+
+
+stream_coalescer = StreamCoalescer()
@@ -0,0 +1,102 @@
+"""Unified tool calls, and their assembly from streamed fragments."""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+def make_tool_call(call_id: str, name: str, arguments: str) -> Dict[str, Any]:
+    """Tool call in the OpenAI shape every adapter returns.
+
+    Args:
+        call_id: Provider's id for the call, echoed back with its result.
+        name: Tool name.
+        arguments: JSON-encoded arguments object.
+    """
+    return {
+        "id": call_id,
+        "type": "function",
+        "function": {"name": name, "arguments": arguments},
+    }
+
+
+class _PartialCall:
+    """Fragments of one streamed call received so far."""
+
+    __slots__ = ("id", "name", "arguments")
+
+    def __init__(self):
+        self.id: Optional[str] = None
+        self.name: Optional[str] = None
+        self.arguments: List[str] = []
+
+
+class ToolCallAssembler:
+    """Builds complete tool calls from the fragments providers stream.
+
+    Providers send a call's id and name first and its JSON arguments in
+    pieces, keyed by the index of the call within the response. A call is
+    complete as soon as its arguments form a JSON object (nothing can
+    follow a closed object), when the provider ends it explicitly, when a
+    later call starts (calls are streamed one after another) or when the
+    stream finishes. Every call is returned exactly once, so callers can
+    start running it while the model is still generating later calls.
+    """
+
+    def __init__(self):
+        """Initialize an assembler for one response."""
+        self._calls: Dict[int, _PartialCall] = {}
+        self._done: set = set()
+
+    def add(
+        self,
+        index: int,
+        call_id: Optional[str] = None,
+        name: Optional[str] = None,
+        arguments: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Record a fragment.
+
+        Returns:
+            Calls completed by this fragment, in index order.
+        """
+        if index in self._done:
+            return []
+        completed = [self._complete(i) for i in sorted(self._calls) if i < index]
+        call = self._calls.get(index)
+        if call is None:
+            call = self._calls[index] = _PartialCall()
+        if call_id:
+            call.id = call_id
+        if name:
+            call.name = name
+        if arguments:
+            call.arguments.append(arguments)
+            if arguments.rstrip().endswith("}") and call.id and call.name:
+                try:
+                    parsed = json.loads("".join(call.arguments))
+                except ValueError:
+                    parsed = None
+                if isinstance(parsed, dict):
+                    completed.append(self._complete(index))
+        return completed
+
+    def end(self, index: int) -> List[Dict[str, Any]]:
+        """Mark a call as finished by the provider.
+
+        Returns:
+            The completed call, unless it was already returned.
+        """
+        if index not in self._calls:
+            return []
+        return [self._complete(index)]
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Complete every call still open at the end of the stream."""
+        return [self._complete(index) for index in sorted(self._calls)]
+
+    def _complete(self, index: int) -> Dict[str, Any]:
+        call = self._calls.pop(index)
+        self._done.add(index)
+        return make_tool_call(
+            call.id or f"call_{index}", call.name or "", "".join(call.arguments) or "{}"
+        )
@@ -0,0 +1,274 @@
+"""Cached MCP tool lists, pre-translated into each provider's tool format."""
+
+import asyncio
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.mcp_client import MCPProcessManager, MCPUnavailableError, mcp_manager
+from app.core.mcp_config import MCPConfigStore, mcp_config
+
+logger = logging.getLogger(__name__)
+
+# Tool formats understood by the providers
+OPENAI_FORMAT = "openai"
+ANTHROPIC_FORMAT = "anthropic"
+GEMINI_FORMAT = "gemini"
+
+# Providers not listed here take OpenAI-style tools
+PROVIDER_FORMATS = {
+    "anthropic": ANTHROPIC_FORMAT,
+    "gemini": GEMINI_FORMAT,
+}
+
+# Separates the server from the tool in names exposed to models
+NAME_SEPARATOR = "__"
+
+# Tool names every provider accepts: letters, digits, '_' and '-', up to 64
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_-]")
+MAX_TOOL_NAME = 64
+
+# JSON Schema keywords Gemini function declarations understand
+_GEMINI_SCHEMA_KEYS = {
+    "type", "format", "description", "nullable", "enum", "properties", "required", "items",
+}
+
+
+def exposed_name(server: str, tool: str) -> str:
+    """Name a tool is offered to models under, unique across servers."""
+    name = _INVALID_NAME_CHARS.sub("_", f"{server}{NAME_SEPARATOR}{tool}")
+    return name[:MAX_TOOL_NAME]
+
+
+def to_openai(name: str, tool: Dict[str, Any]) -> Dict[str, Any]:
+    """MCP tool as an OpenAI ``tools`` entry."""
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": tool.get("description") or "",
+            "parameters": tool.get("inputSchema") or {"type": "object", "properties": {}},
+        },
+    }
+
+
+def to_anthropic(name: str, tool: Dict[str, Any]) -> Dict[str, Any]:
+    """MCP tool as an Anthropic ``ToolParam``."""
+    return {
+        "name": name,
+        "description": tool.get("description") or "",
+        "input_schema": tool.get("inputSchema") or {"type": "object", "properties": {}},
+    }
+
+
+def gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a JSON Schema to the OpenAPI subset Gemini accepts."""
+    result = {}
+    for key, value in schema.items():
+        if key not in _GEMINI_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {prop: gemini_schema(sub) for prop, sub in value.items()}
+        elif key == "items" and isinstance(value, dict):
+            value = gemini_schema(value)
+        elif key == "type" and isinstance(value, list):
+            # ["string", "null"] -> nullable string
+            types = [t for t in value if t != "null"]
+            if len(types) < len(value):
+                result["nullable"] = True
+            value = types[0] if types else "string"
+        result[key] = value
+    if isinstance(result.get("type"), str):
+        result["type"] = result["type"].upper()
+    return result
+
+
+def to_gemini(name: str, tool: Dict[str, Any]) -> Dict[str, Any]:
+    """MCP tool as a Gemini function declaration."""
+    declaration = {"name": name, "description": tool.get("description") or ""}
+    schema = gemini_schema(tool.get("inputSchema") or {})
+    # Gemini rejects object schemas without properties
+    if schema.get("properties"):
+        declaration["parameters"] = schema
+    return declaration
+
+
+_TRANSLATORS = {
+    OPENAI_FORMAT: to_openai,
+    ANTHROPIC_FORMAT: to_anthropic,
+    GEMINI_FORMAT: to_gemini,
+}
+
+
+class _ServerTools:
+    """One server's tools and their translations, fetched from one session."""
+
+    __slots__ = ("session", "tools", "names", "formats")
+
+    def __init__(self, session, tools: List[Dict[str, Any]], server: str):
+        exposed = [exposed_name(server, tool["name"]) for tool in tools]
+        self.session = session
+        self.tools = tools
+        self.names = {name: tool["name"] for name, tool in zip(exposed, tools)}
+        self.formats = {
+            fmt: [translate(name, tool) for name, tool in zip(exposed, tools)]
+            for fmt, translate in _TRANSLATORS.items()
+        }
+
+
+class ToolCatalog:
+    """Per-server MCP tool lists, fetched with ``tools/list`` once.
+
+    A server's list is dropped when it sends
+    ``notifications/tools/list_changed``, when its definition changes, and
+    when it is restarted. Each list is translated into every provider's
+    tool format as it is fetched, so requests only concatenate cached lists.
+    Tools are exposed to models as ``<server>__<tool>`` so names from
+    different servers cannot clash.
+    """
+
+    def __init__(
+        self,
+        manager: MCPProcessManager = mcp_manager,
+        store: MCPConfigStore = mcp_config,
+    ):
+        """Initialize the catalog.
+
+        Args:
+            manager: Process manager used to reach the servers.
+            store: Source of configured server names.
+        """
+        self.manager = manager
+        self.store = store
+        self._servers: Dict[str, _ServerTools] = {}
+        self._fetching: Dict[str, asyncio.Task] = {}
+        manager.add_notification_listener(self._on_notification)
+        store.add_listener(self.on_config_change)
+
+    async def server_tools(self, server: str) -> List[Dict[str, Any]]:
+        """Raw MCP tool definitions of one server.
+
+        Raises:
+            KeyError: If the server is not configured.
+            Exception: Whatever reaching the server raised, if nothing is cached.
+        """
+        return (await self._entry(server)).tools
+
+    async def provider_tools(
+        self, provider: str, servers: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Tools from ``servers`` in the format ``provider`` expects.
+
+        Servers that cannot be reached are skipped with a warning.
+
+        Args:
+            provider: Provider the tools will be sent to.
+            servers: Server names. Defaults to every configured server.
+
+        Returns:
+            Value for the adapter's ``tools`` argument. For Gemini, a single
+            tool holding every function declaration.
+        """
+        fmt = PROVIDER_FORMATS.get(provider, OPENAI_FORMAT)
+        entries = await self._entries(servers)
+        tools = [tool for entry in entries for tool in entry.formats[fmt]]
+        if fmt == GEMINI_FORMAT:
+            return [{"functionDeclarations": tools}] if tools else []
+        return tools
+
+    async def resolve(self, name: str) -> Tuple[str, str]:
+        """Map a tool name seen by a model back to (server, MCP tool name).
+
+        Raises:
+            KeyError: If no configured server offers the tool.
+        """
+        for attempt in range(2):
+            for server, entry in self._servers.items():
+                if name in entry.names:
+                    return server, entry.names[name]
+            if attempt == 0:
+                # Not cached (yet); fetch every server's list and look again
+                await self._entries(None)
+        raise KeyError(name)
+
+    async def call(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Call a tool by the name seen by the model.
+
+        Returns:
+            The MCP ``tools/call`` result (``content`` and ``isError``).
+        """
+        server, tool = await self.resolve(name)
+        return await self.manager.request(
+            server, "tools/call", {"name": tool, "arguments": arguments or {}}
+        )
+
+    def invalidate(self, server: Optional[str] = None) -> None:
+        """Forget cached tool lists; fetches in progress are detached."""
+        for key in [k for k in self._servers if server is None or k == server]:
+            del self._servers[key]
+        for key in [k for k in self._fetching if server is None or k == server]:
+            del self._fetching[key]
+
+    def on_config_change(self, names) -> None:
+        """Drop tool lists of servers whose definitions changed."""
+        for name in names:
+            self.invalidate(name)
+
+    async def _entries(self, servers: Optional[List[str]]) -> List[_ServerTools]:
+        if servers is None:
+            servers = list(await self.store.servers())
+        results = await asyncio.gather(
+            *(self._entry(server) for server in servers), return_exceptions=True
+        )
+        entries = []
+        for server, result in zip(servers, results):
+            if isinstance(result, BaseException):
+                logger.warning("Skipping tools of MCP server %s: %s", server, result)
+            else:
+                entries.append(result)
+        return entries
+
+    async def _entry(self, server: str) -> _ServerTools:
+        try:
+            session = await self.manager.session(server)
+        except MCPUnavailableError:
+            # Restarting; the last known tools are still the best answer
+            entry = self._servers.get(server)
+            if entry is None:
+                raise
+            return entry
+        entry = self._servers.get(server)
+        if entry is not None and entry.session is session:
+            return entry
+        task = self._fetching.get(server)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(server, session))
+            self._fetching[server] = task
+            task.add_done_callback(lambda _: self._forget(server, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, server: str, task: asyncio.Task) -> None:
+        if self._fetching.get(server) is task:
+            del self._fetching[server]
+
+    async def _fetch(self, server: str, session) -> _ServerTools:
+        tools: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            result = await session.request("tools/list", {"cursor": cursor} if cursor else None)
+            tools.extend(result.get("tools") or [])
+            cursor = result.get("nextCursor")
+            if not cursor:
+                break
+        entry = _ServerTools(session, tools, server)
+        if self._fetching.get(server) is asyncio.current_task():
+            self._servers[server] = entry
+        logger.info("Cached %d tools from MCP server %s", len(tools), server)
+        return entry
+
+    def _on_notification(self, server: str, method: str, params: Optional[dict]) -> None:
+        if method == "notifications/tools/list_changed":
+            self.invalidate(server)
+
+
+tool_catalog = ToolCatalog()
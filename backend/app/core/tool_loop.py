@@ -0,0 +1,336 @@
+"""Server-side execution of model tool calls against MCP servers."""
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.core.chat_service import ChatService, chat_service
+from app.core.config import load_config
+from app.core.rate_limiter import estimate_tokens, usage_tokens
+from app.core.schemas import (
+    LLMResponse,
+    Message,
+    MessageRole,
+    ToolLoopConfig,
+    ToolLoopEvent,
+)
+from app.core.streaming import RawChunk
+from app.core.tool_catalog import ToolCatalog, tool_catalog
+
+logger = logging.getLogger(__name__)
+
+# Reasons a loop is stopped before the model gave its final answer
+STOP_MAX_STEPS = "max_steps"
+STOP_MAX_WALL_TIME = "max_wall_time"
+STOP_MAX_TOTAL_TOKENS = "max_total_tokens"
+
+
+def tool_result_text(result: Dict[str, Any], max_chars: Optional[int] = None) -> str:
+    """Flatten an MCP ``tools/call`` result into text for the model.
+
+    Text content is kept as is; other content types are replaced by a
+    placeholder, as not every provider accepts them in tool results.
+    """
+    parts = []
+    for item in result.get("content") or []:
+        if item.get("type") == "text":
+            parts.append(item.get("text", ""))
+        else:
+            parts.append(f"[{item.get('type', 'unknown')} content omitted]")
+    text = "\n".join(parts)
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars] + f"\n[truncated {len(text) - max_chars} characters]"
+    return text
+
+
+class ToolLoop:
+    """Runs a conversation until the model stops calling MCP tools.
+
+    Each step streams the conversation with the catalog's tools to the
+    model. Every tool call is started as soon as the adapter has assembled
+    it, so tools run while the model is still generating later calls; the
+    calls of a step run concurrently (they cannot depend on each other, as
+    the model issued them together). Their results are appended to the
+    conversation and the model is called again. Progress is reported as
+    :class:`ToolLoopEvent` objects. The loop ends when the model answers
+    without tool calls or a step, wall time or token limit is reached; in
+    the latter case the last answer is returned with the limit as its
+    finish reason. Calls already started when a limit is reached run to
+    completion, and their results are reported in the ``limit`` event, as
+    tools may have side effects the model can no longer be told about.
+    """
+
+    def __init__(
+        self,
+        service: ChatService = chat_service,
+        catalog: ToolCatalog = tool_catalog,
+        config: Optional[ToolLoopConfig] = None,
+    ):
+        """Initialize the loop.
+
+        Args:
+            service: Chat service the model calls go through.
+            catalog: Source of tool definitions and tool calls.
+            config: Default limits. Defaults to ``tool_loop`` in config.yaml.
+        """
+        self.service = service
+        self.catalog = catalog
+        self._config = config
+
+    @property
+    def config(self) -> ToolLoopConfig:
+        """Default limits."""
+        if self._config is not None:
+            return self._config
+        return ToolLoopConfig(**(load_config().get("tool_loop") or {}))
+
+    async def run(
+        self,
+        provider: str,
+        messages: List[Message],
+        config: Optional[Dict] = None,
+        model: Optional[str] = None,
+        servers: Optional[List[str]] = None,
+        limits: Optional[ToolLoopConfig] = None,
+    ) -> AsyncIterator[ToolLoopEvent]:
+        """Run the loop, yielding progress events.
+
+        The last event is always a ``"message"`` event holding the final
+        :class:`LLMResponse`. Its metadata lists the messages the loop added
+        to the conversation (``"messages"``) and loop statistics
+        (``"tool_loop"``), including the results of calls that ran but were
+        never given to the model because a limit was reached.
+
+        Args:
+            provider: Provider name. Routes are not supported, as the tool
+                format depends on the provider.
+            messages: Conversation messages.
+            config: Provider config dict.
+            model: Model override.
+            servers: MCP servers whose tools are offered. Defaults to all.
+            limits: Limits for this run. Defaults to :attr:`config`.
+
+        Raises:
+            ValueError: If ``provider`` is a route.
+            Exception: Whatever the chat service raised for a model call.
+        """
+        if self.service.router.is_route(provider):
+            raise ValueError(f"Tool calls need a provider, not the route '{provider}'")
+        limits = limits or self.config
+        started = time.monotonic()
+        deadline = started + limits.max_wall_time
+
+        tools = await self.catalog.provider_tools(provider, servers)
+        kwargs = {"tools": tools} if tools else {}
+        history = list(messages)
+        added: List[Message] = []
+        response: Optional[LLMResponse] = None
+        stopped: Optional[str] = None
+        total_tokens = 0
+        tool_calls = 0
+        step = 0
+        unanswered: List[Dict[str, Any]] = []  # Results of calls the model never saw
+
+        semaphore = asyncio.Semaphore(max(1, limits.max_parallel_tools))
+
+        while True:
+            if step >= limits.max_steps:
+                stopped = STOP_MAX_STEPS
+                break
+            if deadline - time.monotonic() <= 0:
+                stopped = STOP_MAX_WALL_TIME
+                break
+            step += 1
+            yield ToolLoopEvent(type="step", step=step)
+            # Calls made in the last step could not be answered; don't run them
+            can_continue = step < limits.max_steps
+            calls: List[Dict[str, Any]] = []
+            tasks: Dict[str, asyncio.Task] = {}
+            content: List[str] = []
+            metadata: Dict[str, Any] = {}
+            try:
+                try:
+                    chunks = await asyncio.wait_for(
+                        self.service.stream(
+                            provider, history, config=config, model=model, **kwargs
+                        ),
+                        deadline - time.monotonic(),
+                    )
+                    async with aclosing(chunks):
+                        while True:
+                            chunk = await asyncio.wait_for(
+                                _next_chunk(chunks), deadline - time.monotonic()
+                            )
+                            if chunk is None:
+                                break
+                            content.append(chunk.content)
+                            metadata.update(chunk.metadata or {})
+                            # Each call is complete when it arrives; start it
+                            # while the model is still generating the next one
+                            for call in chunk.tool_calls or []:
+                                calls.append(call)
+                                if can_continue:
+                                    tasks[call["id"]] = asyncio.ensure_future(
+                                        self._call_tool(call, semaphore, limits, deadline)
+                                    )
+                                yield ToolLoopEvent(
+                                    type="tool_call",
+                                    step=step,
+                                    data={
+                                        "id": call["id"],
+                                        "name": call["function"]["name"],
+                                        "arguments": call["function"].get("arguments") or "{}",
+                                    },
+                                )
+                except asyncio.TimeoutError:
+                    stopped = STOP_MAX_WALL_TIME
+
+                response = LLMResponse(
+                    content="".join(content),
+                    model=metadata.get("model") or model or provider,
+                    finish_reason=metadata.get("finish_reason"),
+                    usage=metadata.get("usage"),
+                    tool_calls=calls or None,
+                )
+                used = usage_tokens(response.usage)
+                if not used:
+                    # Not every stream reports usage; estimate it then
+                    arguments = "".join(c["function"]["arguments"] or "" for c in calls)
+                    generated = len(response.content) + len(arguments)
+                    used = estimate_tokens(history) + generated // 4
+                total_tokens += used
+
+                if stopped is None and calls:
+                    if limits.max_total_tokens and total_tokens >= limits.max_total_tokens:
+                        stopped = STOP_MAX_TOTAL_TOKENS
+                    elif not can_continue:
+                        stopped = STOP_MAX_STEPS
+                if stopped is not None or not calls:
+                    # Tools may have side effects, so calls already running
+                    # finish and are reported rather than cancelled midway
+                    for future in asyncio.as_completed(list(tasks.values())):
+                        result = await future
+                        unanswered.append(result)
+                        yield ToolLoopEvent(type="tool_result", step=step, data=result)
+                    tool_calls += len(unanswered)
+                    break
+
+                assistant = Message(
+                    role=MessageRole.ASSISTANT, content=response.content, tool_calls=calls
+                )
+                history.append(assistant)
+                added.append(assistant)
+
+                results = {}
+                for future in asyncio.as_completed(list(tasks.values())):
+                    result = await future
+                    results[result["id"]] = result
+                    yield ToolLoopEvent(type="tool_result", step=step, data=result)
+                tool_calls += len(results)
+            finally:
+                # Stopped early or abandoned by the client; stop outstanding calls
+                for task in tasks.values():
+                    task.cancel()
+
+            # Results go back in the order the model issued the calls
+            for call in calls:
+                message = Message(
+                    role=MessageRole.TOOL,
+                    content=results[call["id"]]["content"],
+                    tool_call_id=call["id"],
+                )
+                history.append(message)
+                added.append(message)
+
+        if stopped is not None:
+            logger.info("Tool loop for %s stopped at step %d: %s", provider, step, stopped)
+            data: Dict[str, Any] = {"reason": stopped}
+            if unanswered:
+                data["tool_results"] = unanswered
+            yield ToolLoopEvent(type="limit", step=step, data=data)
+
+        final = LLMResponse(
+            content=response.content if response else "",
+            model=response.model if response else (model or ""),
+            finish_reason=stopped or (response.finish_reason if response else None),
+            usage={"total_tokens": total_tokens},
+            metadata={
+                **((response.metadata or {}) if response else {}),
+                "messages": [message.model_dump(exclude_none=True) for message in added],
+                "tool_loop": {
+                    "steps": step,
+                    "tool_calls": tool_calls,
+                    "stopped": stopped,
+                    "unanswered_tool_results": unanswered,
+                    "elapsed": round(time.monotonic() - started, 3),
+                },
+            },
+        )
+        yield ToolLoopEvent(type="message", step=step, data=final.model_dump(mode="json"))
+
+    async def complete(self, provider: str, messages: List[Message], **kwargs) -> LLMResponse:
+        """Run the loop to the end and return the final response.
+
+        Takes the same arguments as :meth:`run`.
+        """
+        final = None
+        async for event in self.run(provider, messages, **kwargs):
+            final = event
+        return LLMResponse.model_validate(final.data)
+
+    async def _call_tool(
+        self,
+        call: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        limits: ToolLoopConfig,
+        deadline: float,
+    ) -> Dict[str, Any]:
+        """Run one tool call; failures are reported to the model, not raised."""
+        name = call["function"]["name"]
+        started = time.monotonic()
+        is_error = True
+        try:
+            arguments = json.loads(call["function"].get("arguments") or "{}")
+        except ValueError as e:
+            arguments = e
+        try:
+            if not isinstance(arguments, dict):
+                content = f"Invalid arguments for tool '{name}': expected a JSON object"
+            else:
+                async with semaphore:
+                    timeout = min(limits.tool_timeout, deadline - time.monotonic())
+                    if timeout <= 0:
+                        raise asyncio.TimeoutError
+                    result = await asyncio.wait_for(
+                        self.catalog.call(name, arguments), timeout
+                    )
+                content = tool_result_text(result, limits.max_result_chars)
+                is_error = bool(result.get("isError"))
+        except asyncio.TimeoutError:
+            content = f"Tool '{name}' timed out"
+        except KeyError:
+            content = f"Unknown tool '{name}'"
+        except Exception as e:
+            logger.warning("Tool call %s failed: %s", name, e)
+            content = f"Tool '{name}' failed: {e}"
+        return {
+            "id": call["id"],
+            "name": name,
+            "content": content,
+            "is_error": is_error,
+            "duration": round(time.monotonic() - started, 3),
+        }
+
+
+async def _next_chunk(chunks: AsyncIterator[RawChunk]) -> Optional[RawChunk]:
+    """Next chunk of a stream, or None at its end."""
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+tool_loop = ToolLoop()
@@ -1,18 +1,47 @@
 """FastAPI application entry point."""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.conversations import router as conversations_router
 from app.api.router import router
 from app.api.settings import router as settings_router
 from app.api.mcp import router as mcp_router
+from app.api.websocket import router as websocket_router
+from app.core.adapter_pool import adapter_pool
 from app.core.config import settings
+from app.core.conversations import conversation_store
+from app.core.http_transport import transport_registry
+from app.core.mcp_client import mcp_manager
+from app.core.model_catalog import model_catalog
+from app.core.provider_status import provider_status
+from app.core.response_cache import response_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks."""
+    model_catalog.start()
+    provider_status.start()
+    mcp_manager.start()
+    yield
+    await mcp_manager.stop()
+    await provider_status.stop()
+    await model_catalog.close()
+    await adapter_pool.close()
+    await transport_registry.aclose()
+    await response_cache.close()
+    await conversation_store.close()
+
 
 app = FastAPI(
     title=settings.app_name,
     description="Veeam MCP Chat Client API",
     version="0.1.0",
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -28,6 +57,8 @@ app.add_middleware(
 app.include_router(router)
 app.include_router(settings_router)
 app.include_router(mcp_router)
+app.include_router(conversations_router)
+app.include_router(websocket_router)
 
 
 @app.get("/")
@@ -0,0 +1,60 @@
+"""Shared test fixtures."""
+
+import asyncio
+
+import pytest
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.base_adapter import BaseLLMAdapter
+from app.core.schemas import AdapterCapabilities, LLMResponse, ModelInfo
+
+
+class ProbeAdapter(BaseLLMAdapter):
+    """Adapter with controllable health checks and model listings."""
+
+    checks = 0
+    fetches = 0
+    check_delay = 0.0
+    fetch_delay = 0.0
+    fail = False
+
+    def _validate_config(self) -> None:
+        pass
+
+    async def chat(self, messages, stream=False, **kwargs):
+        return LLMResponse(content="probe", model=self.config.model)
+
+    async def health_check(self) -> bool:
+        type(self).checks += 1
+        await asyncio.sleep(self.check_delay)
+        return True
+
+    async def fetch_models(self):
+        type(self).fetches += 1
+        await asyncio.sleep(self.fetch_delay)
+        if self.fail:
+            raise ConnectionError("listing failed")
+        return [ModelInfo(id="probe-1", context_length=8192), ModelInfo(id="probe-2")]
+
+    def get_capabilities(self):
+        return AdapterCapabilities(
+            provider="probe", max_context_length=4096, supported_models=["static"]
+        )
+
+
+@pytest.fixture
+def probe_adapter(monkeypatch):
+    """Register the ``probe`` provider for one test, with its counters reset."""
+    monkeypatch.setitem(AdapterFactory._adapters, "probe", ProbeAdapter)
+    ProbeAdapter.checks = 0
+    ProbeAdapter.fetches = 0
+    ProbeAdapter.check_delay = 0.0
+    ProbeAdapter.fetch_delay = 0.0
+    ProbeAdapter.fail = False
+    return ProbeAdapter
+
+
+@pytest.fixture
+def probe_config():
+    """Provider config for the ``probe`` provider."""
+    return {"model": "probe-1", "base_url": "http://probe"}
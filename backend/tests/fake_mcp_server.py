@@ -0,0 +1,71 @@
+"""Minimal MCP server over stdio, launched by the MCP tests."""
+
+import json
+import os
+import sys
+import threading
+import time
+
+TOOLS = [
+    {
+        "name": "list_jobs",
+        "description": "List backup jobs",
+        "inputSchema": {
+            "$schema": "http://json-schema.org/draft-07/schema#",
+            "type": "object",
+            "properties": {"status": {"type": ["string", "null"], "default": "any"}},
+            "additionalProperties": False,
+        },
+    },
+    {"name": "get.job", "description": "Get one job", "inputSchema": {"type": "object"}},
+]
+
+lock = threading.Lock()
+
+
+def send(message):
+    with lock:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+
+def handle(message):
+    method, params = message["method"], message.get("params") or {}
+    if method == "initialize":
+        result = {
+            "protocolVersion": params["protocolVersion"],
+            "capabilities": {"tools": {"listChanged": True}},
+            "serverInfo": {"name": "fake", "version": "1"},
+        }
+    elif method == "echo":
+        time.sleep(params.get("delay", 0))
+        result = params
+    elif method == "notify":
+        send({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"})
+        result = {}
+    elif method == "crash":
+        os._exit(1)
+    elif method == "tools/list":
+        # One tool per page to exercise pagination
+        index = int(params.get("cursor") or 0)
+        result = {"tools": TOOLS[index:index + 1]}
+        if index + 1 < len(TOOLS):
+            result["nextCursor"] = str(index + 1)
+    elif method == "tools/call":
+        time.sleep(float(params["arguments"].get("delay", 0)))
+        text = json.dumps({"tool": params["name"], "arguments": params["arguments"]})
+        result = {"content": [{"type": "text", "text": text}], "isError": False}
+    else:
+        send({
+            "jsonrpc": "2.0",
+            "id": message["id"],
+            "error": {"code": -32601, "message": "Method not found"},
+        })
+        return
+    send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+
+for line in sys.stdin:
+    message = json.loads(line)
+    if "id" in message and "method" in message:
+        threading.Thread(target=handle, args=(message,), daemon=True).start()
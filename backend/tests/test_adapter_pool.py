@@ -0,0 +1,85 @@
+"""Tests for adapter pool."""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.adapter_pool import AdapterPool, credential_fingerprint
+
+
+@pytest.fixture
+def ollama_config():
+    """Create Ollama config dict fixture."""
+    return {
+        "model": "llama2",
+        "base_url": "http://localhost:11434",
+    }
+
+
+def test_credential_fingerprint():
+    """Test fingerprints are stable and never leak the key."""
+    assert credential_fingerprint(None) == ""
+    assert credential_fingerprint("sk-test") == credential_fingerprint("sk-test")
+    assert credential_fingerprint("sk-test") != credential_fingerprint("sk-other")
+    assert "sk-test" not in credential_fingerprint("sk-test")
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_adapter(ollama_config):
+    """Test identical configs share one warm adapter."""
+    pool = AdapterPool()
+    first = pool.acquire("ollama", config=ollama_config)
+    await pool.release(first)
+    second = pool.acquire("ollama", config=ollama_config)
+    await pool.release(second)
+
+    assert first is second
+    assert len(pool) == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_keys_on_model(ollama_config):
+    """Test a different model gets its own adapter."""
+    pool = AdapterPool()
+    first = pool.acquire("ollama", config=ollama_config)
+    second = pool.acquire("ollama", config=ollama_config, model="mistral")
+
+    assert first is not second
+    assert second.config.model == "mistral"
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_invalidate_closes_after_release(ollama_config):
+    """Test invalidated adapters are closed only once no lease holds them."""
+    pool = AdapterPool()
+    adapter = pool.acquire("ollama", config=ollama_config)
+    adapter.close = AsyncMock()
+
+    await pool.invalidate("ollama")
+    adapter.close.assert_not_awaited()
+    assert len(pool) == 0
+
+    await pool.release(adapter)
+    adapter.close.assert_awaited_once()
+
+    replacement = pool.acquire("ollama", config=ollama_config)
+    assert replacement is not adapter
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_evicts_least_recently_used(ollama_config):
+    """Test idle adapters beyond max_idle are closed."""
+    pool = AdapterPool(max_idle=1)
+    first = pool.acquire("ollama", config=ollama_config)
+    first.close = AsyncMock()
+    await pool.release(first)
+
+    async with pool.lease("ollama", config=ollama_config, model="mistral"):
+        pass
+    await pool.close()
+
+    first.close.assert_awaited_once()
+    assert len(pool) == 0
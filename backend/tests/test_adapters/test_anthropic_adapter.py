@@ -68,6 +68,33 @@ def test_anthropic_normalize_messages(anthropic_config):
         assert normalized[0]["role"] == "user"
 
 
+def test_anthropic_normalize_tool_messages(anthropic_config):
+    """Test tool calls and results are sent as tool_use/tool_result blocks."""
+    with patch("app.adapters.anthropic_adapter.AsyncAnthropic"):
+        adapter = AnthropicAdapter(anthropic_config)
+
+        call = {
+            "id": "toolu_1",
+            "type": "function",
+            "function": {"name": "veeam__list_jobs", "arguments": '{"state": "failed"}'},
+        }
+        messages = [
+            Message(role=MessageRole.USER, content="Failed jobs?"),
+            Message(
+                role=MessageRole.ASSISTANT,
+                content="",
+                tool_calls=[call, {**call, "id": "toolu_2"}],
+            ),
+            Message(role=MessageRole.TOOL, content="[]", tool_call_id="toolu_1"),
+            Message(role=MessageRole.TOOL, content="[]", tool_call_id="toolu_2"),
+        ]
+
+        normalized, _ = adapter.normalize_messages(messages)
+        assert [m["role"] for m in normalized] == ["user", "assistant", "user"]
+        assert normalized[1]["content"][0]["input"] == {"state": "failed"}
+        assert [b["tool_use_id"] for b in normalized[2]["content"]] == ["toolu_1", "toolu_2"]
+
+
 @pytest.mark.asyncio
 async def test_anthropic_chat_completion(anthropic_config):
     """Test Anthropic chat completion."""
@@ -98,6 +125,7 @@ async def test_anthropic_health_check(anthropic_config):
     """Test Anthropic health check."""
     with patch("app.adapters.anthropic_adapter.AsyncAnthropic") as mock_client:
         mock_client_instance = AsyncMock()
+        mock_client_instance.get = AsyncMock()
         mock_client_instance.messages.create = AsyncMock()
         mock_client.return_value = mock_client_instance
 
@@ -105,6 +133,21 @@ async def test_anthropic_health_check(anthropic_config):
         is_healthy = await adapter.health_check()
 
         assert is_healthy is True
+        assert mock_client_instance.get.call_args.args == ("/v1/models",)
+        mock_client_instance.messages.create.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_anthropic_health_check_failure(anthropic_config):
+    """Test Anthropic health check reports connection failures."""
+    with patch("app.adapters.anthropic_adapter.AsyncAnthropic") as mock_client:
+        mock_client_instance = AsyncMock()
+        mock_client_instance.get = AsyncMock(side_effect=ConnectionError("refused"))
+        mock_client.return_value = mock_client_instance
+
+        adapter = AnthropicAdapter(anthropic_config)
+
+        assert await adapter.health_check() is False
 
 
 def test_anthropic_capabilities(anthropic_config):
@@ -118,3 +161,12 @@ def test_anthropic_capabilities(anthropic_config):
         assert capabilities.supports_tools is True
         assert "claude-3-opus-20240229" in capabilities.supported_models
 
+
+
+def test_anthropic_completion_budget(anthropic_config):
+    """Test the budget is the default max_tokens the adapter sends when unset."""
+    with patch("app.adapters.anthropic_adapter.AsyncAnthropic"):
+        assert AnthropicAdapter(anthropic_config).completion_budget == 4096
+
+        anthropic_config.max_tokens = 512
+        assert AnthropicAdapter(anthropic_config).completion_budget == 512
@@ -0,0 +1,124 @@
+"""Tests for Gemini adapter."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.adapters.gemini_adapter import GeminiAdapter, JSONArrayParser
+from app.core.schemas import LLMConfig, Message, MessageRole
+
+
+@pytest.fixture
+def gemini_config():
+    """Create Gemini config fixture."""
+    return LLMConfig(
+        provider="gemini",
+        model="gemini-1.5-flash",
+        api_key="test-key",
+        base_url="http://gemini",
+    )
+
+
+def response(text=None, finish_reason=None, usage=None):
+    """Build one streamed Gemini response object."""
+    candidate = {"content": {"role": "model", "parts": [{"text": text}] if text else []}}
+    if finish_reason:
+        candidate["finishReason"] = finish_reason
+    data = {"candidates": [candidate]}
+    if usage:
+        data["usageMetadata"] = {
+            "promptTokenCount": usage[0],
+            "candidatesTokenCount": usage[1],
+            "totalTokenCount": sum(usage),
+        }
+    return data
+
+
+def use_transport(adapter, handler):
+    """Route the adapter's requests to ``handler``."""
+    adapter.client = httpx.AsyncClient(
+        base_url="http://gemini", transport=httpx.MockTransport(handler)
+    )
+
+
+async def collect(adapter, on_chunk=None):
+    """Stream a chat and collect the chunks."""
+    chunks = []
+    stream = await adapter.chat([Message(role=MessageRole.USER, content="Hi")], stream=True)
+    async for chunk in stream:
+        chunks.append(chunk)
+        if on_chunk:
+            on_chunk()
+    return chunks
+
+
+@pytest.mark.asyncio
+async def test_gemini_streams_sse_parts_as_they_arrive(gemini_config):
+    """Test text is yielded before Gemini has finished generating."""
+    first_seen = asyncio.Event()
+    requests = []
+
+    async def body():
+        yield f"data: {json.dumps(response('Hel'))}\r\n\r\n".encode()
+        # Generation continues only once the first part reached the caller
+        await asyncio.wait_for(first_seen.wait(), 5)
+        yield f"data: {json.dumps(response('lo', 'STOP', (5, 2)))}\r\n\r\n".encode()
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200, headers={"content-type": "text/event-stream"}, content=body()
+        )
+
+    adapter = GeminiAdapter(gemini_config)
+    use_transport(adapter, handler)
+    chunks = await collect(adapter, first_seen.set)
+
+    assert requests[0].url.params["alt"] == "sse"
+    assert [c.content for c in chunks] == ["Hel", "lo", ""]
+    final = chunks[-1]
+    assert final.finished
+    assert final.metadata["finish_reason"] == "STOP"
+    assert final.metadata["usage"] == {
+        "prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7,
+    }
+    await adapter.close()
+
+
+@pytest.mark.asyncio
+async def test_gemini_parses_json_array_streams_incrementally(gemini_config):
+    """Test a plain JSON array body is split into responses as it arrives."""
+    body = json.dumps([
+        response("a {brace"),
+        response('a "quote}'),
+        response(finish_reason="MAX_TOKENS", usage=(3, 4)),
+    ])
+
+    async def pieces():
+        for i in range(0, len(body), 7):
+            yield body[i : i + 7].encode()
+
+    adapter = GeminiAdapter(gemini_config)
+    use_transport(
+        adapter,
+        lambda request: httpx.Response(
+            200, headers={"content-type": "application/json"}, content=pieces()
+        ),
+    )
+    chunks = await collect(adapter)
+
+    assert [c.content for c in chunks] == ["a {brace", 'a "quote}', ""]
+    assert chunks[-1].metadata["finish_reason"] == "MAX_TOKENS"
+    assert chunks[-1].metadata["usage"]["total_tokens"] == 7
+    await adapter.close()
+
+
+def test_json_array_parser_returns_objects_as_they_complete():
+    """Test objects are returned by the piece that closes them."""
+    parser = JSONArrayParser()
+
+    assert parser.feed('[{"text": "a\\"}') == []
+    assert parser.feed('"}, {"n"') == [{"text": 'a"}'}]
+    assert parser.feed(": {}}]") == [{"n": {}}]
@@ -1,5 +1,6 @@
 """Tests for Ollama adapter."""
 
+import asyncio
 import json
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -84,6 +85,48 @@ async def test_ollama_chat_completion(ollama_config):
         assert response.usage["total_tokens"] == 15
 
 
+@pytest.mark.asyncio
+async def test_ollama_streams_tokens_as_they_arrive(ollama_config):
+    """Test chunks are yielded before Ollama has finished generating."""
+    first_seen = asyncio.Event()
+
+    def line(content, done=False, **stats):
+        data = {"model": "llama2", "message": {"content": content}, "done": done, **stats}
+        return json.dumps(data).encode() + b"\n"
+
+    async def body():
+        yield line("Hel")
+        # Generation continues only once the first token reached the caller
+        await asyncio.wait_for(first_seen.wait(), 5)
+        yield line("lo")
+        yield line(
+            "",
+            done=True,
+            done_reason="stop",
+            prompt_eval_count=10,
+            eval_count=20,
+            eval_duration=500_000_000,
+        )
+
+    adapter = OllamaAdapter(ollama_config)
+    adapter.client = httpx.AsyncClient(
+        base_url="http://ollama",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body())),
+    )
+    chunks = []
+    stream = await adapter.chat([Message(role=MessageRole.USER, content="Hi")], stream=True)
+    async for chunk in stream:
+        chunks.append(chunk)
+        first_seen.set()
+
+    assert "".join(c.content for c in chunks) == "Hello"
+    final = chunks[-1]
+    assert final.finished
+    assert final.metadata["usage"]["total_tokens"] == 30
+    assert final.metadata["timings"]["tokens_per_second"] == 40.0
+    await adapter.close()
+
+
 @pytest.mark.asyncio
 async def test_ollama_health_check(ollama_config):
     """Test Ollama health check."""
@@ -118,6 +161,8 @@ async def test_ollama_list_models(ollama_config):
 
         mock_client_instance = AsyncMock()
         mock_client_instance.get = AsyncMock(return_value=mock_response)
+        # Per-model details from /api/show
+        mock_client_instance.post = AsyncMock(return_value=mock_response)
         mock_client.return_value = mock_client_instance
 
         adapter = OllamaAdapter(ollama_config)
@@ -127,6 +172,55 @@ async def test_ollama_list_models(ollama_config):
         assert "mistral" in models
 
 
+@pytest.mark.asyncio
+async def test_ollama_models_report_context_lengths(ollama_config):
+    """Test model context lengths come from num_ctx, else the server default."""
+    shows = {
+        "llama3": {"parameters": "stop <|eot_id|>\nnum_ctx 8192", "model_info": {}},
+        "mistral": {"model_info": {"llama.context_length": 32768}},
+        "tiny": {"model_info": {"llama.context_length": 1024}},
+    }
+
+    def handler(request):
+        if request.url.path == "/api/tags":
+            names = ["llama3", "mistral", "tiny", "broken"]
+            return httpx.Response(200, json={"models": [{"name": n} for n in names]})
+        name = json.loads(request.content)["name"]
+        if name not in shows:
+            return httpx.Response(404, json={"error": "model not found"})
+        return httpx.Response(200, json=shows[name])
+
+    adapter = OllamaAdapter(ollama_config)
+    adapter.client = httpx.AsyncClient(
+        base_url="http://ollama", transport=httpx.MockTransport(handler)
+    )
+    models = await adapter.fetch_models()
+
+    assert [(m.id, m.context_length) for m in models] == [
+        ("llama3", 8192), ("mistral", 2048), ("tiny", 1024), ("broken", None),
+    ]
+    await adapter.close()
+
+
+@pytest.mark.asyncio
+async def test_ollama_default_num_ctx_is_configurable(ollama_config):
+    """Test a model without num_ctx reports the configured server default."""
+    ollama_config = ollama_config.model_copy(update={"default_num_ctx": 4096})
+
+    def handler(request):
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": "llama3.1"}]})
+        return httpx.Response(200, json={"model_info": {"llama.context_length": 131072}})
+
+    adapter = OllamaAdapter(ollama_config)
+    adapter.client = httpx.AsyncClient(
+        base_url="http://ollama", transport=httpx.MockTransport(handler)
+    )
+
+    assert [m.context_length for m in await adapter.fetch_models()] == [4096]
+    await adapter.close()
+
+
 def test_ollama_capabilities(ollama_config):
     """Test Ollama capabilities."""
     adapter = OllamaAdapter(ollama_config)
@@ -4,6 +4,8 @@ import os
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from openai.types.chat import ChatCompletionChunk
+
 from app.adapters.openai_adapter import OpenAIAdapter
 from app.core.schemas import LLMConfig, Message, MessageRole
 
@@ -101,18 +103,93 @@ async def test_openai_chat_completion(openai_config):
         assert response.usage["total_tokens"] == 15
 
 
+def completion_chunk(content=None, finish_reason=None, usage=None):
+    """Build one streamed chat completion chunk."""
+    choices = []
+    if content is not None or finish_reason:
+        choices.append(
+            {"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}
+        )
+    data = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4",
+        "choices": choices,
+    }
+    if usage:
+        data["usage"] = usage
+    return ChatCompletionChunk.model_validate(data)
+
+
+async def stream_chat(config, chunks):
+    """Stream a chat from canned chunks; return them and the request params."""
+
+    class Stream:
+        response = AsyncMock()
+
+        async def __aiter__(self):
+            for chunk in chunks:
+                yield chunk
+
+    with patch("app.adapters.openai_adapter.AsyncOpenAI") as mock_client:
+        mock_client_instance = AsyncMock()
+        mock_client_instance.chat.completions.create = AsyncMock(return_value=Stream())
+        mock_client.return_value = mock_client_instance
+
+        adapter = OpenAIAdapter(config)
+        stream = await adapter.chat([Message(role=MessageRole.USER, content="Hello")], stream=True)
+        received = [chunk async for chunk in stream]
+    return received, mock_client_instance.chat.completions.create.call_args.kwargs
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_reports_usage_on_the_final_chunk(openai_config):
+    """Test streams request usage and attach it to the finishing chunk."""
+    usage = {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}
+    chunks, params = await stream_chat(
+        openai_config,
+        [
+            completion_chunk(""),
+            completion_chunk("Hi"),
+            completion_chunk(finish_reason="stop"),
+            completion_chunk(usage=usage),
+        ],
+    )
+
+    assert params["extra_body"] == {"stream_options": {"include_usage": True}}
+    assert [c.content for c in chunks] == ["", "Hi", ""]
+    assert chunks[-1].finished
+    assert chunks[-1].metadata["usage"] == usage
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_usage_can_be_turned_off(openai_config):
+    """Test ``stream_usage: false`` sends no stream_options."""
+    config = openai_config.model_copy(update={"stream_usage": False})
+    chunks, params = await stream_chat(
+        config, [completion_chunk("Hi"), completion_chunk(finish_reason="stop")]
+    )
+
+    assert "extra_body" not in params
+    assert [c.content for c in chunks] == ["Hi", ""]
+    assert "usage" not in chunks[-1].metadata
+
+
 @pytest.mark.asyncio
 async def test_openai_health_check(openai_config):
     """Test OpenAI health check."""
     with patch("app.adapters.openai_adapter.AsyncOpenAI") as mock_client:
         mock_client_instance = AsyncMock()
-        mock_client_instance.models.list = AsyncMock()
+        mock_client_instance.models.retrieve = AsyncMock()
         mock_client.return_value = mock_client_instance
 
         adapter = OpenAIAdapter(openai_config)
         is_healthy = await adapter.health_check()
 
         assert is_healthy is True
+        mock_client_instance.models.retrieve.assert_awaited_once()
+        assert mock_client_instance.models.retrieve.call_args.args == (openai_config.model,)
 
 
 def test_openai_capabilities(openai_config):
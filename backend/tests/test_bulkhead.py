@@ -0,0 +1,99 @@
+"""Tests for concurrency bulkheads."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.core.bulkhead import (
+    Bulkhead,
+    BulkheadFullError,
+    BulkheadRegistry,
+    BulkheadTimeoutError,
+)
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_unlimited_by_default():
+    """Test a bulkhead without max_concurrent never blocks."""
+    bulkhead = Bulkhead("test")
+    for _ in range(50):
+        await bulkhead.acquire()
+    assert bulkhead.active == 50
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_queues_in_fifo_order():
+    """Test waiters get slots in arrival order."""
+    bulkhead = Bulkhead("test", max_concurrent=1)
+    await bulkhead.acquire()
+    order = []
+
+    async def waiter(name):
+        await bulkhead.acquire()
+        order.append(name)
+        bulkhead.release()
+
+    tasks = [asyncio.create_task(waiter(i)) for i in range(3)]
+    await asyncio.sleep(0)
+    assert bulkhead.queued == 3
+
+    bulkhead.release()
+    await asyncio.gather(*tasks)
+
+    assert order == [0, 1, 2]
+    assert bulkhead.active == 0
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_rejects_when_queue_full():
+    """Test a full queue fails fast with 429 and Retry-After."""
+    bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1)
+    await bulkhead.acquire()
+    queued = asyncio.create_task(bulkhead.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(BulkheadFullError) as exc_info:
+        await bulkhead.acquire()
+
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) >= 1
+    queued.cancel()
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_queue_timeout():
+    """Test waiting past queue_timeout fails with 503."""
+    bulkhead = Bulkhead("test", max_concurrent=1, queue_timeout=0.01)
+    await bulkhead.acquire()
+
+    with pytest.raises(BulkheadTimeoutError) as exc_info:
+        await bulkhead.acquire()
+
+    assert exc_info.value.status_code == 503
+    assert bulkhead.queued == 0
+    bulkhead.release()
+    assert bulkhead.active == 0
+
+
+@pytest.mark.asyncio
+async def test_registry_applies_model_limits():
+    """Test per-model limits are layered on the provider limit."""
+    config = {
+        "concurrency": {
+            "max_concurrent": 4,
+            "models": {"gpt-4": {"max_concurrent": 1, "queue_timeout": 0.01}},
+        }
+    }
+    registry = BulkheadRegistry()
+    with patch("app.core.bulkhead.get_llm_config", return_value=config):
+        permit = await registry.acquire("openai", "gpt-4")
+        with pytest.raises(BulkheadTimeoutError):
+            await registry.acquire("openai", "gpt-4")
+        other = await registry.acquire("openai", "gpt-3.5-turbo")
+
+        assert registry.get("openai").active == 2
+        permit.release()
+        other.release()
+        assert registry.get("openai").active == 0
+        assert registry.get("openai", "gpt-4").active == 0
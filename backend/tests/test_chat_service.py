@@ -0,0 +1,456 @@
+"""Tests for the chat service."""
+
+import asyncio
+from unittest.mock import MagicMock, call, patch
+
+import httpx
+import pytest
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.adapter_pool import AdapterPool
+from app.core.base_adapter import BaseLLMAdapter
+from app.core.bulkhead import Bulkhead, BulkheadRegistry, BulkheadRejectedError
+from app.core.circuit_breaker import CLOSED, CircuitOpenError
+from app.core.chat_service import ChatService
+from app.core.context_window import ContextWindow, ContextWindowExceededError, TokenCounter
+from app.core.rate_limiter import RateLimitedError, RateLimiterRegistry
+from app.core.resilience import ResiliencePolicy, ResilienceRegistry
+from app.core.response_cache import CACHE_BYPASS, CACHE_REFRESH, ResponseCache
+from app.core.routing import ProviderRouter
+from app.core.schemas import (
+    AdapterCapabilities,
+    ContextWindowConfig,
+    HedgingConfig,
+    LLMConfig,
+    LLMResponse,
+    Message,
+    MessageRole,
+    ResponseCacheConfig,
+    RetryConfig,
+    RouteConfig,
+    RouteTarget,
+    RoutingConfig,
+    StreamChunk,
+)
+
+
+class ProviderRateLimit(Exception):
+    """Stand-in for an SDK 429 error."""
+
+    status_code = 429
+
+
+class FakeAdapter(BaseLLMAdapter):
+    """Adapter returning canned responses."""
+
+    fail_with = None
+    last_messages = None
+    usage = None  # Reported by the last stream chunk
+    delays = []  # Seconds the next completions take
+
+    def _validate_config(self) -> None:
+        pass
+
+    async def chat(self, messages, stream=False, **kwargs):
+        FakeAdapter.last_messages = messages
+        if self.fail_with:
+            raise self.fail_with
+        if stream:
+            return self._stream()
+        if FakeAdapter.delays:
+            await asyncio.sleep(FakeAdapter.delays.pop(0))
+        return LLMResponse(
+            content="pong", model=self.config.model, usage={"total_tokens": 3}
+        )
+
+    @staticmethod
+    async def _stream():
+        yield StreamChunk(content="po")
+        usage = FakeAdapter.usage
+        yield StreamChunk(content="ng", finished=True, metadata={"usage": usage} if usage else None)
+
+    async def health_check(self) -> bool:
+        return True
+
+    def get_capabilities(self):
+        return AdapterCapabilities(provider="fake")
+
+
+class BrokenAdapter(FakeAdapter):
+    """Adapter whose provider is down."""
+
+    fail_with = RuntimeError("provider down")
+
+
+AdapterFactory.register_adapter("fake", FakeAdapter)
+AdapterFactory.register_adapter("broken", BrokenAdapter)
+
+FAKE_CONFIG = {"model": "fake-1", "base_url": "http://fake"}
+ROUTES = {
+    "chat": RouteConfig(
+        targets=[RouteTarget(provider="broken"), RouteTarget(provider="fake")]
+    )
+}
+MESSAGES = [Message(role=MessageRole.USER, content="ping")]
+
+
+@pytest.fixture
+def service():
+    """Create a chat service with isolated registries."""
+    with patch("app.core.bulkhead.get_llm_config", return_value={}), patch(
+        "app.core.rate_limiter.get_llm_config", return_value={}
+    ), patch("app.core.resilience.get_llm_config", return_value={}), patch(
+        "app.core.adapter_factory.get_provider_config",
+        side_effect=lambda provider: LLMConfig(provider=provider, **FAKE_CONFIG),
+    ):
+        yield ChatService(
+            AdapterPool(),
+            BulkheadRegistry(),
+            RateLimiterRegistry(),
+            ResilienceRegistry(),
+            ProviderRouter(RoutingConfig(), ROUTES),
+            ResponseCache(ResponseCacheConfig(enabled=False)),
+        )
+    FakeAdapter.fail_with = None
+    FakeAdapter.usage = None
+    FakeAdapter.delays = []
+
+
+@pytest.mark.asyncio
+async def test_complete_releases_lease(service):
+    """Test a completion returns the adapter to the pool."""
+    response = await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+
+    assert response.content == "pong"
+    assert service.pool._leased == {}
+    assert service.bulkheads.get("fake").active == 0
+
+
+@pytest.mark.asyncio
+async def test_prompt_is_trimmed_to_the_context_window(service):
+    """Test old turns are dropped before the adapter is called."""
+    counter = TokenCounter()
+    counter._encoding = False
+    catalog = MagicMock()
+    catalog.context_length.return_value = 40
+    service.context = ContextWindow(
+        ContextWindowConfig(response_budget=10, safety_margin=0), counter, catalog
+    )
+    history = [
+        Message(role=MessageRole.USER, content="x" * 40),
+        Message(role=MessageRole.ASSISTANT, content="y" * 40),
+        *MESSAGES,
+    ]
+
+    await service.complete("fake", history, config=FAKE_CONFIG)
+    assert FakeAdapter.last_messages == MESSAGES
+
+    with pytest.raises(ContextWindowExceededError):
+        await service.complete(
+            "fake", [Message(role=MessageRole.USER, content="z" * 400)], config=FAKE_CONFIG
+        )
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_on_close(service):
+    """Test closing a stream early releases the lease and slot."""
+    stream = await service.stream("fake", MESSAGES, config=FAKE_CONFIG)
+    assert (await stream.__anext__()).content == "po"
+    assert service.bulkheads.get("fake").active == 1
+
+    await stream.aclose()
+    assert service.pool._leased == {}
+    assert service.bulkheads.get("fake").active == 0
+
+
+@pytest.mark.asyncio
+async def test_unstarted_stream_releases_on_close(service):
+    """Test a stream that was never iterated still releases on close."""
+    stream = await service.stream("fake", MESSAGES, config=FAKE_CONFIG)
+    await stream.aclose()
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_provider_429_becomes_rate_limited(service):
+    """Test provider 429 errors surface as RateLimitedError with Retry-After."""
+    FakeAdapter.fail_with = ProviderRateLimit("slow down")
+
+    with pytest.raises(RateLimitedError) as exc_info:
+        await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+
+    assert exc_info.value.headers["Retry-After"] == "1"
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_failing_to_open_raises_before_it_is_returned(service):
+    """Test a provider error before the first chunk raises from stream()."""
+    FakeAdapter.fail_with = ProviderRateLimit("slow down")
+
+    with pytest.raises(RateLimitedError):
+        await service.stream("fake", MESSAGES, config=FAKE_CONFIG)
+
+    assert service.pool._leased == {}
+    assert service.bulkheads.get("fake").active == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_learns_from_adapter_responses(service):
+    """Test provider responses seen by the adapter feed its limiter."""
+    await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+    adapter = service.pool.acquire("fake", config=FAKE_CONFIG)
+    await service.pool.release(adapter)
+
+    await adapter._on_response(
+        httpx.Response(
+            429,
+            headers={"retry-after": "7"},
+            request=httpx.Request("POST", "http://fake"),
+        )
+    )
+    assert 6 < service.rate_limiters.get("fake").retry_after() <= 7
+
+
+def spy_on_limiter(service):
+    """Record how the fake provider's limiter is settled and refunded."""
+    limiter = service.rate_limiters.get("fake")
+    limiter.settle = MagicMock(wraps=limiter.settle)
+    limiter.refund = MagicMock(wraps=limiter.refund)
+    return limiter
+
+
+@pytest.mark.asyncio
+async def test_streams_settle_their_token_reservation(service):
+    """Test a stream's reservation is settled with reported or estimated usage."""
+    limiter = spy_on_limiter(service)
+    config = {**FAKE_CONFIG, "max_tokens": 100}
+
+    stream = await service.stream("fake", MESSAGES, config=config)
+    assert [chunk.content async for chunk in stream] == ["po", "ng"]
+    FakeAdapter.usage = {"prompt_tokens": 4, "completion_tokens": 3, "total_tokens": 7}
+    stream = await service.stream("fake", MESSAGES, config=config)
+    assert [chunk.content async for chunk in stream] == ["po", "ng"]
+    await (await service.stream("fake", MESSAGES, config=config)).aclose()
+
+    # Reserved: a 5 token prompt estimate plus max_tokens. Without reported
+    # usage the prompt estimate plus a token for "pong" (or none for "po")
+    assert limiter.settle.call_args_list == [
+        call(105, {"total_tokens": 6}),
+        call(105, FakeAdapter.usage),
+        call(105, {"total_tokens": 5}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_losing_hedge_reservation_is_refunded(service):
+    """Test only the winning attempt of a hedged call is charged."""
+    limiter = spy_on_limiter(service)
+    service.resilience._policies["fake"] = ResiliencePolicy(
+        RetryConfig(), HedgingConfig(enabled=True, delay=0.01)
+    )
+    FakeAdapter.delays = [0.2, 0]
+
+    await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+
+    limiter.settle.assert_called_once_with(5, {"total_tokens": 3})
+    limiter.refund.assert_called_once_with(5)
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_before_first_chunk(service):
+    """Test a stream that fails before its first chunk is reopened."""
+    service.resilience.get("fake").retry = RetryConfig(base_delay=0.001)
+    failures = [httpx.ConnectError("refused")]
+
+    async def chat(messages, stream=False, **kwargs):
+        if failures:
+            raise failures.pop()
+        return FakeAdapter._stream()
+
+    adapter = service.pool.acquire("fake", config=FAKE_CONFIG)
+    await service.pool.release(adapter)
+    adapter.chat = chat
+
+    stream = await service.stream("fake", MESSAGES, config=FAKE_CONFIG)
+    assert [chunk.content async for chunk in stream] == ["po", "ng"]
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_route_fails_over_to_next_target(service):
+    """Test a routed completion moves on when the first target errors."""
+    response = await service.complete("chat", MESSAGES)
+
+    assert response.content == "pong"
+    assert response.metadata == {"route": "chat", "provider": "fake"}
+    assert service.router.stats("broken").consecutive_failures == 1
+    assert service.router.stats("fake").latency is not None
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_route_prefers_target_that_worked(service):
+    """Test a failed target is ranked after one that succeeded."""
+    await service.complete("chat", MESSAGES)
+
+    assert [t.provider for t in service.router.rank("chat")] == ["fake", "broken"]
+
+
+@pytest.mark.asyncio
+async def test_routed_stream_fails_over_before_first_chunk(service):
+    """Test a routed stream switches targets before sending anything."""
+    stream = await service.stream("chat", MESSAGES)
+
+    assert [chunk.content async for chunk in stream] == ["po", "ng"]
+    assert service.router.stats("broken").consecutive_failures == 1
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_route_raises_last_error_when_all_fail(service):
+    """Test the last target's error surfaces when every target fails."""
+    FakeAdapter.fail_with = RuntimeError("also down")
+
+    with pytest.raises(RuntimeError, match="also down"):
+        await service.complete("chat", MESSAGES)
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_complete_serves_cached_response(service):
+    """Test an identical request is answered from the response cache."""
+    service.cache = ResponseCache(ResponseCacheConfig(max_temperature=None))
+    await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+    FakeAdapter.fail_with = RuntimeError("should not be called")
+
+    response = await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+
+    assert response.content == "pong"
+    assert response.metadata == {"cache": "hit"}
+    assert service.cache.stats.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_requests_with_other_max_tokens_are_not_cache_hits(service):
+    """Test a response cut short by max_tokens is not served to other budgets."""
+    service.cache = ResponseCache(ResponseCacheConfig(max_temperature=None))
+    await service.complete("fake", MESSAGES, config={**FAKE_CONFIG, "max_tokens": 5})
+    await service.complete("fake", MESSAGES, config={**FAKE_CONFIG, "max_tokens": 500})
+
+    assert service.cache.stats.misses == 2
+    assert service.cache.stats.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_route_requests_are_cached_by_their_targets_temperature(service):
+    """Test routes are only cached when every target is under the ceiling."""
+    service.cache = ResponseCache(ResponseCacheConfig(max_temperature=0.5))
+    await service.complete("chat", MESSAGES)
+    await service.complete("chat", MESSAGES)
+    assert service.cache.stats.hits == 0
+
+    service.cache = ResponseCache(ResponseCacheConfig(max_temperature=1.0))
+    await service.complete("chat", MESSAGES)
+    response = await service.complete("chat", MESSAGES)
+    assert response.metadata["cache"] == "hit"
+
+
+@pytest.mark.asyncio
+async def test_cache_modes_skip_lookup(service):
+    """Test refresh and bypass modes always call the provider."""
+    service.cache = ResponseCache(ResponseCacheConfig(max_temperature=None))
+    await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+    FakeAdapter.fail_with = RuntimeError("called")
+
+    for mode in (CACHE_REFRESH, CACHE_BYPASS):
+        with pytest.raises(RuntimeError):
+            await service.complete("fake", MESSAGES, config=FAKE_CONFIG, cache_mode=mode)
+    assert service.cache.stats.hits == 0
+    assert service.cache.stats.bypasses == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_completions_share_one_call(service):
+    """Test identical in-flight completions reach the provider once."""
+    calls = 0
+
+    async def chat(messages, stream=False, **kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return LLMResponse(content="pong", model="fake-1")
+
+    adapter = service.pool.acquire("fake", config=FAKE_CONFIG)
+    await service.pool.release(adapter)
+    adapter.chat = chat
+
+    responses = await asyncio.gather(
+        *(service.complete("fake", MESSAGES, config=FAKE_CONFIG) for _ in range(3))
+    )
+    assert [r.content for r in responses] == ["pong"] * 3
+    assert calls == 1
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_coalesced_completions_store_the_response_once(service):
+    """Test only the shared call writes the cache entry."""
+    service.cache = ResponseCache(ResponseCacheConfig(max_temperature=None))
+    FakeAdapter.delays = [0.01]
+
+    await asyncio.gather(
+        *(service.complete("fake", MESSAGES, config=FAKE_CONFIG) for _ in range(3))
+    )
+
+    assert service.cache.stats.misses == 3
+    assert service.cache.stats.stores == 1
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_streams_share_one_upstream(service):
+    """Test identical in-flight streams are fanned out from one upstream."""
+    first = await service.stream("fake", MESSAGES, config=FAKE_CONFIG)
+    second = await service.stream("fake", MESSAGES, config=FAKE_CONFIG)
+
+    assert [c.content async for c in first] == ["po", "ng"]
+    assert [c.content async for c in second] == ["po", "ng"]
+    assert service.fanout.stats.followers == 1
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_short_circuits_calls(service):
+    """Test repeated transient failures open the circuit and fail fast."""
+    service.resilience.get("fake").retry = RetryConfig(max_attempts=1)
+    service.breakers.get("fake").config.failure_threshold = 2
+    FakeAdapter.fail_with = httpx.ConnectError("refused")
+
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+    assert int(exc_info.value.headers["Retry-After"]) > 0
+    assert service.pool._leased == {}
+
+
+@pytest.mark.asyncio
+async def test_rejected_admission_gives_back_the_half_open_trial(service):
+    """Test a trial call that never reaches the provider lets another one try."""
+    breaker = service.breakers.get("fake")
+    breaker.record_failure()
+    breaker.opened_at = 0.0  # Long past the recovery timeout: half-open
+    bulkhead = service.bulkheads._bulkheads[("fake", None)] = Bulkhead(
+        "fake", max_concurrent=1, max_queue=0
+    )
+    await bulkhead.acquire()
+
+    with pytest.raises(BulkheadRejectedError):
+        await service.complete("fake", MESSAGES, config=FAKE_CONFIG)
+    bulkhead.release()
+
+    assert (await service.complete("fake", MESSAGES, config=FAKE_CONFIG)).content == "pong"
+    assert breaker.state == CLOSED
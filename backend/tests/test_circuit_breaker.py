@@ -0,0 +1,108 @@
+"""Tests for provider circuit breakers."""
+
+import httpx
+import pytest
+
+from app.core.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from app.core.schemas import CircuitBreakerConfig
+
+
+@pytest.fixture
+def breaker():
+    """Create a breaker that opens after two failures."""
+    return CircuitBreaker("test", CircuitBreakerConfig(failure_threshold=2, recovery_timeout=30))
+
+
+def expire(breaker):
+    """Move the breaker past its recovery timeout."""
+    breaker.opened_at -= breaker.config.recovery_timeout
+
+
+def test_opens_after_consecutive_failures(breaker):
+    """Test the circuit opens at the failure threshold."""
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.before_call()
+    assert exc_info.value.headers["Retry-After"] == "30"
+
+
+def test_success_resets_failure_count(breaker):
+    """Test failures must be consecutive to open the circuit."""
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_only_transient_errors_count(breaker):
+    """Test client errors do not open the circuit."""
+    for _ in range(3):
+        breaker.record(ValueError("bad request"))
+    assert breaker.state == CLOSED
+
+    for _ in range(2):
+        breaker.record(httpx.ConnectError("refused"))
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_one_trial(breaker):
+    """Test a single trial call is let through after the timeout."""
+    breaker.record_failure()
+    breaker.record_failure()
+    expire(breaker)
+
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_cancelled_trial_frees_the_slot(breaker):
+    """Test a trial that was never sent can be taken by the next call."""
+    breaker.record_failure()
+    breaker.record_failure()
+    expire(breaker)
+
+    assert breaker.before_call() is True
+    breaker.cancel_trial()
+    assert breaker.before_call() is True
+
+
+def test_trial_success_closes_circuit(breaker):
+    """Test a successful trial closes the circuit."""
+    breaker.record_failure()
+    breaker.record_failure()
+    expire(breaker)
+    breaker.before_call()
+    breaker.record_success()
+
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_trial_failure_reopens_circuit(breaker):
+    """Test a failed trial reopens the circuit for another timeout."""
+    breaker.record_failure()
+    breaker.record_failure()
+    expire(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+
+
+def test_disabled_breaker_never_rejects():
+    """Test a disabled breaker lets every call through."""
+    breaker = CircuitBreaker("test", CircuitBreakerConfig(enabled=False, failure_threshold=1))
+    breaker.record_failure()
+    breaker.before_call()
@@ -0,0 +1,226 @@
+"""Tests for request coalescing."""
+
+import asyncio
+
+import pytest
+
+from app.core.coalescing import SingleFlight, StreamFanout
+
+
+class Upstream:
+    """Async iterator that yields once released and records closes."""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.release = asyncio.Event()
+        self.pulls = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self.release.wait()
+        if not self.items:
+            raise StopAsyncIteration
+        self.pulls += 1
+        return self.items.pop(0)
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    """Test concurrent calls with the same key run once."""
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "pong"
+
+    tasks = [asyncio.ensure_future(flights.do("k", call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == ["pong"] * 5
+    assert calls == 1
+    assert flights.stats.as_dict() == {"leaders": 1, "followers": 4}
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors():
+    """Test every waiter sees the shared call's error."""
+    flights = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0)
+        raise RuntimeError("down")
+
+    results = await asyncio.gather(
+        flights.do("k", call), flights.do("k", call), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_one_cancelled_caller():
+    """Test cancelling one waiter leaves the call running for the others."""
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def call():
+        await release.wait()
+        return "pong"
+
+    first = asyncio.ensure_future(flights.do("k", call))
+    second = asyncio.ensure_future(flights.do("k", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "pong"
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_when_all_callers_leave():
+    """Test the shared call is cancelled once nobody waits for it."""
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.ensure_future(flights.do("k", call))
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_fanout_replays_stream_to_every_subscriber():
+    """Test identical streams share one upstream and see every chunk."""
+    fanout = StreamFanout()
+    upstream = Upstream(["a", "b", "c"])
+    opened = 0
+
+    async def opener():
+        nonlocal opened
+        opened += 1
+        return upstream
+
+    first = await fanout.subscribe("k", opener)
+    second = await fanout.subscribe("k", opener)
+    upstream.release.set()
+
+    assert await first.__anext__() == "a"
+    third = await fanout.subscribe("k", opener)
+    assert [c async for c in first] == ["b", "c"]
+    assert [c async for c in second] == ["a", "b", "c"]
+    assert [c async for c in third] == ["a", "b", "c"]
+    assert opened == 1
+    assert upstream.pulls == 3
+    assert upstream.closed
+    assert len(fanout) == 0
+
+
+@pytest.mark.asyncio
+async def test_fanout_closes_upstream_when_last_subscriber_leaves():
+    """Test upstream is only cancelled once every subscriber is gone."""
+    fanout = StreamFanout()
+    upstream = Upstream(["a", "b"])
+
+    async def opener():
+        return upstream
+
+    first = await fanout.subscribe("k", opener)
+    second = await fanout.subscribe("k", opener)
+
+    await first.aclose()
+    assert not upstream.closed
+    await second.aclose()
+    assert upstream.closed
+    assert len(fanout) == 0
+
+
+@pytest.mark.asyncio
+async def test_fanout_open_errors_reach_every_subscriber():
+    """Test a failure to open is raised to all waiting subscribers."""
+    fanout = StreamFanout()
+
+    async def opener():
+        await asyncio.sleep(0)
+        raise RuntimeError("rejected")
+
+    results = await asyncio.gather(
+        fanout.subscribe("k", opener), fanout.subscribe("k", opener), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert results[0] is not results[1]
+    assert len(fanout) == 0
+
+
+@pytest.mark.asyncio
+async def test_fanout_stream_errors_are_raised_as_separate_instances():
+    """Test subscribers do not share one exception and its traceback."""
+    fanout = StreamFanout()
+    upstream = Upstream([])
+    upstream.release.set()
+
+    async def fail():
+        raise RuntimeError("provider down")
+
+    upstream.__anext__ = fail
+
+    async def opener():
+        return upstream
+
+    first = await fanout.subscribe("k", opener)
+    second = await fanout.subscribe("k", opener)
+    errors = []
+    for subscription in (first, second):
+        with pytest.raises(RuntimeError) as exc_info:
+            await subscription.__anext__()
+        errors.append(exc_info.value)
+
+    assert errors[0] is not errors[1]
+    assert str(errors[1]) == "provider down"
+
+
+@pytest.mark.asyncio
+async def test_fanout_only_buffers_what_subscribers_still_need():
+    """Test a stream past its replay window takes no joiners and drops read chunks."""
+    fanout = StreamFanout(max_replay_chunks=2)
+    upstream = Upstream(["a", "b", "c", "d"])
+    upstream.release.set()
+    opened = 0
+
+    async def opener():
+        nonlocal opened
+        opened += 1
+        return upstream if opened == 1 else Upstream([])
+
+    first = await fanout.subscribe("k", opener)
+    second = await fanout.subscribe("k", opener)
+    assert [await first.__anext__() for _ in range(3)] == ["a", "b", "c"]
+    assert len(fanout) == 0
+
+    late = await fanout.subscribe("k", opener)
+    assert opened == 2
+    await late.aclose()
+
+    assert [c async for c in second] == ["a", "b", "c", "d"]
+    assert second._broadcast.chunks == ["d"]
+    assert [c async for c in first] == ["d"]
+    assert first._broadcast.chunks == []
@@ -0,0 +1,172 @@
+"""Tests for the cached configuration store."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.adapter_pool import AdapterPool
+from app.core.bulkhead import BulkheadRegistry
+from app.core.config import ConfigStore, get_env_llm_config, load_config
+from app.core.routing import ProviderRouter
+
+CONFIG = """
+llm_providers:
+  openai:
+    api_key: ${TEST_CONFIG_KEY}
+    model: gpt-4
+    timeout: ${TEST_CONFIG_TIMEOUT}
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    """Write a config file referencing environment variables."""
+    path = tmp_path / "config.yaml"
+    path.write_text(CONFIG)
+    with patch.dict(os.environ, {"TEST_CONFIG_KEY": "sk-one", "TEST_CONFIG_TIMEOUT": "45"}):
+        yield path
+
+
+def rewrite(path, text):
+    """Replace the file contents and make sure the mtime moves."""
+    mtime = path.stat().st_mtime_ns
+    path.write_text(text)
+    os.utime(path, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+
+
+def test_env_vars_expanded_and_typed(config_file):
+    """Test env references are expanded and parsed as YAML scalars."""
+    settings = ConfigStore(config_file).get()["llm_providers"]["openai"]
+
+    assert settings["api_key"] == "sk-one"
+    assert settings["timeout"] == 45
+
+
+def test_file_parsed_once_until_changed(config_file):
+    """Test the file is only re-read when it changes."""
+    store = ConfigStore(config_file, check_interval=0)
+    with patch("app.core.config._read_yaml", wraps=lambda p: {"llm_providers": {}}) as read:
+        store.get()
+        store.get()
+        assert read.call_count == 1
+
+        rewrite(config_file, "llm_providers: {}\n")
+        store.get()
+        assert read.call_count == 2
+
+
+def test_llm_config_is_validated_once(config_file):
+    """Test the same validated LLMConfig is returned until the file changes."""
+    store = ConfigStore(config_file, check_interval=0)
+    first = store.llm_config("openai")
+
+    assert first.timeout == 45
+    assert store.llm_config("openai") is first
+
+    rewrite(config_file, CONFIG.replace("gpt-4", "gpt-4o"))
+    assert store.llm_config("openai").model == "gpt-4o"
+
+
+def test_env_change_reexpands_without_reparsing(config_file):
+    """Test a changed env var is picked up from the cached YAML."""
+    store = ConfigStore(config_file)
+    store.get()
+    with patch("app.core.config._read_yaml") as read:
+        os.environ["TEST_CONFIG_KEY"] = "sk-two"
+        assert store.llm_config("openai").api_key == "sk-two"
+        read.assert_not_called()
+
+
+def test_invalid_provider_settings_raise(config_file):
+    """Test invalid provider settings raise ValueError on use."""
+    rewrite(config_file, "llm_providers:\n  openai:\n    timeout: soon\n")
+
+    with pytest.raises(ValueError):
+        ConfigStore(config_file).llm_config("openai")
+
+
+def test_broken_reload_keeps_previous_config(config_file):
+    """Test a file that fails to parse does not replace the last good config."""
+    store = ConfigStore(config_file, check_interval=0)
+    store.get()
+    rewrite(config_file, "llm_providers: [unclosed\n")
+
+    assert store.get()["llm_providers"]["openai"]["model"] == "gpt-4"
+
+
+def test_listeners_told_which_providers_changed(config_file):
+    """Test listeners only hear about providers whose settings changed."""
+    store = ConfigStore(config_file, check_interval=0)
+    changes = []
+    store.add_listener(changes.append)
+    store.get()
+
+    rewrite(config_file, CONFIG + "  gemini:\n    model: gemini-pro\n")
+    store.get()
+    assert changes == [{"gemini"}]
+
+
+@pytest.mark.asyncio
+async def test_pool_swaps_adapters_on_config_change():
+    """Test the pool drops adapters for providers whose settings changed."""
+    pool = AdapterPool()
+    config = {"api_key": "sk-test", "model": "gpt-4", "base_url": "https://api.openai.com/v1"}
+    adapter = pool.acquire("openai", config=config)
+    await pool.release(adapter)
+
+    pool.on_config_change({"anthropic"})
+    assert len(pool) == 1
+    pool.on_config_change({"openai"})
+    assert len(pool) == 0
+    assert pool.acquire("openai", config=config) is not adapter
+
+
+def test_admission_settings_reload_when_edited(config_file):
+    """Test edited provider limits and routes apply to the next request."""
+    store = ConfigStore(config_file, check_interval=0)
+    registry = BulkheadRegistry()
+    router = ProviderRouter()
+    store.add_listener(registry.on_config_change)
+    store.add_section_listener("routes", router.reset)
+    limited = CONFIG + "    concurrency:\n      max_concurrent: 4\n"
+    rewrite(config_file, limited + "routes:\n  fast:\n    targets: [{provider: openai}]\n")
+
+    with patch("app.core.config.config_store", store):
+        assert registry.get("openai").max_concurrent == 4
+        assert router.route("fast").targets[0].provider == "openai"
+
+        rewrite(
+            config_file,
+            limited.replace("4", "8") + "routes:\n  fast:\n    targets: [{provider: gemini}]\n",
+        )
+        # Every request reads its provider settings first, noticing the edit
+        load_config()
+        assert registry.get("openai").max_concurrent == 8
+        assert router.route("fast").targets[0].provider == "gemini"
+
+
+def test_explicit_path_is_not_cached(config_file):
+    """Test load_config with a path reads that file directly."""
+    assert load_config(str(config_file))["llm_providers"]["openai"]["model"] == "gpt-4"
+
+
+def test_env_key_keeps_yaml_provider_settings():
+    """Test an API key from the environment is merged over config.yaml."""
+    yaml_config = {
+        "llm_providers": {
+            "openai": {"model": "gpt-4o", "timeout": 45, "transport": {"max_connections": 5}}
+        }
+    }
+    with patch("app.core.config.load_config", return_value=yaml_config), patch.dict(
+        os.environ, {"OPENAI_API_KEY": "sk-env"}
+    ):
+        config = get_env_llm_config("openai")
+        assert get_env_llm_config("openai", "gpt-4-turbo")["model"] == "gpt-4-turbo"
+
+    assert config["api_key"] == "sk-env"
+    assert config["model"] == "gpt-4o"
+    llm_config = AdapterFactory.build_config("openai", config=config)
+    assert llm_config.timeout == 45
+    assert llm_config.transport.max_connections == 5
@@ -0,0 +1,137 @@
+"""Tests for context window trimming."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.context_window import (
+    TRUNCATION_MARKER,
+    ContextWindow,
+    ContextWindowExceededError,
+    TokenCounter,
+)
+from app.adapters.ollama_adapter import OllamaAdapter
+from app.adapters.openai_adapter import OpenAIAdapter
+from app.core.schemas import AdapterCapabilities, ContextWindowConfig, LLMConfig, Message
+
+
+def msg(role, content, **kwargs):
+    """Build a message."""
+    return Message(role=role, content=content, **kwargs)
+
+
+@pytest.fixture
+def window():
+    """Create a window counting characters, with no catalog entries."""
+    catalog = MagicMock()
+    catalog.context_length.return_value = None
+    counter = TokenCounter()
+    counter._encoding = False  # Count characters whether or not tiktoken is installed
+    return ContextWindow(
+        ContextWindowConfig(max_tool_result_tokens=10, safety_margin=0), counter, catalog
+    )
+
+
+def conversation():
+    """System prompt plus three turns of ~25 tokens each."""
+    return [
+        msg("system", "Veeam assistant"),
+        msg("user", "a" * 40),
+        msg("assistant", "b" * 40),
+        msg("user", "c" * 40),
+        msg("assistant", "d" * 40),
+        msg("user", "e" * 40),
+    ]
+
+
+def test_counts_are_cached_by_content():
+    """Test equal messages are counted once."""
+    counter = TokenCounter()
+    counter._encoding = False
+
+    first = counter.count(msg("user", "x" * 40))
+    second = counter.count(msg("user", "x" * 40))
+    assert first == second == 14
+    assert (counter.hits, counter.misses) == (1, 1)
+
+
+def test_fitting_conversation_is_untouched(window):
+    """Test nothing changes when the conversation fits."""
+    messages = conversation()
+    assert window.fit(messages, 1000) is messages
+
+
+def test_oldest_turns_are_dropped_first(window):
+    """Test old turns go, while the system prompt and newest turn stay."""
+    fitted = window.fit(conversation(), 60)
+
+    assert [m.content[0] for m in fitted] == ["V", "c", "d", "e"]
+
+
+def test_oversized_tool_results_are_truncated_before_dropping_turns(window):
+    """Test a huge tool result is cut rather than losing earlier turns."""
+    call = {"id": "1", "type": "function", "function": {"name": "t", "arguments": "{}"}}
+    messages = [
+        msg("user", "Which jobs failed?"),
+        msg("assistant", "", tool_calls=[call]),
+        msg("tool", "x" * 4000, tool_call_id="1"),
+    ]
+
+    fitted = window.fit(messages, 60)
+
+    assert len(fitted) == 3
+    assert fitted[2].content.endswith(TRUNCATION_MARKER)
+    assert messages[2].content == "x" * 4000
+
+
+def test_newest_turn_that_cannot_fit_raises(window):
+    """Test a turn bigger than the window fails before reaching the provider."""
+    with pytest.raises(ContextWindowExceededError):
+        window.fit(conversation(), 20)
+
+
+def test_prompt_limit_keeps_room_for_the_answer(window):
+    """Test the response budget comes off the model's context length."""
+    adapter = MagicMock()
+    adapter.config = LLMConfig(provider="fake", model="m", base_url="http://x", max_tokens=1000)
+    adapter.completion_budget = 1000
+    adapter.get_capabilities.return_value = AdapterCapabilities(
+        provider="fake", max_context_length=8000
+    )
+
+    assert window.prompt_limit(adapter) == 7000
+    window.catalog.context_length.return_value = 32000
+    assert window.prompt_limit(adapter) == 31000
+
+
+def test_ollama_conversation_is_trimmed_without_an_api_key(window):
+    """Test Ollama's default num_ctx bounds the prompt before the catalog knows the model."""
+    adapter = OllamaAdapter(
+        LLMConfig(provider="ollama", model="llama3", base_url="http://localhost:11434")
+    )
+    history = []
+    for i in range(4):
+        history += [msg("user", f"{i}" * 3000), msg("assistant", "ok")]
+    history.append(msg("user", "Which jobs failed?"))
+
+    trimmed = window.prepare(adapter, history)
+
+    # 2048 tokens minus a quarter kept for the answer
+    assert window.prompt_limit(adapter) == 1536
+    assert trimmed[-1].content == "Which jobs failed?"
+    assert len(trimmed) < len(history)
+    assert sum(window.counter.count(m) for m in trimmed) <= 1536
+
+
+def test_context_length_fallbacks_and_overrides(window):
+    """Test known model windows beat static capabilities, and settings beat both."""
+    adapter = OpenAIAdapter(
+        LLMConfig(provider="openai", api_key="sk-test", model="gpt-4", base_url="http://x")
+    )
+    assert window.context_length(adapter) == 8192
+
+    adapter.config.model = "gpt-4-turbo-preview"
+    assert window.context_length(adapter) == 128000
+
+    window.config.context_lengths = {"openai/gpt-4-turbo-preview": 16000}
+    assert window.context_length(adapter) == 16000
@@ -0,0 +1,123 @@
+"""Tests for the server-side conversation store."""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.core.conversations import ConversationStore
+from app.core.schemas import ConversationStoreConfig, Message, MessageRole
+
+
+def user(content):
+    """Build a user message."""
+    return Message(role=MessageRole.USER, content=content)
+
+
+def assistant(content):
+    """Build an assistant message."""
+    return Message(role=MessageRole.ASSISTANT, content=content)
+
+
+@pytest.fixture
+async def store(tmp_path):
+    """Create a store over a temporary database."""
+    store = ConversationStore(
+        ConversationStoreConfig(path=str(tmp_path / "conversations.db"), page_size=2)
+    )
+    yield store
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_history_is_rebuilt_from_appended_turns(store):
+    """Test turns appended separately come back as one history."""
+    conversation = await store.create(messages=[user("Which jobs failed last night?")])
+    await store.append(conversation.id, [assistant("Two.")], provider="openai", model="gpt-4")
+    await store.append(conversation.id, [user("Why?"), assistant("Storage full.")])
+
+    history = await store.history(conversation.id)
+    assert [m.content for m in history] == [
+        "Which jobs failed last night?", "Two.", "Why?", "Storage full.",
+    ]
+
+    details = await store.get(conversation.id)
+    assert details.title == "Which jobs failed last night?"
+    assert details.message_count == 4
+    assert (details.provider, details.model) == ("openai", "gpt-4")
+
+
+@pytest.mark.asyncio
+async def test_history_survives_restart(store):
+    """Test histories are read back from disk by a fresh store."""
+    conversation = await store.create(messages=[user("Hi")])
+    await store.append(conversation.id, [assistant("Hello")])
+
+    reopened = ConversationStore(store.config)
+    try:
+        assert [m.role for m in await reopened.history(conversation.id)] == ["user", "assistant"]
+    finally:
+        await reopened.close()
+
+    conn = sqlite3.connect(store.path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_keep_every_message(store):
+    """Test concurrent turns neither collide nor lose messages."""
+    conversation = await store.create()
+    await asyncio.gather(*(store.append(conversation.id, [user(str(i))]) for i in range(20)))
+
+    history = await store.history(conversation.id)
+    assert sorted(int(m.content) for m in history) == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_listing_pages_by_recent_update(store):
+    """Test listings are paged newest first and can be filtered by star."""
+    ids = [(await store.create(title=f"chat {i}")).id for i in range(5)]
+    await store.append(ids[0], [user("bump")])
+    await store.update(ids[1], starred=True)
+
+    first, cursor = await store.list()
+    second, cursor = await store.list(cursor=cursor)
+    third, cursor = await store.list(cursor=cursor)
+    assert cursor is None
+    listed = [c.id for c in first + second + third]
+    assert listed[0] == ids[0]
+    assert sorted(listed) == sorted(ids)
+
+    starred, _ = await store.list(starred=True)
+    assert [c.id for c in starred] == [ids[1]]
+    with pytest.raises(ValueError):
+        await store.list(cursor="garbage")
+
+
+@pytest.mark.asyncio
+async def test_messages_page_backwards(store):
+    """Test message pages walk from the newest messages to the oldest."""
+    conversation = await store.create(messages=[user(str(i)) for i in range(5)])
+
+    page, previous = await store.messages(conversation.id)
+    assert [m["content"] for m in page] == ["3", "4"]
+    page, previous = await store.messages(conversation.id, before=previous)
+    assert [m["seq"] for m in page] == [1, 2]
+    page, previous = await store.messages(conversation.id, before=previous)
+    assert [m["content"] for m in page] == ["0"] and previous is None
+
+
+@pytest.mark.asyncio
+async def test_missing_conversations(store):
+    """Test unknown ids raise KeyError, and deletes remove messages."""
+    conversation = await store.create(messages=[user("Hi")])
+    await store.delete(conversation.id)
+
+    assert await store.get(conversation.id) is None
+    with pytest.raises(KeyError):
+        await store.history(conversation.id)
+    with pytest.raises(KeyError):
+        await store.append(conversation.id, [user("Hi")])
+    with pytest.raises(KeyError):
+        await store.delete(conversation.id)
@@ -0,0 +1,132 @@
+"""Tests for the shared HTTP transport registry."""
+
+import asyncio
+import os
+import socket
+from unittest.mock import AsyncMock, patch
+
+import httpcore
+import httpx
+import pytest
+
+from app.core.http_transport import (
+    CachingNetworkBackend,
+    TransportRegistry,
+    environment_proxies,
+)
+from app.core.schemas import HTTPTransportConfig
+
+
+@pytest.mark.asyncio
+async def test_registry_shares_pool_per_origin():
+    """Test clients for the same origin share one connection pool."""
+    registry = TransportRegistry()
+    first = registry.get_transport("https://example.com/v1")
+    second = registry.get_transport("https://example.com/v2")
+    other = registry.get_transport("https://other.example.com")
+
+    assert first._transport is second._transport
+    assert first._transport is not other._transport
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_registry_separates_transport_settings():
+    """Test differing transport settings get separate pools."""
+    registry = TransportRegistry()
+    default = registry.get_transport("http://localhost:11434")
+    tuned = registry.get_transport(
+        "http://localhost:11434", HTTPTransportConfig(max_connections=5)
+    )
+
+    assert default._transport is not tuned._transport
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_client_close_keeps_shared_pool_open():
+    """Test closing an adapter client leaves the shared pool usable."""
+    registry = TransportRegistry()
+    client = registry.create_client("http://localhost:11434", timeout=5)
+    shared = client._transport._transport
+    shared.aclose = AsyncMock()
+
+    await client.aclose()
+    shared.aclose.assert_not_awaited()
+
+    await registry.aclose()
+    shared.aclose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_clients_use_proxies_from_the_environment():
+    """Test HTTPS_PROXY and NO_PROXY apply despite the custom transport."""
+    registry = TransportRegistry()
+    proxies = {"HTTPS_PROXY": "http://proxy.internal:3128", "NO_PROXY": "localhost"}
+    with patch.dict(os.environ, proxies, clear=True):
+        client = registry.create_client("https://api.openai.com/v1", timeout=5)
+
+    proxied = client._transport_for_url(httpx.URL("https://api.openai.com/v1"))
+    assert isinstance(proxied._transport.pool, httpcore.AsyncHTTPProxy)
+    assert client._transport_for_url(httpx.URL("https://localhost")) is client._transport
+    await client.aclose()
+    await registry.aclose()
+
+
+def test_no_proxy_hosts_bypass_the_proxy():
+    """Test NO_PROXY entries become mounts without a proxy."""
+    proxies = {
+        "HTTP_PROXY": "proxy.internal:3128",
+        "NO_PROXY": "localhost, .internal.example, 10.0.0.1, ::1",
+    }
+    with patch.dict(os.environ, proxies, clear=True):
+        assert environment_proxies() == {
+            "http://": "http://proxy.internal:3128",
+            "all://localhost": None,
+            "all://*.internal.example": None,
+            "all://10.0.0.1": None,
+            "all://[::1]": None,
+        }
+    with patch.dict(os.environ, {"HTTPS_PROXY": "http://proxy:3128", "NO_PROXY": "*"}, clear=True):
+        assert environment_proxies() == {}
+
+
+@pytest.mark.asyncio
+async def test_pooled_client_round_trip_and_errors():
+    """Test requests go through the registry's pool and errors are httpx errors."""
+
+    async def serve(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    registry = TransportRegistry()
+    with patch.dict(os.environ, {}, clear=True):
+        client = registry.create_client(f"http://127.0.0.1:{port}", timeout=5)
+    async with server:
+        response = await client.get("/")
+        assert (response.status_code, response.text) == (200, "ok")
+    server.close()
+    await server.wait_closed()
+
+    with pytest.raises(httpx.ConnectError):
+        await client.get("/")
+    await client.aclose()
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_dns_cache_resolves_once():
+    """Test host names are resolved once within the TTL."""
+    backend = CachingNetworkBackend(ttl=60)
+    infos = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.5", 443))]
+
+    with patch("asyncio.BaseEventLoop.getaddrinfo", AsyncMock(return_value=infos)) as lookup:
+        assert await backend._resolve("api.example.com", 443) == "10.0.0.5"
+        assert await backend._resolve("api.example.com", 443) == "10.0.0.5"
+        assert await backend._resolve("127.0.0.1", 443) == "127.0.0.1"
+
+    assert lookup.await_count == 1
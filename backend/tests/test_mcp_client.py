@@ -0,0 +1,127 @@
+"""Tests for MCP stdio sessions and the process manager."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core.mcp_client import (
+    MCPConnectionError,
+    MCPError,
+    MCPProcessManager,
+    MCPSession,
+    MCPUnavailableError,
+)
+from app.core.mcp_config import MCPConfigStore
+from app.core.schemas import MCPProcessConfig
+
+FAKE_SERVER = str(Path(__file__).parent / "fake_mcp_server.py")
+
+
+@pytest.fixture
+async def manager(tmp_path):
+    """Create a manager over a store with one fake server."""
+    store = MCPConfigStore(tmp_path / "config.yaml", check_interval=0)
+    await store.save("fake", {"command": sys.executable, "args": [FAKE_SERVER]})
+    manager = MCPProcessManager(
+        store,
+        MCPProcessConfig(autostart=False, backoff_initial=0.05, backoff_max=0.2, start_timeout=5),
+    )
+    yield manager
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_session():
+    """Test responses are matched to requests by id, whatever their order."""
+    session = MCPSession("fake", sys.executable, [FAKE_SERVER])
+    await session.start()
+    try:
+        slow, fast = await asyncio.gather(
+            session.request("echo", {"delay": 0.2, "n": 1}),
+            session.request("echo", {"n": 2}),
+        )
+        assert slow["n"] == 1 and fast["n"] == 2
+        assert session.server_info["name"] == "fake"
+        with pytest.raises(MCPError):
+            await session.request("missing")
+    finally:
+        await session.close()
+    assert session.closed
+
+
+@pytest.mark.asyncio
+async def test_timeout_leaves_session_usable():
+    """Test a timed-out request does not break the session."""
+    session = MCPSession("fake", sys.executable, [FAKE_SERVER])
+    await session.start()
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await session.request("echo", {"delay": 1}, timeout=0.05)
+        assert await session.request("echo", {"n": 3}) == {"n": 3}
+    finally:
+        await session.close()
+
+
+@pytest.mark.asyncio
+async def test_manager_reuses_warm_session(manager):
+    """Test concurrent callers share one launched server."""
+    sessions = await asyncio.gather(*(manager.session("fake") for _ in range(5)))
+
+    assert len({id(s) for s in sessions}) == 1
+    assert manager.snapshot()["fake"]["running"]
+
+
+@pytest.mark.asyncio
+async def test_notifications_reach_listeners(manager):
+    """Test server notifications are passed on with the server name."""
+    received = []
+    manager.add_notification_listener(lambda *args: received.append(args))
+
+    await manager.request("fake", "notify")
+    assert ("fake", "notifications/tools/list_changed", None) in received
+
+
+@pytest.mark.asyncio
+async def test_crashed_server_restarts_with_backoff(manager):
+    """Test a crash fails pending requests and the server comes back."""
+    first = await manager.session("fake")
+    with pytest.raises(MCPConnectionError):
+        await manager.request("fake", "crash")
+
+    with pytest.raises(MCPUnavailableError):
+        await manager.session("fake")
+
+    for _ in range(50):
+        await asyncio.sleep(0.05)
+        if manager.snapshot()["fake"]["running"]:
+            break
+    second = await manager.session("fake")
+    assert second is not first and second.pid != first.pid
+    assert manager.snapshot()["fake"]["restarts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_config_change_relaunches_server(manager):
+    """Test a changed definition stops the old process."""
+    first = await manager.session("fake")
+    definition = await manager.store.get("fake")
+    await manager.store.save("fake", {**definition, "env": {"FAKE_MODE": "2"}})
+
+    await first.wait_closed()
+    second = await manager.session("fake")
+    assert second is not first
+    assert second.env == {"FAKE_MODE": "2"}
+
+
+@pytest.mark.asyncio
+async def test_failed_launch_is_not_retried_immediately(manager):
+    """Test a server that cannot start is held off by the backoff."""
+    await manager.store.save("broken", {"command": "/nonexistent/mcp-server"})
+
+    with pytest.raises(MCPConnectionError):
+        await manager.session("broken")
+    with pytest.raises(MCPUnavailableError):
+        await manager.session("broken")
+    assert manager.snapshot()["broken"]["consecutive_failures"] == 1
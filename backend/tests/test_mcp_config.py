@@ -0,0 +1,121 @@
+"""Tests for the MCP server config store."""
+
+import asyncio
+
+import pytest
+import yaml
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import mcp as mcp_api
+from app.core.mcp_config import MCPConfigStore, PreconditionFailedError, etag_matches
+
+SERVER = {"command": "node", "args": ["server.js"]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a store over a config file with other sections."""
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.dump({"llm_providers": {"openai": {"model": "gpt-4"}}}))
+    return MCPConfigStore(path, check_interval=0)
+
+
+@pytest.mark.asyncio
+async def test_save_keeps_other_sections(store):
+    """Test saving a server rewrites only the mcp_servers block."""
+    await store.save("veeam", SERVER)
+
+    document = yaml.safe_load(store.path.read_text())
+    assert document["mcp_servers"] == {"veeam": SERVER}
+    assert document["llm_providers"] == {"openai": {"model": "gpt-4"}}
+    assert list(store.path.parent.iterdir()) == [store.path]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_saves_are_not_lost(store):
+    """Test concurrent read-modify-write cycles all land."""
+    await asyncio.gather(
+        *(store.save(f"server-{i}", {**SERVER, "args": [str(i)]}) for i in range(20))
+    )
+
+    reloaded = MCPConfigStore(store.path)
+    assert len(await reloaded.servers()) == 20
+
+
+@pytest.mark.asyncio
+async def test_reads_served_from_memory(store):
+    """Test reads do not re-parse an unchanged file."""
+    await store.save("veeam", SERVER)
+    first = await store.servers()
+
+    assert await store.servers() is first
+
+
+@pytest.mark.asyncio
+async def test_external_edits_are_reloaded(store):
+    """Test changes made to the file by hand are picked up."""
+    await store.servers()
+    store.path.write_text(yaml.dump({"mcp_servers": {"manual": SERVER}}))
+
+    assert await store.get("manual") == SERVER
+
+
+@pytest.mark.asyncio
+async def test_if_match_rejects_stale_writes(store):
+    """Test a write based on an outdated ETag is rejected."""
+    etag = await store.save("veeam", SERVER)
+    await store.save("veeam", {**SERVER, "args": []}, if_match=etag)
+
+    with pytest.raises(PreconditionFailedError) as exc:
+        await store.save("veeam", SERVER, if_match=etag)
+    assert exc.value.etag == await store.etag("veeam")
+    with pytest.raises(PreconditionFailedError):
+        await store.delete("veeam", if_match=etag)
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_only_creates(store):
+    """Test If-None-Match: * refuses to overwrite an existing server."""
+    await store.save("veeam", SERVER, if_none_match="*")
+
+    with pytest.raises(PreconditionFailedError):
+        await store.save("veeam", SERVER, if_none_match="*")
+
+
+@pytest.mark.asyncio
+async def test_delete_missing_server(store):
+    """Test deleting an unknown server raises KeyError."""
+    with pytest.raises(KeyError):
+        await store.delete("missing")
+
+
+def test_etag_matching():
+    """Test If-Match header parsing and strong versus weak comparison."""
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('"a", W/"b"', '"b"', weak=True)
+    assert not etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches("*", None)
+    assert not etag_matches('"a"', '"b"')
+
+
+@pytest.mark.asyncio
+async def test_api_rejects_weak_if_match(store, monkeypatch):
+    """Test a weak ETag cannot satisfy If-Match on writes, but does on reads."""
+    monkeypatch.setattr(mcp_api, "mcp_config", store)
+    etag = await store.save("veeam", SERVER)
+    app = FastAPI()
+    app.include_router(mcp_api.router)
+    client = TestClient(app)
+    url = "/api/v1/settings/mcp/servers"
+    body = {"name": "veeam", **SERVER}
+    weak = {"If-Match": f"W/{etag}"}
+
+    assert client.post(url, json=body, headers=weak).status_code == 412
+    assert client.delete(f"{url}/veeam", headers=weak).status_code == 412
+    assert "veeam" in await store.servers()
+
+    response = client.get(f"{url}/veeam", headers={"If-None-Match": f"W/{etag}"})
+    assert response.status_code == 304
+    assert client.post(url, json=body, headers={"If-Match": etag}).status_code == 200
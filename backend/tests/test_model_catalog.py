@@ -0,0 +1,161 @@
+"""Tests for the model catalog."""
+
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.core.adapter_factory import AdapterFactory
+from app.core.adapter_pool import AdapterPool
+from app.core.model_catalog import ModelCatalog
+from app.core.schemas import LLMConfig, ModelCatalogConfig
+
+
+@pytest.fixture
+def make_catalog(tmp_path, probe_adapter, probe_config):
+    """Build catalogs sharing one persistence file."""
+    config = ModelCatalogConfig(
+        ttl=60, max_stale=120, fetch_timeout=0.05, path=str(tmp_path / "models.json")
+    )
+    with patch("app.core.model_catalog.get_env_llm_config", return_value=probe_config):
+        yield lambda: ModelCatalog(AdapterPool(), config)
+
+
+@pytest.mark.asyncio
+async def test_models_are_cached(make_catalog, probe_adapter):
+    """Test a fetched list is served from cache while fresh."""
+    catalog = make_catalog()
+    first = await catalog.models("probe")
+    second = await catalog.models("probe")
+
+    assert [m.id for m in first] == ["probe-1", "probe-2"]
+    assert second is first
+    assert probe_adapter.fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_models_served_while_revalidating(make_catalog, probe_adapter):
+    """Test a stale list is returned at once and refreshed in the background."""
+    catalog = make_catalog()
+    first = await catalog.models("probe")
+    catalog.entries["probe"].fetched_at -= 90
+
+    assert await catalog.models("probe") is first
+    await asyncio.gather(*catalog._refreshing.values())
+    assert probe_adapter.fetches == 2
+
+
+@pytest.mark.asyncio
+async def test_catalog_persists_across_instances(make_catalog, probe_adapter):
+    """Test a new catalog starts from the list saved by a previous one."""
+    await make_catalog().models("probe")
+
+    restarted = make_catalog()
+    await restarted.load()
+    models = await restarted.models("probe")
+
+    assert [m.id for m in models] == ["probe-1", "probe-2"]
+    assert probe_adapter.fetches == 1
+    assert "probe" in json.loads(restarted.path.read_text())
+
+
+@pytest.mark.asyncio
+async def test_slow_fetch_does_not_block(make_catalog, probe_adapter):
+    """Test waiting is bounded and the fetch completes in the background."""
+    catalog = make_catalog()
+    probe_adapter.fetch_delay = 0.2
+
+    assert await catalog.models("probe") == []
+    await asyncio.gather(*catalog._refreshing.values())
+    assert catalog.cached("probe")
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_keeps_last_known_models(make_catalog, probe_adapter):
+    """Test a failed refresh falls back to the old list."""
+    catalog = make_catalog()
+    await catalog.models("probe")
+    catalog.entries["probe"].fetched_at -= 1000
+    probe_adapter.fail = True
+
+    models = await catalog.models("probe")
+    assert [m.id for m in models] == ["probe-1", "probe-2"]
+    with pytest.raises(ConnectionError):
+        await catalog.refresh("probe")
+
+
+@pytest.mark.asyncio
+async def test_capabilities_use_catalog(make_catalog, probe_adapter, probe_config):
+    """Test capabilities report catalog models and the model's context length."""
+    catalog = make_catalog()
+    adapter = probe_adapter(AdapterFactory.build_config("probe", probe_config))
+
+    assert catalog.capabilities(adapter).supported_models == ["static"]
+    await asyncio.gather(*catalog._refreshing.values())
+
+    capabilities = catalog.capabilities(adapter)
+    assert capabilities.supported_models == ["probe-1", "probe-2"]
+    assert capabilities.max_context_length == 8192
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forgets_persisted_models(make_catalog, probe_adapter):
+    """Test invalidated lists are dropped from memory and disk."""
+    catalog = make_catalog()
+    await catalog.models("probe")
+    catalog.invalidate("probe")
+    await catalog._save()
+
+    assert "probe" not in json.loads(catalog.path.read_text())
+    await catalog.models("probe")
+    assert probe_adapter.fetches == 2
+
+
+@pytest.mark.asyncio
+async def test_persisted_catalog_is_read_off_the_event_loop(make_catalog, probe_adapter):
+    """Test the first lookup does not read the catalog file on the loop."""
+    await make_catalog().models("probe")
+    restarted = make_catalog()
+    read = restarted._read
+    threads = []
+
+    def record_read():
+        threads.append(threading.current_thread())
+        return read()
+
+    restarted._read = record_read
+    assert restarted.context_length("probe", "probe-1") is None
+    await restarted.load()
+
+    assert threads and threading.main_thread() not in threads
+    assert restarted.context_length("probe", "probe-1") == 8192
+
+
+@pytest.mark.asyncio
+async def test_context_length_lookup_schedules_a_fetch(make_catalog, probe_adapter):
+    """Test asking for an unknown model's context length fetches the list."""
+    catalog = make_catalog()
+
+    assert catalog.context_length("probe", "probe-1") is None
+    await asyncio.gather(*catalog._refreshing.values())
+    assert catalog.context_length("probe", "probe-1") == 8192
+
+
+@pytest.mark.asyncio
+async def test_start_warms_providers_without_an_api_key(tmp_path, probe_adapter, probe_config):
+    """Test providers configured only in config.yaml are fetched at startup."""
+    catalog = ModelCatalog(AdapterPool(), ModelCatalogConfig(path=str(tmp_path / "m.json")))
+    with patch("app.core.model_catalog.get_env_llm_config", return_value=None), patch.object(
+        AdapterFactory, "get_supported_providers", return_value=["probe"]
+    ), patch(
+        "app.core.adapter_factory.get_provider_config",
+        side_effect=lambda provider: LLMConfig(provider=provider, **probe_config),
+    ):
+        catalog.start()
+        await catalog._task
+        await asyncio.gather(*catalog._refreshing.values())
+
+    assert probe_adapter.fetches == 1
+    assert catalog.context_length("probe", "probe-1") == 8192
@@ -0,0 +1,94 @@
+"""Tests for the provider status monitor."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.core.adapter_pool import AdapterPool
+from app.core.provider_status import ProviderStatusMonitor
+from app.core.model_catalog import ModelCatalog
+from app.core.schemas import ModelCatalogConfig, ProviderStatusConfig
+
+
+@pytest.fixture
+def monitor(tmp_path, probe_adapter, probe_config):
+    """Create a monitor whose providers are all configured."""
+    pool = AdapterPool()
+    catalog = ModelCatalog(pool, ModelCatalogConfig(path=str(tmp_path / "models.json")))
+    with (
+        patch("app.core.provider_status.get_env_llm_config", return_value=probe_config),
+        patch("app.core.model_catalog.get_env_llm_config", return_value=probe_config),
+    ):
+        yield ProviderStatusMonitor(
+            pool, ProviderStatusConfig(ttl=60, max_stale=120, check_timeout=0.05), catalog
+        )
+
+
+@pytest.mark.asyncio
+async def test_status_is_cached(monitor, probe_adapter):
+    """Test fresh statuses are served without checking again."""
+    first = await monitor.statuses(["probe"])
+    second = await monitor.statuses(["probe"])
+
+    assert first[0].healthy
+    assert first[0].available_models == ["probe-1", "probe-2"]
+    assert second[0] is first[0]
+    assert probe_adapter.checks == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_status_served_while_revalidating(monitor, probe_adapter):
+    """Test a stale status is returned at once and refreshed in the background."""
+    first = (await monitor.statuses(["probe"]))[0]
+    monitor._entries["probe"].checked_at -= 90
+
+    stale = (await monitor.statuses(["probe"]))[0]
+    assert stale is first
+    await asyncio.gather(*monitor._refreshing.values())
+
+    assert probe_adapter.checks == 2
+    assert (await monitor.statuses(["probe"]))[0] is not first
+
+
+@pytest.mark.asyncio
+async def test_slow_health_check_times_out(monitor, probe_adapter):
+    """Test a hanging provider is reported unhealthy after check_timeout."""
+    probe_adapter.check_delay = 1.0
+
+    status = (await monitor.statuses(["probe"]))[0]
+
+    assert not status.healthy
+    assert "timed out" in status.error
+    assert status.available_models == ["probe-1", "probe-2"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_checks(monitor, probe_adapter):
+    """Test concurrent callers wait on one check per provider."""
+    probe_adapter.check_delay = 0.01
+
+    await asyncio.gather(*(monitor.statuses(["probe"]) for _ in range(5)))
+
+    assert probe_adapter.checks == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_new_check(monitor, probe_adapter):
+    """Test invalidated statuses are checked again."""
+    await monitor.statuses(["probe"])
+    monitor.invalidate("probe")
+    await monitor.statuses(["probe"])
+
+    assert probe_adapter.checks == 2
+
+
+@pytest.mark.asyncio
+async def test_unconfigured_provider_is_not_checked(probe_adapter):
+    """Test providers without an API key are reported without a check."""
+    monitor = ProviderStatusMonitor(AdapterPool(), ProviderStatusConfig())
+    with patch("app.core.provider_status.get_env_llm_config", return_value=None):
+        status = (await monitor.statuses(["probe"]))[0]
+
+    assert not status.configured
+    assert probe_adapter.checks == 0
@@ -0,0 +1,110 @@
+"""Tests for the provider rate limiter."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.rate_limiter import (
+    ProviderRateLimiter,
+    RateLimitedError,
+    TokenBucket,
+    parse_reset,
+    parse_retry_after,
+)
+from app.core.schemas import RateLimitConfig
+
+
+def test_parse_reset_formats():
+    """Test OpenAI durations, seconds and RFC 3339 timestamps."""
+    assert parse_reset("1s") == 1.0
+    assert parse_reset("6m0s") == 360.0
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("2.5") == 2.5
+    assert parse_reset("2000-01-01T00:00:00Z") == 0.0
+    assert parse_reset("not-a-time") is None
+
+
+def test_parse_retry_after():
+    """Test retry-after in milliseconds and seconds."""
+    assert parse_retry_after(httpx.Headers({"retry-after-ms": "1500"})) == 1.5
+    assert parse_retry_after(httpx.Headers({"retry-after": "3"})) == 3.0
+    assert parse_retry_after(httpx.Headers({})) is None
+
+
+def test_token_bucket_reserve_reports_wait():
+    """Test reservations beyond capacity report the refill wait."""
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_token_bucket_unlimited():
+    """Test a bucket without capacity never waits."""
+    bucket = TokenBucket()
+    assert bucket.reserve(10**9) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_long_waits():
+    """Test requests that would wait past max_wait fail fast."""
+    limiter = ProviderRateLimiter(
+        "openai", RateLimitConfig(requests_per_minute=1, max_wait=0.5)
+    )
+    await limiter.acquire(10)
+
+    with pytest.raises(RateLimitedError) as exc_info:
+        await limiter.acquire(10)
+    assert exc_info.value.headers["Retry-After"] == "60"
+
+
+@pytest.mark.asyncio
+async def test_limiter_refunds_reservation_when_cancelled_while_pacing():
+    """Test a request cancelled during its pacing wait gives its tokens back."""
+    limiter = ProviderRateLimiter("openai", RateLimitConfig(tokens_per_minute=600))
+    await limiter.acquire(600)
+
+    task = asyncio.ensure_future(limiter.acquire(100))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert limiter.tokens.level == pytest.approx(0, abs=5)
+
+
+def test_limiter_learns_from_openai_headers():
+    """Test remaining/limit headers reshape the buckets."""
+    limiter = ProviderRateLimiter("openai")
+    limiter.observe(
+        200,
+        httpx.Headers(
+            {
+                "x-ratelimit-limit-requests": "500",
+                "x-ratelimit-remaining-requests": "499",
+                "x-ratelimit-limit-tokens": "30000",
+                "x-ratelimit-remaining-tokens": "0",
+                "x-ratelimit-reset-tokens": "2s",
+            }
+        ),
+    )
+
+    assert limiter.requests.capacity == 500
+    assert limiter.tokens.capacity == 30000
+    assert limiter.retry_after() == pytest.approx(2.0, abs=0.1)
+
+
+def test_limiter_blocks_on_429_retry_after():
+    """Test a 429 response blocks the key for retry-after seconds."""
+    limiter = ProviderRateLimiter("anthropic")
+    limiter.observe(429, httpx.Headers({"retry-after": "5"}))
+    assert 4 < limiter.blocked_until - time.monotonic() <= 5
+
+
+def test_limiter_settles_actual_usage():
+    """Test unused reserved tokens are refunded."""
+    limiter = ProviderRateLimiter("openai", RateLimitConfig(tokens_per_minute=1000))
+    limiter.tokens.reserve(800)
+    limiter.settle(800, {"input_tokens": 100, "output_tokens": 100})
+    assert limiter.tokens.level == pytest.approx(800, abs=5)
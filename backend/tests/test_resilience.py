@@ -0,0 +1,133 @@
+"""Tests for retries and hedged requests."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.resilience import (
+    LatencyTracker,
+    ResiliencePolicy,
+    hedge,
+    is_transient,
+    retry_async,
+)
+from app.core.schemas import HedgingConfig, RetryConfig
+
+FAST_RETRY = RetryConfig(max_attempts=3, base_delay=0.001, max_delay=0.01)
+
+
+class StatusError(Exception):
+    """Error carrying an HTTP status like the provider SDK errors."""
+
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def test_is_transient():
+    """Test classification of retryable errors."""
+    assert is_transient(httpx.ConnectError("boom"))
+    assert is_transient(asyncio.TimeoutError())
+    assert is_transient(StatusError(503))
+    assert not is_transient(StatusError(400))
+    assert not is_transient(StatusError(429))
+    assert not is_transient(ValueError("bad config"))
+
+
+@pytest.mark.asyncio
+async def test_retry_recovers_from_transient_errors():
+    """Test transient failures are retried until success."""
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise StatusError(502)
+        return "ok"
+
+    assert await retry_async(flaky, FAST_RETRY) == "ok"
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_gives_up_on_permanent_errors():
+    """Test non-transient errors are raised immediately."""
+    calls = []
+
+    async def broken():
+        calls.append(1)
+        raise StatusError(401)
+
+    with pytest.raises(StatusError):
+        await retry_async(broken, FAST_RETRY)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_takes_faster_attempt_and_cancels_other():
+    """Test the hedged attempt wins when the primary is slow."""
+    delays = [1.0, 0.0]
+    cancelled = []
+
+    async def call():
+        delay = delays.pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return delay
+
+    assert await hedge(call, delay=0.01) == 0.0
+    assert cancelled == [1.0]
+
+
+@pytest.mark.asyncio
+async def test_hedge_respects_can_hedge():
+    """Test no second request is sent when hedging is not allowed."""
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "primary"
+
+    assert await hedge(call, delay=0.001, can_hedge=lambda: False) == "primary"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_falls_back_when_one_attempt_fails():
+    """Test a failing attempt does not hide the other's success."""
+    outcomes = [StatusError(500), "hedge"]
+
+    async def call():
+        outcome = outcomes.pop(0)
+        await asyncio.sleep(0.02 if isinstance(outcome, Exception) else 0.03)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert await hedge(call, delay=0.001) == "hedge"
+
+
+def test_hedge_delay_from_latency_percentile():
+    """Test the hedge delay follows the configured latency percentile."""
+    policy = ResiliencePolicy(
+        hedging=HedgingConfig(enabled=True, min_samples=10, min_delay=0.1)
+    )
+    assert policy.hedge_delay("m") is None
+
+    for i in range(1, 101):
+        policy.latency("m").record(i / 100)
+    assert policy.hedge_delay("m") == pytest.approx(0.95)
+
+
+def test_latency_tracker_percentile():
+    """Test percentile over a small window."""
+    tracker = LatencyTracker(window=3)
+    for value in (5.0, 1.0, 2.0, 3.0):
+        tracker.record(value)
+    assert len(tracker) == 3
+    assert tracker.percentile(0.5) == 2.0
@@ -0,0 +1,121 @@
+"""Tests for the response cache."""
+
+import pytest
+
+from app.core.response_cache import (
+    CACHE_BYPASS,
+    CACHE_DEFAULT,
+    CACHE_REFRESH,
+    MemoryCacheBackend,
+    ResponseCache,
+    SQLiteCacheBackend,
+    cache_key,
+    cache_mode,
+)
+from app.core.schemas import LLMResponse, Message, MessageRole, ResponseCacheConfig
+
+
+def messages(text):
+    return [
+        Message(role=MessageRole.SYSTEM, content="You are helpful."),
+        Message(role=MessageRole.USER, content=text),
+    ]
+
+
+def test_cache_key_normalizes_messages():
+    """Test whitespace differences do not change the key."""
+    assert cache_key("openai", "gpt-4", messages("status?"), 0.0) == cache_key(
+        "openai", "gpt-4", messages("  status?\n"), 0.0
+    )
+
+
+def test_cache_key_covers_request_parameters():
+    """Test model, temperature, tools and other settings are part of the key."""
+    base = cache_key("openai", "gpt-4", messages("status?"), 0.0)
+
+    assert base != cache_key("openai", "gpt-4o", messages("status?"), 0.0)
+    assert base != cache_key("openai", "gpt-4", messages("status?"), 0.7)
+    assert base != cache_key(
+        "openai", "gpt-4", messages("status?"), 0.0, tools=[{"name": "list_jobs"}]
+    )
+    assert base != cache_key(
+        "openai", "gpt-4", messages("status?"), 0.0, settings={"max_tokens": 16}
+    )
+
+
+def test_cache_mode_headers():
+    """Test cache headers map to cache modes."""
+    assert cache_mode({}) == CACHE_DEFAULT
+    assert cache_mode({"cache-control": "no-cache"}) == CACHE_REFRESH
+    assert cache_mode({"cache-control": "max-age=0, no-store"}) == CACHE_BYPASS
+    assert cache_mode({"x-cache-bypass": "true"}) == CACHE_BYPASS
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used():
+    """Test the memory backend keeps the most recently used entries."""
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.set("a", "1", ttl=60)
+    await backend.set("b", "2", ttl=60)
+    await backend.get("a")
+    await backend.set("c", "3", ttl=60)
+
+    assert await backend.get("a") == "1"
+    assert await backend.get("b") is None
+    assert await backend.get("c") == "3"
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_expires_entries():
+    """Test entries are not served after their TTL."""
+    backend = MemoryCacheBackend()
+    await backend.set("a", "1", ttl=0)
+
+    assert await backend.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_round_trip(tmp_path):
+    """Test the SQLite backend stores, evicts and persists entries."""
+    path = tmp_path / "cache.db"
+    backend = SQLiteCacheBackend(path, max_entries=2)
+    await backend.set("a", "1", ttl=60)
+    await backend.set("b", "2", ttl=60)
+    await backend.set("c", "3", ttl=60)
+    await backend.set("expired", "4", ttl=-1)
+    await backend.close()
+
+    reopened = SQLiteCacheBackend(path, max_entries=2)
+    assert await reopened.get("a") is None
+    assert await reopened.get("c") == "3"
+    assert await reopened.get("expired") is None
+    assert await reopened.size() == 2
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_response_cache_counts_hits_and_misses():
+    """Test lookups update the hit/miss counters."""
+    cache = ResponseCache(ResponseCacheConfig())
+    response = LLMResponse(content="All jobs succeeded", model="gpt-4")
+
+    assert await cache.get("key") is None
+    await cache.set("key", response, ttl=60)
+    cached = await cache.get("key")
+
+    assert cached.content == "All jobs succeeded"
+    assert cache.stats.as_dict()["hit_rate"] == 0.5
+
+
+def test_ttl_for_routes_and_temperature():
+    """Test per-route TTLs and the temperature ceiling."""
+    cache = ResponseCache(
+        ResponseCacheConfig(ttl=300, max_temperature=0.0, routes={"fast": 60, "ollama": 0})
+    )
+
+    assert cache.ttl_for("openai", 0.0) == 300
+    assert cache.ttl_for("fast", 0.0) == 60
+    assert cache.ttl_for("ollama", 0.0) == 0
+    assert cache.ttl_for("openai", 0.7) == 0
+    assert cache.ttl_for("openai") == 0
+    assert ResponseCache(ResponseCacheConfig()).ttl_for("openai", 0.7) == 0
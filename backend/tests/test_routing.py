@@ -0,0 +1,98 @@
+"""Tests for latency-aware routing."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.core.routing import ProviderRouter, TargetStats
+from app.core.schemas import RouteConfig, RouteTarget, RoutingConfig
+
+
+@pytest.fixture
+def router():
+    """Create a router with one two-target route."""
+    routes = {
+        "fast": RouteConfig(
+            targets=[
+                RouteTarget(provider="openai", model="gpt-4o-mini"),
+                RouteTarget(provider="anthropic", model="claude-3-5-haiku-20241022"),
+            ]
+        )
+    }
+    return ProviderRouter(RoutingConfig(failure_threshold=2, cooldown=60), routes)
+
+
+def providers(targets):
+    return [target.provider for target in targets]
+
+
+def test_target_stats_ewma():
+    """Test latency and error rate are exponentially weighted."""
+    stats = TargetStats(alpha=0.5)
+    stats.record_success(1.0)
+    stats.record_success(3.0)
+    assert stats.latency == 2.0
+
+    stats.record_failure(threshold=5, cooldown=1)
+    assert stats.error_rate == 0.5
+    assert stats.healthy
+
+
+def test_unsampled_targets_keep_config_order(router):
+    """Test targets without samples are tried in config order."""
+    assert providers(router.rank("fast")) == ["openai", "anthropic"]
+
+
+def test_rank_prefers_lower_latency(router):
+    """Test the faster target is ranked first."""
+    router.record("openai", "gpt-4o-mini", latency=2.0)
+    router.record("anthropic", "claude-3-5-haiku-20241022", latency=0.5)
+
+    assert providers(router.rank("fast")) == ["anthropic", "openai"]
+
+
+def test_errors_penalize_score(router):
+    """Test a fast but failing target loses to a slower reliable one."""
+    router.record("openai", "gpt-4o-mini", latency=0.5)
+    router.record("openai", "gpt-4o-mini", error=True)
+    router.record("anthropic", "claude-3-5-haiku-20241022", latency=0.8)
+
+    assert providers(router.rank("fast")) == ["anthropic", "openai"]
+
+
+def test_cooldown_moves_target_last(router):
+    """Test repeated failures put a target behind healthy ones."""
+    router.record("anthropic", "claude-3-5-haiku-20241022", latency=5.0)
+    router.record("openai", "gpt-4o-mini", error=True)
+    router.record("openai", "gpt-4o-mini", error=True)
+
+    assert not router.stats("openai", "gpt-4o-mini").healthy
+    assert providers(router.rank("fast")) == ["anthropic", "openai"]
+
+
+def test_max_failovers_limits_targets(router):
+    """Test max_failovers caps how many targets are tried."""
+    router.routes["fast"].max_failovers = 0
+    assert providers(router.rank("fast")) == ["openai"]
+
+
+def test_provider_names_are_not_routes(router):
+    """Test provider names take precedence over routes."""
+    assert router.is_route("fast")
+    assert router.is_route("auto")
+    assert not router.is_route("openai")
+
+
+def test_auto_uses_configured_providers(router):
+    """Test the implicit auto route covers every configured provider."""
+    config = {"llm_providers": {"ollama": {}, "gemini": {}}}
+    with patch("app.core.routing.load_config", return_value=config), patch.dict(
+        "os.environ", {}, clear=True
+    ):
+        assert providers(router.rank("auto")) == ["ollama", "gemini"]
+
+
+def test_unknown_route(router):
+    """Test unknown routes raise ValueError."""
+    with pytest.raises(ValueError):
+        router.route("missing")
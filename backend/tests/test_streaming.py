@@ -0,0 +1,228 @@
+"""Tests for stream relay helpers."""
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sse_starlette.sse import ServerSentEvent
+
+from app.api.router import router
+from app.core import streaming
+from app.core.schemas import StreamChunk, StreamCoalescingConfig
+from app.core.streaming import (
+    RawChunk,
+    StreamCoalescer,
+    cancel_on_disconnect,
+    encode_sse,
+    stream_stats,
+)
+
+
+class FakeUpstream:
+    """Async iterator that records whether it was closed."""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.items:
+            raise StopAsyncIteration
+        return self.items.pop(0)
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def never_disconnected():
+    return False
+
+
+async def always_disconnected():
+    return True
+
+
+@pytest.mark.asyncio
+async def test_relay_completes_and_closes_upstream():
+    """Test a fully read stream is closed and counted as completed."""
+    upstream = FakeUpstream(["a", "b"])
+    before = stream_stats.completed
+
+    received = [c async for c in cancel_on_disconnect(upstream, never_disconnected)]
+
+    assert received == ["a", "b"]
+    assert upstream.closed is True
+    assert stream_stats.completed == before + 1
+
+
+@pytest.mark.asyncio
+async def test_relay_stops_on_disconnect():
+    """Test a disconnected client cancels the upstream stream."""
+    upstream = FakeUpstream(["a", "b", "c"])
+    before = stream_stats.cancelled
+
+    received = [
+        c
+        async for c in cancel_on_disconnect(
+            upstream, always_disconnected, check_interval=0
+        )
+    ]
+
+    assert received == []
+    assert upstream.closed is True
+    assert stream_stats.cancelled == before + 1
+
+
+@pytest.mark.asyncio
+async def test_relay_closed_early_cancels_upstream():
+    """Test closing the relay mid-stream closes the upstream stream."""
+    upstream = FakeUpstream(["a", "b", "c"])
+    before = stream_stats.cancelled
+
+    relay = cancel_on_disconnect(upstream, never_disconnected)
+    assert await relay.__anext__() == "a"
+    await relay.aclose()
+
+    assert upstream.closed is True
+    assert stream_stats.cancelled == before + 1
+
+
+def test_stream_counters_endpoint():
+    """Test the stream counters are served by the API."""
+    app = FastAPI()
+    app.include_router(router)
+
+    response = TestClient(app).get("/api/v1/streams")
+
+    assert response.status_code == 200
+    assert response.json() == stream_stats.as_dict()
+
+
+def test_raw_chunks_encode_like_the_public_schema():
+    """Test frames match what sse-starlette sends for a StreamChunk."""
+    raw = RawChunk("héllo\n", metadata={"usage": {"total_tokens": 3}})
+    expected = ServerSentEvent(raw.to_model().model_dump_json()).encode()
+
+    assert encode_sse(raw) == expected
+    assert encode_sse(raw.to_model()) == expected
+
+
+def test_encoding_without_orjson(monkeypatch):
+    """Test the standard library encoder produces the same payload."""
+    chunk = RawChunk("ok", finished=True, tool_calls=[{"id": "1"}])
+    with_orjson = encode_sse(chunk, event="chunk")
+    monkeypatch.setattr(streaming, "orjson", None)
+    frame = encode_sse(chunk, event="chunk")
+
+    assert frame.startswith(b"event: chunk\r\ndata: ")
+    payload = frame.split(b"data: ", 1)[1]
+    assert json.loads(payload) == json.loads(with_orjson.split(b"data: ", 1)[1])
+    assert StreamChunk.model_validate_json(payload).finished is True
+
+
+async def timed(items):
+    """Yield ``(delay, chunk)`` items after sleeping ``delay`` seconds."""
+    for delay, chunk in items:
+        await asyncio.sleep(delay)
+        yield chunk
+
+
+async def drain(chunks):
+    """Collect a stream's chunks."""
+    return [chunk async for chunk in chunks]
+
+
+def coalescer(window=0.05, max_bytes=0):
+    """Create an enabled coalescer."""
+    return StreamCoalescer(StreamCoalescingConfig(enabled=True, window=window, max_bytes=max_bytes))
+
+
+@pytest.mark.asyncio
+async def test_deltas_within_the_window_are_merged():
+    """Test the first token goes out alone and later bursts are merged."""
+    upstream = timed([
+        (0, RawChunk("H")),
+        (0, RawChunk("e", metadata={"id": "1"})),
+        (0, RawChunk("l", metadata={"id": "2"})),
+        (0.15, RawChunk("lo")),
+        (0, RawChunk("", finished=True)),
+    ])
+
+    chunks = await drain(coalescer().wrap(upstream))
+
+    assert [(c.content, c.finished) for c in chunks] == [
+        ("H", False), ("el", False), ("lo", False), ("", True),
+    ]
+    assert chunks[1].metadata == {"id": "2"}
+
+
+@pytest.mark.asyncio
+async def test_first_token_after_an_empty_chunk_is_not_delayed():
+    """Test a leading empty delta does not count as the first token."""
+    upstream = timed([
+        (0, RawChunk("", metadata={"role": "assistant"})),
+        (0, RawChunk("Hel")),
+        (0, RawChunk("lo")),
+        (0.3, RawChunk("", finished=True)),
+    ])
+    started = time.monotonic()
+    arrivals = []
+
+    async for chunk in coalescer(window=0.2).wrap(upstream):
+        arrivals.append((chunk.content, time.monotonic() - started))
+
+    assert [content for content, _ in arrivals] == ["", "Hel", "lo", ""]
+    assert arrivals[1][1] < 0.1
+
+
+@pytest.mark.asyncio
+async def test_held_text_is_flushed_by_size_and_before_tool_calls():
+    """Test the byte threshold and tool calls flush held text at once."""
+    call = {"id": "1", "type": "function", "function": {"name": "t", "arguments": "{}"}}
+    upstream = timed([
+        (0, RawChunk("a")),
+        (0, RawChunk("bb")),
+        (0, RawChunk("cc")),
+        (0, RawChunk("d")),
+        (0, RawChunk("", tool_calls=[call])),
+    ])
+
+    chunks = await drain(coalescer(window=10, max_bytes=4).wrap(upstream))
+
+    assert [c.content for c in chunks] == ["a", "bbcc", "d", ""]
+    assert chunks[-1].tool_calls == [call]
+
+
+@pytest.mark.asyncio
+async def test_closing_a_coalesced_stream_closes_upstream():
+    """Test closing while the next delta is awaited cancels the upstream."""
+    closed = []
+
+    async def upstream():
+        try:
+            yield RawChunk("a")
+            yield RawChunk("b")
+            await asyncio.sleep(10)
+            yield RawChunk("never")
+        finally:
+            closed.append(True)
+
+    chunks = coalescer(window=0.01).wrap(upstream())
+    # "b" is flushed by the window while the upstream is still generating
+    assert [(await chunks.__anext__()).content for _ in range(2)] == ["a", "b"]
+    await chunks.aclose()
+
+    assert closed == [True]
+
+
+def test_disabled_coalescer_passes_the_stream_through():
+    """Test streams are returned unchanged unless coalescing is enabled."""
+    upstream = FakeUpstream([])
+
+    assert StreamCoalescer(StreamCoalescingConfig()).wrap(upstream) is upstream
@@ -0,0 +1,50 @@
+"""Tests for streamed tool-call assembly."""
+
+import json
+
+from app.core.tool_calls import ToolCallAssembler
+
+
+def test_call_completes_when_arguments_close():
+    """Test a call is emitted as soon as its arguments form an object."""
+    assembler = ToolCallAssembler()
+
+    assert assembler.add(0, "call_1", "veeam__list_jobs", "") == []
+    assert assembler.add(0, arguments='{"state": ') == []
+    assert assembler.add(0, arguments='"fai') == []
+    (call,) = assembler.add(0, arguments='led"}')
+
+    assert call["id"] == "call_1"
+    assert call["function"]["name"] == "veeam__list_jobs"
+    assert json.loads(call["function"]["arguments"]) == {"state": "failed"}
+    assert assembler.finish() == []
+
+
+def test_closing_brace_inside_a_string_does_not_complete():
+    """Test a brace that leaves the JSON incomplete is not mistaken for the end."""
+    assembler = ToolCallAssembler()
+    assembler.add(0, "call_1", "search")
+
+    assert assembler.add(0, arguments='{"query": "a}') == []
+    assert len(assembler.add(0, arguments='"}')) == 1
+
+
+def test_next_call_completes_the_previous_one():
+    """Test calls streamed one after another are emitted in order."""
+    assembler = ToolCallAssembler()
+    assembler.add(0, "call_1", "first", "{")
+
+    (first,) = assembler.add(1, "call_2", "second")
+    assert first["id"] == "call_1"
+    assert [c["id"] for c in assembler.finish()] == ["call_2"]
+
+
+def test_explicit_end_and_empty_arguments():
+    """Test calls ended by the provider default to empty arguments once."""
+    assembler = ToolCallAssembler()
+    assembler.add(3, "toolu_1", "list_jobs")
+
+    (call,) = assembler.end(3)
+    assert call["function"]["arguments"] == "{}"
+    assert assembler.end(3) == []
+    assert assembler.add(3, arguments="{}") == []
@@ -0,0 +1,136 @@
+"""Tests for the MCP tool catalog."""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.core.mcp_client import MCPProcessManager
+from app.core.mcp_config import MCPConfigStore
+from app.core.schemas import MCPProcessConfig
+from app.core.tool_catalog import ToolCatalog, exposed_name, gemini_schema
+
+FAKE_SERVER = str(Path(__file__).parent / "fake_mcp_server.py")
+
+
+@pytest.fixture
+async def catalog(tmp_path):
+    """Create a catalog over one fake MCP server."""
+    store = MCPConfigStore(tmp_path / "config.yaml", check_interval=0)
+    await store.save("veeam", {"command": sys.executable, "args": [FAKE_SERVER]})
+    manager = MCPProcessManager(store, MCPProcessConfig(autostart=False, start_timeout=5))
+    yield ToolCatalog(manager, store)
+    await manager.stop()
+
+
+def count_lists(catalog):
+    """Patch the manager's sessions to count tools/list requests."""
+    calls = []
+    original = catalog.manager.session
+
+    async def session(name):
+        s = await original(name)
+        request = s.request
+        if not getattr(request, "counted", False):
+            async def counted(method, params=None, timeout=None):
+                if method == "tools/list":
+                    calls.append(name)
+                return await request(method, params, timeout=timeout)
+            counted.counted = True
+            s.request = counted
+        return s
+
+    return calls, patch.object(catalog.manager, "session", side_effect=session)
+
+
+@pytest.mark.asyncio
+async def test_tools_fetched_once_across_pages(catalog):
+    """Test every page is fetched once and then served from cache."""
+    calls, patched = count_lists(catalog)
+    with patched:
+        tools = await catalog.server_tools("veeam")
+        await catalog.provider_tools("openai")
+        await catalog.provider_tools("anthropic")
+
+    assert [t["name"] for t in tools] == ["list_jobs", "get.job"]
+    assert calls == ["veeam", "veeam"]  # two pages, one fetch
+
+
+@pytest.mark.asyncio
+async def test_tools_translated_per_provider(catalog):
+    """Test tools come back in each provider's format."""
+    openai = await catalog.provider_tools("openai")
+    anthropic = await catalog.provider_tools("anthropic")
+    gemini = await catalog.provider_tools("gemini")
+
+    assert openai[0]["function"]["name"] == "veeam__list_jobs"
+    assert anthropic[1] == {
+        "name": "veeam__get_job",
+        "description": "Get one job",
+        "input_schema": {"type": "object"},
+    }
+    declarations = gemini[0]["functionDeclarations"]
+    assert declarations[0]["parameters"] == {
+        "type": "OBJECT",
+        "properties": {"status": {"type": "STRING", "nullable": True}},
+    }
+    assert "parameters" not in declarations[1]
+
+
+@pytest.mark.asyncio
+async def test_list_changed_invalidates(catalog):
+    """Test a tools/list_changed notification drops the cached list."""
+    await catalog.server_tools("veeam")
+    await catalog.manager.request("veeam", "notify")
+
+    assert "veeam" not in catalog._servers
+
+
+@pytest.mark.asyncio
+async def test_config_change_invalidates(catalog):
+    """Test editing a server's definition drops its cached list."""
+    await catalog.server_tools("veeam")
+    definition = await catalog.store.get("veeam")
+    await catalog.store.save("veeam", {**definition, "env": {"MODE": "new"}})
+
+    assert "veeam" not in catalog._servers
+
+
+@pytest.mark.asyncio
+async def test_call_resolves_exposed_names(catalog):
+    """Test a model-facing tool name is routed to the right server and tool."""
+    assert await catalog.resolve("veeam__get_job") == ("veeam", "get.job")
+    result = await catalog.call("veeam__list_jobs", {"status": "failed"})
+
+    assert '"tool": "list_jobs"' in result["content"][0]["text"]
+    with pytest.raises(KeyError):
+        await catalog.resolve("veeam__missing")
+
+
+@pytest.mark.asyncio
+async def test_unreachable_servers_are_skipped(catalog):
+    """Test one broken server does not hide the others' tools."""
+    await catalog.store.save("broken", {"command": "/nonexistent/mcp-server"})
+
+    tools = await catalog.provider_tools("openai")
+    assert len(tools) == 2
+
+
+def test_names_are_sanitized():
+    """Test exposed names only use characters every provider accepts."""
+    assert exposed_name("my.server", "do it") == "my_server__do_it"
+    assert len(exposed_name("s", "x" * 100)) == 64
+
+
+def test_gemini_schema_drops_unsupported_keywords():
+    """Test JSON Schema keywords Gemini rejects are removed recursively."""
+    schema = {
+        "type": "object",
+        "additionalProperties": False,
+        "properties": {"ids": {"type": "array", "items": {"type": "integer", "minimum": 1}}},
+    }
+    assert gemini_schema(schema) == {
+        "type": "OBJECT",
+        "properties": {"ids": {"type": "ARRAY", "items": {"type": "INTEGER"}}},
+    }
@@ -0,0 +1,232 @@
+"""Tests for the server-side tool loop."""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.mcp_client import MCPProcessManager
+from app.core.mcp_config import MCPConfigStore
+from app.core.schemas import (
+    MCPProcessConfig,
+    Message,
+    MessageRole,
+    StreamChunk,
+    ToolLoopConfig,
+)
+from app.core.tool_catalog import ToolCatalog
+from app.core.tool_loop import ToolLoop, tool_result_text
+
+FAKE_SERVER = str(Path(__file__).parent / "fake_mcp_server.py")
+MESSAGES = [Message(role=MessageRole.USER, content="Which jobs failed?")]
+
+
+def tool_call(call_id, name, arguments):
+    """Build a tool call as the adapters return it."""
+    return {
+        "id": call_id,
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)},
+    }
+
+
+class ScriptedService:
+    """Chat service stand-in streaming scripted responses."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.router = SimpleNamespace(is_route=lambda provider: provider == "auto")
+
+    async def stream(self, provider, messages, **kwargs):
+        self.requests.append((list(messages), kwargs))
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return response()
+
+
+def answer(content="", tool_calls=None, tokens=10, gap=0.0):
+    """Script a streamed model response; tool calls arrive ``gap`` seconds apart."""
+    async def chunks():
+        yield StreamChunk(content=content)
+        for i, call in enumerate(tool_calls or []):
+            if i:
+                await asyncio.sleep(gap)
+            yield StreamChunk(content="", tool_calls=[call])
+        yield StreamChunk(
+            content="",
+            finished=True,
+            metadata={
+                "model": "gpt-4",
+                "finish_reason": "tool_calls" if tool_calls else "stop",
+                "usage": {"total_tokens": tokens},
+            },
+        )
+    return chunks
+
+
+@pytest.fixture
+async def catalog(tmp_path):
+    """Create a catalog over one fake MCP server."""
+    store = MCPConfigStore(tmp_path / "config.yaml", check_interval=0)
+    await store.save("veeam", {"command": sys.executable, "args": [FAKE_SERVER]})
+    manager = MCPProcessManager(store, MCPProcessConfig(autostart=False, start_timeout=5))
+    yield ToolCatalog(manager, store)
+    await manager.stop()
+
+
+async def collect(loop, **kwargs):
+    """Run a loop and return its events."""
+    return [event async for event in loop.run("openai", MESSAGES, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_of_a_step_run_concurrently(catalog):
+    """Test both calls run at once and their results are fed back in order."""
+    service = ScriptedService(
+        answer(tool_calls=[
+            tool_call("a", "veeam__list_jobs", {"delay": 0.5}),
+            tool_call("b", "veeam__list_jobs", {"delay": 0.5, "state": "failed"}),
+        ]),
+        answer("Two jobs failed."),
+    )
+    loop = ToolLoop(service, catalog, ToolLoopConfig())
+
+    started = time.monotonic()
+    events = await collect(loop)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.9
+    assert [e.type for e in events] == [
+        "step", "tool_call", "tool_call", "tool_result", "tool_result", "step", "message",
+    ]
+    history, kwargs = service.requests[1]
+    assert kwargs["tools"][0]["function"]["name"] == "veeam__list_jobs"
+    assert [m.role for m in history] == ["user", "assistant", "tool", "tool"]
+    assert [m.tool_call_id for m in history[2:]] == ["a", "b"]
+    assert json.loads(history[3].content)["arguments"]["state"] == "failed"
+
+    final = events[-1].data
+    assert final["content"] == "Two jobs failed."
+    assert final["usage"] == {"total_tokens": 20}
+    assert final["metadata"]["tool_loop"]["tool_calls"] == 2
+    assert len(final["metadata"]["messages"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_start_while_the_model_streams(catalog):
+    """Test a call runs while the model is still generating the next one."""
+    service = ScriptedService(
+        answer(
+            tool_calls=[
+                tool_call("a", "veeam__list_jobs", {"delay": 0.5}),
+                tool_call("b", "veeam__list_jobs", {}),
+            ],
+            gap=0.5,
+        ),
+        answer("Done."),
+    )
+    loop = ToolLoop(service, catalog, ToolLoopConfig())
+
+    started = time.monotonic()
+    await loop.complete("openai", MESSAGES)
+
+    # Sequential generation then execution would take over a second
+    assert time.monotonic() - started < 0.9
+
+
+@pytest.mark.asyncio
+async def test_step_limit_stops_the_loop(catalog):
+    """Test a model that keeps calling tools is stopped after max_steps."""
+    service = ScriptedService(
+        answer("Looking", tool_calls=[tool_call("a", "veeam__list_jobs", {})])
+    )
+    loop = ToolLoop(service, catalog, ToolLoopConfig(max_steps=3))
+
+    result = await loop.complete("openai", MESSAGES)
+
+    assert len(service.requests) == 3
+    assert result.finish_reason == "max_steps"
+    # The unanswered calls of the last step are not part of the transcript
+    roles = [m["role"] for m in result.metadata["messages"]]
+    assert roles == ["assistant", "tool", "assistant", "tool"]
+
+
+@pytest.mark.asyncio
+async def test_token_limit_stops_the_loop(catalog):
+    """Test the loop stops once the summed usage reaches the limit."""
+    service = ScriptedService(
+        answer(tool_calls=[tool_call("a", "veeam__list_jobs", {})], tokens=60)
+    )
+    loop = ToolLoop(service, catalog, ToolLoopConfig(max_total_tokens=100))
+
+    events = await collect(loop)
+
+    assert len(service.requests) == 2
+    assert events[-2].type == "limit"
+    assert events[-1].data["finish_reason"] == "max_total_tokens"
+
+
+@pytest.mark.asyncio
+async def test_calls_started_before_a_limit_finish_and_are_reported(catalog):
+    """Test a running call is not cancelled when the token limit is reached."""
+    service = ScriptedService(
+        answer(tool_calls=[tool_call("a", "veeam__list_jobs", {"delay": 0.2})], tokens=200)
+    )
+    loop = ToolLoop(service, catalog, ToolLoopConfig(max_total_tokens=100))
+
+    events = await collect(loop)
+
+    assert len(service.requests) == 1
+    assert [e.type for e in events] == ["step", "tool_call", "tool_result", "limit", "message"]
+    limit = events[-2].data
+    assert limit["reason"] == "max_total_tokens"
+    assert [r["id"] for r in limit["tool_results"]] == ["a"]
+    assert not limit["tool_results"][0]["is_error"]
+    stats = events[-1].data["metadata"]["tool_loop"]
+    assert stats["tool_calls"] == 1
+    assert stats["unanswered_tool_results"] == limit["tool_results"]
+
+
+@pytest.mark.asyncio
+async def test_tool_failures_are_reported_to_the_model(catalog):
+    """Test bad calls become error results rather than failing the request."""
+    service = ScriptedService(
+        answer(tool_calls=[
+            tool_call("a", "veeam__missing", {}),
+            {"id": "b", "type": "function",
+             "function": {"name": "veeam__list_jobs", "arguments": "{bad"}},
+            tool_call("c", "veeam__list_jobs", {"delay": 2}),
+        ]),
+        answer("Sorry."),
+    )
+    loop = ToolLoop(service, catalog, ToolLoopConfig(tool_timeout=0.2))
+
+    events = await collect(loop)
+
+    results = {e.data["id"]: e.data for e in events if e.type == "tool_result"}
+    assert all(result["is_error"] for result in results.values())
+    assert "Unknown tool" in results["a"]["content"]
+    assert "Invalid arguments" in results["b"]["content"]
+    assert "timed out" in results["c"]["content"]
+    assert events[-1].data["content"] == "Sorry."
+
+
+@pytest.mark.asyncio
+async def test_routes_are_rejected(catalog):
+    """Test tool loops need a concrete provider."""
+    loop = ToolLoop(ScriptedService(answer()), catalog, ToolLoopConfig())
+
+    with pytest.raises(ValueError, match="route"):
+        await loop.complete("auto", MESSAGES)
+
+
+def test_tool_result_text():
+    """Test MCP content is flattened and truncated."""
+    result = {"content": [{"type": "text", "text": "abcdef"}, {"type": "image", "data": ""}]}
+
+    assert tool_result_text(result) == "abcdef\n[image content omitted]"
+    assert tool_result_text(result, max_chars=3).startswith("abc\n[truncated")
@@ -0,0 +1,177 @@
+"""Tests for the multiplexed chat WebSocket."""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import websocket as ws_module
+from app.core.streaming import RawChunk
+
+
+class FakeStreams:
+    """Stands in for ``open_stream``, recording what each stream did."""
+
+    def __init__(self):
+        self.pulled = {}
+        self.closed = []
+
+    async def open(self, request, messages, config):
+        text = messages[-1].content
+        if text == "fail":
+            raise ValueError("Unsupported provider")
+        return self._chunks(text)
+
+    async def _chunks(self, text):
+        self.pulled[text] = 0
+        try:
+            for i, char in enumerate(text):
+                if char == "~":
+                    # Keeps generating until cancelled
+                    await asyncio.sleep(10)
+                self.pulled[text] += 1
+                yield RawChunk(char, finished=i == len(text) - 1)
+        finally:
+            self.closed.append(text)
+
+
+@pytest.fixture
+def streams(monkeypatch):
+    """Route WebSocket chats to fake streams, with a window of two frames."""
+    fake = FakeStreams()
+    monkeypatch.setattr(ws_module, "open_stream", fake.open)
+    monkeypatch.setattr(
+        ws_module, "load_config", lambda: {"websocket": {"window": 2, "max_streams": 2}}
+    )
+    return fake
+
+
+@pytest.fixture
+def client():
+    """Create a test client for an app serving only the WebSocket route."""
+    app = FastAPI()
+    app.include_router(ws_module.router)
+    return TestClient(app)
+
+
+def chat(stream_id, text):
+    """Build a chat message."""
+    return {
+        "type": "chat",
+        "id": stream_id,
+        "request": {"provider": "fake", "messages": [{"role": "user", "content": text}]},
+    }
+
+
+def receive_until(ws, frame_type, stream_id):
+    """Receive frames until ``stream_id`` sends a ``frame_type`` frame."""
+    frames = []
+    while True:
+        frame = ws.receive_json()
+        frames.append(frame)
+        if frame["id"] == stream_id and frame["type"] == frame_type:
+            return frames
+
+
+def receive_acking(ws, stream_id):
+    """Acknowledge the frames received so far, then each one until done."""
+    ws.send_json({"type": "ack", "id": stream_id, "frames": 2})
+    frames = []
+    while not frames or frames[-1]["type"] != "done":
+        frames.append(ws.receive_json())
+        ws.send_json({"type": "ack", "id": stream_id})
+    return frames
+
+
+def test_concurrent_streams_share_one_connection(streams, client):
+    """Test two streams run at once, each frame tagged with its stream."""
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_json(chat("a", "ab"))
+        ws.send_json(chat("b", "xy"))
+        frames = receive_until(ws, "done", "a") + receive_until(ws, "done", "b")
+
+    for stream_id, text in (("a", "ab"), ("b", "xy")):
+        own = [f for f in frames if f["id"] == stream_id]
+        assert "".join(f["data"]["content"] for f in own if f["type"] == "chunk") == text
+        assert own[-1]["type"] == "done"
+        assert own[-2]["data"]["finished"] is True
+
+
+def test_streams_pause_until_frames_are_acknowledged(streams, client):
+    """Test a stream reads no further ahead than the client's window."""
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_json(chat("a", "abcdef"))
+        assert [ws.receive_json()["data"]["content"] for _ in range(2)] == ["a", "b"]
+        time.sleep(0.1)
+        # The third chunk was read and waits for credit; no more are pulled
+        assert streams.pulled["abcdef"] == 3
+
+        frames = receive_acking(ws, "a")
+
+    assert "".join(f["data"]["content"] for f in frames[:-1]) == "cdef"
+
+
+def test_oversized_acks_grant_at_most_the_window(streams, client):
+    """Test a huge ack returns quickly and never lifts the window."""
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_json(chat("a", "abcdefgh"))
+        assert [ws.receive_json()["data"]["content"] for _ in range(2)] == ["a", "b"]
+
+        ws.send_json({"type": "ack", "id": "a", "frames": 1_000_000_000})
+        assert [ws.receive_json()["data"]["content"] for _ in range(2)] == ["c", "d"]
+        time.sleep(0.1)
+        assert streams.pulled["abcdefgh"] == 5
+
+        frames = receive_acking(ws, "a")
+
+    assert "".join(f["data"]["content"] for f in frames[:-1]) == "efgh"
+
+
+def test_cancel_stops_the_upstream_stream(streams, client):
+    """Test cancelling a stream closes it and leaves the others running."""
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_json(chat("a", "a~"))
+        assert ws.receive_json()["data"]["content"] == "a"
+        ws.send_json({"type": "cancel", "id": "a"})
+        assert ws.receive_json() == {"id": "a", "type": "cancelled"}
+
+        ws.send_json(chat("b", "b"))
+        frames = receive_until(ws, "done", "b")
+
+    assert [f["type"] for f in frames] == ["chunk", "done"]
+    assert "a~" in streams.closed
+
+
+def test_binary_frames_are_rejected_without_closing(streams, client):
+    """Test a binary frame gets an error and running streams carry on."""
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_bytes(b"\x00\x01")
+        error = ws.receive_json()
+        assert (error["id"], error["type"], error["status_code"]) == (None, "error", 400)
+
+        ws.send_json(chat("a", "ab"))
+        frames = receive_until(ws, "done", "a")
+        assert "".join(f["data"]["content"] for f in frames if f["type"] == "chunk") == "ab"
+
+
+def test_errors_are_reported_per_stream(streams, client):
+    """Test failures and protocol errors are reported with HTTP status codes."""
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_json(chat("a", "fail"))
+        error = ws.receive_json()
+        assert (error["id"], error["type"], error["status_code"]) == ("a", "error", 400)
+
+        ws.send_json({"type": "chat", "id": "b"})
+        assert ws.receive_json()["status_code"] == 400
+
+        ws.send_json(chat("c", "~"))
+        ws.send_json(chat("c", "~"))
+        assert ws.receive_json()["status_code"] == 409
+        ws.send_json(chat("d", "~"))
+        ws.send_json(chat("e", "~"))
+        assert ws.receive_json()["status_code"] == 429
+
+        ws.send_text("not json")
+        assert ws.receive_json()["id"] is None